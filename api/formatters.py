@@ -4,6 +4,9 @@ Format analysis results for different outputs
 """
 from typing import Dict, Any
 
+from core.metrics import STAGE_SECONDS, timed
+
+@timed(STAGE_SECONDS, "format_result")
 def format_result_for_display(result_dict: Dict[str, Any]) -> str:
     """
     Format the JSON result as a nicely formatted string for Sokosumi dashboard.
@@ -12,6 +15,9 @@ def format_result_for_display(result_dict: Dict[str, Any]) -> str:
     if not isinstance(result_dict, dict):
         return str(result_dict)
     
+    if result_dict.get("report_type") == "batch":
+        return format_batch_result_for_display(result_dict)
+    
     lines = []
     lines.append("🔍 BLOCKCHAIN WALLET RISK ANALYSIS REPORT")
     lines.append("")
@@ -100,3 +106,70 @@ def format_result_for_display(result_dict: Dict[str, Any]) -> str:
     
     return "\n".join(lines)
 
+
+
+def format_batch_result_for_display(result_dict: Dict[str, Any]) -> str:
+    """
+    Format a batch screening report as a plain string for Sokosumi dashboard.
+    Lists one line per wallet; full per-wallet reports stay in the JSON result.
+    """
+    lines = []
+    lines.append("🔍 BATCH WALLET RISK SCREENING REPORT")
+    lines.append("")
+    
+    if "analysis_timestamp" in result_dict:
+        lines.append(f"📅 Analysis Date: {result_dict['analysis_timestamp']}")
+    lines.append(f"👛 Wallets Screened: {result_dict.get('wallet_count', 0)}")
+    if result_dict.get("duplicates_removed"):
+        lines.append(f"   Duplicates Removed: {result_dict['duplicates_removed']}")
+    lines.append(f"   Flagged for Review: {result_dict.get('flagged_count', 0)}")
+    lines.append(f"   Escalated to AI Analysis: {result_dict.get('escalated_count', 0)}")
+    if result_dict.get("escalation_skipped_count"):
+        lines.append(f"   Not Escalated (capacity): {result_dict['escalation_skipped_count']}")
+    if result_dict.get("failed_count"):
+        lines.append(f"   Failed: {result_dict['failed_count']}")
+    lines.append("")
+    
+    # Risk Distribution
+    if "risk_distribution" in result_dict:
+        lines.append("📊 RISK DISTRIBUTION")
+        for category, count in result_dict["risk_distribution"].items():
+            lines.append(f"   {category}: {count}")
+        lines.append("")
+    
+    # Highest Risk Wallets
+    if result_dict.get("highest_risk"):
+        lines.append("🚨 HIGHEST RISK WALLETS")
+        for i, wallet in enumerate(result_dict["highest_risk"], 1):
+            lines.append(
+                f"{i}. {wallet['wallet_address']} - {wallet['risk_score']}/100 ({wallet['risk_category']})"
+            )
+        lines.append("")
+    
+    # Per-wallet Results
+    if result_dict.get("wallets"):
+        lines.append("📋 WALLET RESULTS")
+        for wallet in result_dict["wallets"]:
+            if wallet.get("status") == "error":
+                lines.append(f"   {wallet['wallet_address']}: error - {wallet.get('error', 'N/A')}")
+                continue
+            lines.append(
+                f"   {wallet['wallet_address']}: {wallet.get('risk_score', 'N/A')}/100 "
+                f"{wallet.get('risk_category', 'N/A')}, {wallet.get('compliance_status', 'N/A')} "
+                f"({wallet.get('analysis_method', 'N/A')})"
+            )
+        lines.append("")
+    
+    # Report Hash
+    if "report_hash" in result_dict:
+        lines.append("🔐 VERIFICATION")
+        lines.append(f"   Report Hash: {result_dict['report_hash']}")
+        lines.append("")
+    
+    lines.append("End of Report")
+    lines.append("")
+    lines.append("🌐 Learn more about RiskLens AI:")
+    lines.append("   https://studio--studio-2671206846-b156f.us-central1.hosted.app/")
+    lines.append("")
+    
+    return "\n".join(lines)
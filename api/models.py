@@ -20,17 +20,37 @@ class StartJobRequest(BaseModel):
             }
         }
 
+class StartBatchJobRequest(BaseModel):
+    """Request model for /start_batch_job endpoint"""
+    identifier_from_purchaser: str
+    input_data: Dict[str, Any]
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "identifier_from_purchaser": "exchange_deposit_screen_001",
+                "input_data": {
+                    "wallet_addresses": [
+                        "addr_test1qz2fxv2umyhttkxyxp8x0dlpdt3k6cwng5pxj3jhsydzer3n0d3vllmyqwsx5wktcd8cc3sq835lu7drv2xwl2wywfgs68faae",
+                        "addr_test1qz4x53y7jsfcf7gjc62xljayhyg3yhln6dcuqk09uwrl2txdnlckuxmy084ptm0cxvj7ls72q8kvcpxneektrql3ug0quj6t4n"
+                    ]
+                }
+            }
+        }
+
 class JobStatusResponse(BaseModel):
     """Response model for /status endpoint"""
     job_id: str
     status: str
     payment_status: str
+    payment_state: Optional[str] = None
     result: Optional[str] = None
 
 class HealthResponse(BaseModel):
     """Response model for /health endpoint"""
     status: str
     mongodb: Optional[str] = None
+    analysis_queue: Optional[Dict[str, int]] = None
 
 class AvailabilityResponse(BaseModel):
     """Response model for /availability endpoint"""
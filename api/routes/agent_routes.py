@@ -2,16 +2,36 @@
 Agent Information Routes
 Handles agent availability, health checks, and schema information
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 
 from core.logging import get_logger
 from core.config import settings
+from core.metrics import (
+    ANALYSIS_QUEUE_DEPTH,
+    ANALYSIS_RUNNING,
+    CACHE_HIT_RATIO,
+    PAYMENT_INSTANCES,
+    PAYMENTS_PENDING,
+    render_metrics
+)
+from core.worker_pool import analysis_pool
+from services.blockchain.tx_cache import transaction_cache
+from services.payment.masumi_service import payment_service
 from services.storage.mongo_store import mongo_store
+from services.storage.result_cache import result_cache
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
+# Gauges are sampled when /metrics is scraped
+ANALYSIS_QUEUE_DEPTH.set_function(lambda: analysis_pool.queue_depth)
+ANALYSIS_RUNNING.set_function(lambda: analysis_pool.running)
+PAYMENT_INSTANCES.set_function(lambda: len(payment_service.payment_instances))
+PAYMENTS_PENDING.set_function(lambda: payment_service.poller.pending_count)
+CACHE_HIT_RATIO.labels("analysis_result").set_function(lambda: result_cache.stats()["hit_ratio"])
+CACHE_HIT_RATIO.labels("transaction").set_function(lambda: transaction_cache.stats()["hit_ratio"])
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Route: Check Server Availability (MIP-003: /availability)
@@ -24,7 +44,7 @@ async def check_availability():
     if not settings.agent_identifier:
         logger.warning("AGENT_IDENTIFIER not set, using default for local testing")
     
-    logger.info(f"Availability check - Agent Identifier: {agent_id}")
+    logger.info("Availability check - Agent Identifier: %s", agent_id)
     return {
         "status": "available",
         "type": "masumi-agent",
@@ -65,12 +85,22 @@ async def health():
     """Health check endpoint"""
     try:
         await mongo_store.ping()
-        return {"status": "healthy"}
+        return {"status": "healthy", "analysis_queue": analysis_pool.stats()}
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
+        logger.error("Health check failed: %s", e)
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Route: Prometheus Metrics
+# ─────────────────────────────────────────────────────────────────────────────
+@router.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage timings, queue depth, payments and cache hit ratios"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Route: Root Endpoint
 # ─────────────────────────────────────────────────────────────────────────────
@@ -86,7 +116,8 @@ async def root():
             "input_schema": "/input_schema",
             "start_job": "/start_job",
             "status": "/status?job_id=<job_id>",
-            "health": "/health"
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
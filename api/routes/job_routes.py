@@ -2,16 +2,23 @@
 Job Management Routes
 Handles job creation, status checking, and result retrieval
 """
-import uuid
+import asyncio
 import json
+import uuid
+from typing import Any, Dict, Optional
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 
 from core.logging import get_logger
 from core.config import settings
-from core.crew import RiskAnalysisCrew
+from core.batch_screening import JOB_TYPE_BATCH, parse_wallet_addresses
+from core.jobs import process_job
+from core.worker_pool import analysis_pool
 from services.storage.mongo_store import mongo_store
+from services.storage.job_events import job_events
 from services.payment.masumi_service import payment_service
-from api.models import StartJobRequest
+from api.models import StartBatchJobRequest, StartJobRequest
 from api.formatters import format_result_for_display
 
 logger = get_logger(__name__)
@@ -20,112 +27,159 @@ router = APIRouter()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Helper: Execute CrewAI Task
+# Helper: Handle Payment Callback
 # ─────────────────────────────────────────────────────────────────────────────
-async def execute_crew_task(input_data: dict) -> dict:
-    """Execute RiskLens AI analysis for wallet compliance and risk scoring"""
-    wallet_address = input_data.get("wallet_address", "")
-    logger.info(f"Starting analysis for wallet: {wallet_address}")
+async def handle_payment_status(job_id: str, payment_id: str) -> None:
+    """Runs (or queues) the analysis after payment confirmation"""
+    logger.info("Payment callback triggered for job %s", job_id)
     
-    crew = RiskAnalysisCrew(logger_instance=logger)
-    inputs = {"wallet_address": wallet_address}
-    result = crew.crew.kickoff(inputs)
+    # Check if job exists
+    job = await mongo_store.get_job(job_id)
+    if not job:
+        logger.error("Job %s not found", job_id)
+        return
     
-    logger.info("Analysis completed successfully")
+    # The Masumi monitor passes the full payment record
+    if isinstance(payment_id, dict):
+        payment_id = payment_id.get("blockchainIdentifier") or job["blockchain_identifier"]
     
-    # Extract the raw result
-    result_raw = result.raw if hasattr(result, "raw") else str(result)
+    # Dispatch only on the awaiting_payment -> queued/running transition, so
+    # a repeated or late confirmation never runs the analysis twice
+    if settings.job_execution_mode == "queue":
+        # Hand the job to the worker processes
+        dispatched = await mongo_store.enqueue_job(job_id, payment_id)
+    else:
+        dispatched = await mongo_store.transition_job(job_id, "awaiting_payment", {
+            "status": "running",
+            "payment_status": "paid"
+        })
+    if not dispatched:
+        logger.info("Job %s is no longer awaiting payment (%s), ignoring callback", job_id, job["status"])
+        payment_service.stop_monitoring(job_id)
+        return
     
-    # Try to parse as JSON
-    try:
-        result_dict = json.loads(result_raw)
-        return result_dict
-    except (json.JSONDecodeError, TypeError):
-        logger.warning("Result is not valid JSON, returning as text")
-        return {"result": result_raw}
+    if settings.job_execution_mode == "queue":
+        payment_service.stop_monitoring(job_id)
+        return
+    await process_job(job_id, payment_id, job)
+
+
+async def handle_payment_expired(job_id: str) -> None:
+    """Fails a job whose payment did not arrive before payByTime"""
+    logger.warning("Payment deadline passed for job %s", job_id)
+    # A payment confirmed just before the deadline has already moved the job on
+    await mongo_store.transition_job(job_id, "awaiting_payment", {
+        "status": "failed",
+        "payment_status": "expired",
+        "error": "Payment not received before payByTime"
+    })
+    payment_service.stop_monitoring(job_id)
+
+
+def payment_callbacks(job_id: str):
+    """Builds the (payment confirmed, payment expired) callbacks for a job"""
+    async def payment_callback(blockchain_identifier: str):
+        await handle_payment_status(job_id, blockchain_identifier)
+
+    async def payment_expired():
+        await handle_payment_expired(job_id)
+
+    return payment_callback, payment_expired
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Helper: Handle Payment Callback
+# Helper: Open a Paid Job
 # ─────────────────────────────────────────────────────────────────────────────
-async def handle_payment_status(job_id: str, payment_id: str) -> None:
-    """Executes CrewAI task after payment confirmation"""
-    try:
-        logger.info(f"Payment callback triggered for job {job_id}")
-        
-        # Check if job exists
-        job = await mongo_store.get_job(job_id)
-        if not job:
-            logger.error(f"Job {job_id} not found")
+async def reject_if_saturated() -> None:
+    """
+    Backpressure: refuse new jobs while the analysis queue is full
+    
+    Inline mode runs analyses on this process's pool; in queue mode the
+    workers run them, so the backlog is the queued jobs in MongoDB.
+    """
+    if settings.job_execution_mode == "queue":
+        if settings.job_max_queued <= 0:
             return
-        
-        # Update job status to running
-        await mongo_store.update_job(job_id, {
-            "status": "running",
-            "payment_status": "paid"
-        })
+        queued = await mongo_store.count_jobs("queued")
+        if queued < settings.job_max_queued:
+            return
+        logger.warning("Job queue full (%s queued), rejecting job", queued)
+    elif analysis_pool.is_saturated():
+        logger.warning("Analysis queue saturated (%s), rejecting job", analysis_pool.stats())
+    else:
+        return
+    raise HTTPException(
+        status_code=429,
+        detail="Analysis queue is full, please retry later",
+        headers={"Retry-After": "30"}
+    )
 
-        # Execute the AI task
-        logger.info("Starting CrewAI analysis")
-        result_dict = await execute_crew_task(job["input_data"])
-        logger.info(f"Analysis completed for job {job_id}")
-        
-        # Format result
-        result_string = format_result_for_display(result_dict)
-        
-        # Submit result to Masumi
-        logger.info(f"Submitting result to Masumi (length: {len(result_string)} chars)")
-        
-        try:
-            completion_response = await payment_service.complete_payment(
-                job_id,
-                payment_id,
-                result_string
-            )
-            
-            # Check if submission was successful
-            if completion_response and completion_response.get("status") == "success":
-                result_hash = completion_response.get('data', {}).get('resultHash', 'N/A')
-                logger.info(f"Result submitted successfully. Hash: {result_hash}")
-                
-                # Update job status
-                await mongo_store.update_job(job_id, {
-                    "status": "completed",
-                    "payment_status": "result_submitted",
-                    "result": result_dict,
-                    "result_hash": result_hash
-                })
-            else:
-                logger.error(f"Result submission failed: {completion_response}")
-                await mongo_store.update_job(job_id, {
-                    "status": "failed",
-                    "error": f"Result submission failed: {completion_response}"
-                })
-                
-        except Exception as submit_error:
-            logger.error(f"Exception during result submission: {str(submit_error)}")
-            await mongo_store.update_job(job_id, {
-                "status": "failed",
-                "error": f"Result submission error: {str(submit_error)}"
-            })
-            raise
-
-        # Stop monitoring payment status
-        payment_service.stop_monitoring(job_id)
-            
-    except Exception as e:
-        logger.error(f"Error in payment callback for job {job_id}: {str(e)}")
-        
-        # Update job status
-        job = await mongo_store.get_job(job_id)
-        if job:
-            await mongo_store.update_job(job_id, {
-                "status": "failed",
-                "error": str(e)
-            })
+
+async def open_paid_job(
+    job_id: str,
+    identifier_from_purchaser: str,
+    input_data: Dict[str, Any],
+    extra_fields: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Creates the payment request, stores the job and starts payment monitoring
+    
+    Args:
+        job_id: New job identifier
+        identifier_from_purchaser: Purchaser's identifier
+        input_data: Job input data, as submitted (it is hashed for the payment)
+        extra_fields: Additional fields stored on the job document
         
-        # Stop monitoring
-        payment_service.stop_monitoring(job_id)
+    Returns:
+        MIP-003 start_job response body
+    """
+    # Create payment request
+    payment_data = await payment_service.create_payment_request(
+        job_id=job_id,
+        identifier_from_purchaser=identifier_from_purchaser,
+        input_data=input_data
+    )
+    
+    blockchain_identifier = payment_data["blockchain_identifier"]
+
+    # Store job info in MongoDB
+    job_data = {
+        "status": "awaiting_payment",
+        "payment_status": "pending",
+        "blockchain_identifier": blockchain_identifier,
+        "input_data": input_data,
+        "result": None,
+        "identifier_from_purchaser": identifier_from_purchaser,
+        "pay_by_time": payment_data["pay_by_time"],
+        **payment_service.monitor_claim(),
+        **(extra_fields or {})
+    }
+    await mongo_store.set_job(job_id, job_data)
+
+    # Start monitoring payment status
+    logger.info("Starting payment monitoring for job %s", job_id)
+    payment_callback, payment_expired = payment_callbacks(job_id)
+    await payment_service.start_monitoring(
+        job_id,
+        payment_callback,
+        pay_by_time=payment_data["pay_by_time"],
+        on_expired=payment_expired
+    )
+
+    # Return response
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "blockchainIdentifier": blockchain_identifier,
+        "submitResultTime": payment_data["submit_result_time"],
+        "unlockTime": payment_data["unlock_time"],
+        "externalDisputeUnlockTime": payment_data["external_dispute_unlock_time"],
+        "agentIdentifier": settings.agent_identifier,
+        "sellerVKey": settings.seller_vkey,
+        "identifierFromPurchaser": identifier_from_purchaser,
+        "input_hash": payment_data["input_hash"],
+        "payByTime": payment_data["pay_by_time"],
+    }
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -135,63 +189,22 @@ async def handle_payment_status(job_id: str, payment_id: str) -> None:
 async def start_job(data: StartJobRequest):
     """Initiates a job and creates a payment request"""
     logger.info("Received start_job request")
+    await reject_if_saturated()
     
     try:
         job_id = str(uuid.uuid4())
         wallet_address = data.input_data.get("wallet_address", "")
         
-        logger.info(f"Starting job {job_id} for wallet: {wallet_address}")
-
-        # Create payment request
-        payment_data = await payment_service.create_payment_request(
-            job_id=job_id,
-            identifier_from_purchaser=data.identifier_from_purchaser,
-            input_data=data.input_data
-        )
-        
-        blockchain_identifier = payment_data["blockchain_identifier"]
-
-        # Store job info in MongoDB
-        job_data = {
-            "status": "awaiting_payment",
-            "payment_status": "pending",
-            "blockchain_identifier": blockchain_identifier,
-            "input_data": data.input_data,
-            "result": None,
-            "identifier_from_purchaser": data.identifier_from_purchaser
-        }
-        await mongo_store.set_job(job_id, job_data)
-
-        # Define payment callback
-        async def payment_callback(blockchain_identifier: str):
-            await handle_payment_status(job_id, blockchain_identifier)
-
-        # Start monitoring payment status
-        logger.info(f"Starting payment monitoring for job {job_id}")
-        await payment_service.start_monitoring(job_id, payment_callback)
-
-        # Return response
-        return {
-            "status": "success",
-            "job_id": job_id,
-            "blockchainIdentifier": blockchain_identifier,
-            "submitResultTime": payment_data["submit_result_time"],
-            "unlockTime": payment_data["unlock_time"],
-            "externalDisputeUnlockTime": payment_data["external_dispute_unlock_time"],
-            "agentIdentifier": settings.agent_identifier,
-            "sellerVKey": settings.seller_vkey,
-            "identifierFromPurchaser": data.identifier_from_purchaser,
-            "input_hash": payment_data["input_hash"],
-            "payByTime": payment_data["pay_by_time"],
-        }
+        logger.info("Starting job %s for wallet: %s", job_id, wallet_address)
+        return await open_paid_job(job_id, data.identifier_from_purchaser, data.input_data)
     except KeyError as e:
-        logger.error(f"Missing required field: {str(e)}")
+        logger.error("Missing required field: %s", e)
         raise HTTPException(
             status_code=400,
             detail="Bad Request: Missing or invalid input_data or identifier_from_purchaser"
         )
     except Exception as e:
-        logger.error(f"Error in start_job: {str(e)}")
+        logger.error("Error in start_job: %s", e)
         raise HTTPException(
             status_code=400,
             detail="Input_data or identifier_from_purchaser is missing, invalid, or does not adhere to the schema."
@@ -199,30 +212,66 @@ async def start_job(data: StartJobRequest):
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# Route: Check Job Status (MIP-003: /status)
+# Route: Start Batch Job
 # ─────────────────────────────────────────────────────────────────────────────
-@router.get("/status")
-async def get_status(job_id: str):
-    """Retrieves the current status of a specific job"""
-    logger.info(f"Checking status for job {job_id}")
+@router.post("/start_batch_job")
+async def start_batch_job(data: StartBatchJobRequest):
+    """Initiates a screening job for many wallets under a single payment"""
+    logger.info("Received start_batch_job request")
+    await reject_if_saturated()
     
-    # Get job from MongoDB
-    job = await mongo_store.get_job(job_id)
-    if not job:
-        logger.warning(f"Job {job_id} not found")
-        raise HTTPException(status_code=404, detail="Job not found")
+    wallet_addresses, duplicates_removed = parse_wallet_addresses(data.input_data.get("wallet_addresses"))
+    if not wallet_addresses:
+        raise HTTPException(status_code=400, detail="input_data.wallet_addresses must list at least one wallet")
+    if len(wallet_addresses) > settings.batch_max_wallets:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many wallets: {len(wallet_addresses)} (maximum {settings.batch_max_wallets})"
+        )
+    
+    try:
+        job_id = str(uuid.uuid4())
+        logger.info(
+            "Starting batch job %s for %s wallets (%s duplicates removed)",
+            job_id, len(wallet_addresses), duplicates_removed
+        )
+        return await open_paid_job(
+            job_id,
+            data.identifier_from_purchaser,
+            data.input_data,
+            extra_fields={
+                "job_type": JOB_TYPE_BATCH,
+                "wallet_addresses": wallet_addresses,
+                "duplicates_removed": duplicates_removed
+            }
+        )
+    except Exception as e:
+        logger.error("Error in start_batch_job: %s", e)
+        raise HTTPException(
+            status_code=400,
+            detail="Input_data or identifier_from_purchaser is missing, invalid, or does not adhere to the schema."
+        )
 
-    # Check latest payment status if payment instance exists
-    if payment_service.has_payment_instance(job_id):
-        try:
-            status = await payment_service.check_payment_status(job_id)
-            payment_status = status.get("data", {}).get("status")
-            await mongo_store.update_job(job_id, {"payment_status": payment_status})
-            job["payment_status"] = payment_status
-        except Exception as e:
-            logger.error(f"Error checking payment status: {str(e)}")
-            job["payment_status"] = "error"
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Helper: Job Status Payload
+# ─────────────────────────────────────────────────────────────────────────────
+# Statuses after which a job no longer changes
+TERMINAL_STATUSES = {"completed", "failed"}
+
+# Upper bound for ?wait= long-polls
+MAX_STATUS_WAIT_SECONDS = 60
+
+# Without change streams, listeners re-read MongoDB this often to catch
+# updates made by other processes
+STATUS_RECHECK_SECONDS = 5
+
+# SSE keep-alive comment interval
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+def build_status_payload(job_id: str, job: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds the /status response body from a job document"""
     result_data = job.get("result")
     
     # Format result
@@ -240,6 +289,131 @@ async def get_status(job_id: str):
         "job_id": job_id,
         "status": job["status"],
         "payment_status": job["payment_status"],
+        "payment_state": (job.get("payment_state") or {}).get("on_chain_state"),
+        "stage": job.get("stage"),
         "result": result
     }
 
+
+def _progress_key(job: Dict[str, Any]) -> tuple:
+    return (job.get("status"), job.get("payment_status"), job.get("stage"))
+
+
+async def wait_for_job_change(
+    job_id: str,
+    job: Dict[str, Any],
+    updates: asyncio.Queue,
+    timeout: float,
+    status_only: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Wait until a job's status (or stage) differs from the given snapshot
+    
+    Args:
+        job_id: Job identifier
+        job: Last job snapshot seen by the client
+        updates: Queue from job_events.listen for this job
+        timeout: Seconds to wait at most
+        status_only: Ignore payment and stage changes
+        
+    Returns:
+        The changed job document, or None on timeout
+    """
+    def key(doc: Dict[str, Any]):
+        return doc.get("status") if status_only else _progress_key(doc)
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    recheck = STREAM_KEEPALIVE_SECONDS if job_events.change_stream_active else STATUS_RECHECK_SECONDS
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return None
+        try:
+            await asyncio.wait_for(updates.get(), timeout=min(remaining, recheck))
+        except asyncio.TimeoutError:
+            pass
+        current = await mongo_store.get_job_status(job_id)
+        if current and key(current) != key(job):
+            return current
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Route: Check Job Status (MIP-003: /status)
+# ─────────────────────────────────────────────────────────────────────────────
+@router.get("/status")
+async def get_status(job_id: str, refresh: bool = False, wait: float = 0):
+    """
+    Retrieves the current status of a specific job
+    
+    Payment state comes from the snapshot the payment poller keeps on the
+    job document; pass refresh=true to check the payment service now.
+    With wait=<seconds> the request is held until the job's status
+    changes (long-poll), up to 60 seconds.
+    """
+    logger.debug("Checking status for job %s", job_id)
+    
+    with job_events.listen(job_id) as updates:
+        # Get job from MongoDB
+        job = await mongo_store.get_job_status(job_id)
+        if not job:
+            logger.warning("Job %s not found", job_id)
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        # Forced check against the payment service
+        if refresh and job["status"] == "awaiting_payment":
+            try:
+                job["payment_state"] = await payment_service.check_payment_status(
+                    job_id,
+                    job["blockchain_identifier"]
+                )
+            except Exception as e:
+                logger.error("Error checking payment status: %s", e)
+
+        if wait > 0 and job["status"] not in TERMINAL_STATUSES:
+            changed = await wait_for_job_change(
+                job_id,
+                job,
+                updates,
+                timeout=min(wait, MAX_STATUS_WAIT_SECONDS),
+                status_only=True
+            )
+            job = changed or job
+
+    return build_status_payload(job_id, job)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Route: Stream Job Status (Server-Sent Events)
+# ─────────────────────────────────────────────────────────────────────────────
+@router.get("/status/stream")
+async def stream_status(job_id: str):
+    """
+    Streams job status and stage changes as Server-Sent Events
+    
+    Sends the current status immediately, then a "status" event whenever
+    the status, payment status or stage changes, and closes once the job
+    is completed or failed.
+    """
+    job = await mongo_store.get_job_status(job_id)
+    if not job:
+        logger.warning("Job %s not found", job_id)
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        current = job
+        with job_events.listen(job_id) as updates:
+            yield f"event: status\ndata: {json.dumps(build_status_payload(job_id, current))}\n\n"
+            while current["status"] not in TERMINAL_STATUSES:
+                changed = await wait_for_job_change(job_id, current, updates, STREAM_KEEPALIVE_SECONDS)
+                if changed is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                current = changed
+                yield f"event: status\ndata: {json.dumps(build_status_payload(job_id, current))}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,77 @@
+"""
+Counterparty Graph Benchmark
+Times CSR build, k-hop propagation and exposure queries on a synthetic graph
+
+Flows follow a power law over addresses (a few exchange-like hubs, a long
+tail of wallets), which is the shape that makes naive BFS expensive.
+
+Usage:
+    python benchmarks/bench_counterparty_graph.py [--addresses 1000000] [--flows 5000000] [--flagged 1000]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.blockchain.graph import CounterpartyGraph  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--addresses", type=int, default=1_000_000)
+    parser.add_argument("--flows", type=int, default=5_000_000, help="Directed value flows")
+    parser.add_argument("--flagged", type=int, default=1000, help="Flagged seed addresses")
+    parser.add_argument("--hops", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=10_000, help="Single-address neighbour lookups")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    src = (rng.zipf(1.6, args.flows) - 1) % args.addresses
+    dst = rng.integers(0, args.addresses, args.flows)
+    values = rng.lognormal(17, 2, args.flows)
+    seeds = rng.choice(args.addresses, args.flagged, replace=False)
+
+    start = time.perf_counter()
+    graph = CounterpartyGraph.from_edges(src.astype(np.int32), dst.astype(np.int32), values, args.addresses)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    distances = graph.hop_distances(seeds, args.hops)
+    bfs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    taint = graph.propagate(seeds, args.hops, 0.5)
+    propagate = time.perf_counter() - start
+
+    lookups = []
+    for node in rng.integers(0, args.addresses, args.queries):
+        start = time.perf_counter()
+        neighbors, shares = graph.neighbors(int(node))
+        float((shares * taint[neighbors]).sum())
+        lookups.append(time.perf_counter() - start)
+
+    results = {
+        "addresses": args.addresses,
+        "directed_edges": graph.num_edges,
+        "csr_mb": round((graph.indptr.nbytes + graph.indices.nbytes + graph.weights.nbytes) / 1e6, 1),
+        "build_s": round(build, 3),
+        "bfs_s": round(bfs, 3),
+        "propagate_s": round(propagate, 3),
+        "reached": {hop: int(np.count_nonzero(distances == hop)) for hop in range(args.hops + 1)},
+        "lookup_us": {
+            "p50": round(statistics.median(lookups) * 1e6, 2),
+            "p99": round(float(np.percentile(lookups, 99)) * 1e6, 2)
+        }
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
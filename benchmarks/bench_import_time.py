@@ -0,0 +1,106 @@
+"""
+Import-Time Benchmark
+Measures cold-start import cost of the API entry point in fresh interpreters
+
+Each run starts a new Python process with -X importtime, imports the
+target module and records the wall time plus per-package import cost
+(self time summed by top-level package). Heavy subsystems that should
+stay out of the startup path are reported separately.
+
+Usage:
+    python benchmarks/bench_import_time.py [--module main] [--runs 5] [--top 15]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Subsystems that are expected to load lazily
+LAZY_PACKAGES = ("crewai", "crewai_tools", "masumi", "litellm", "openai")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure_once(module: str) -> dict:
+    """Import module in a fresh interpreter"""
+    env = dict(os.environ)
+    env.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    process_seconds = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    self_us = defaultdict(int)
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            package = match.group(4).split(".")[0]
+            self_us[package] += int(match.group(1))
+            loaded.add(package)
+
+    return {
+        "import_ms": float(completed.stdout.strip().splitlines()[-1]) * 1000,
+        "process_ms": process_seconds * 1000,
+        "self_us": self_us,
+        "loaded": loaded
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure")
+    parser.add_argument("--top", type=int, default=15, help="Packages listed by import cost")
+    args = parser.parse_args()
+
+    runs = [measure_once(args.module) for _ in range(args.runs)]
+
+    packages = set().union(*(run["self_us"] for run in runs))
+    package_ms = {
+        package: statistics.median(run["self_us"].get(package, 0) for run in runs) / 1000
+        for package in packages
+    }
+    top = sorted(package_ms.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    import_ms = [run["import_ms"] for run in runs]
+    process_ms = [run["process_ms"] for run in runs]
+    results = {
+        "module": args.module,
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms": {
+            "p50": round(statistics.median(import_ms), 3),
+            "min": round(min(import_ms), 3),
+            "max": round(max(import_ms), 3)
+        },
+        "process_ms": {
+            "p50": round(statistics.median(process_ms), 3),
+            "min": round(min(process_ms), 3),
+            "max": round(max(process_ms), 3)
+        },
+        "top_packages_ms": {package: round(ms, 3) for package, ms in top},
+        "lazy_packages_loaded": {
+            package: package in runs[0]["loaded"] for package in LAZY_PACKAGES
+        }
+    }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Pipeline Benchmark
+Reproducible throughput and latency figures for the analysis pipeline, run offline
+
+Blockfrost and Masumi are replaced by the local stand-in server from
+fake_services.py, the crew's LLM calls by a stub with fixed latency, and
+MongoDB by mongomock-motor unless --mongo-url points at a real server.
+Everything else (analyzer, caches, worker pool, payment poller, job
+routes) is the production code path. Scenarios:
+
+    blockchain_data               get_blockchain_data on synthetic wallets
+                                  of each size, cold (new wallet) and warm
+    analyze_transaction_patterns  Pattern analysis over in-memory records
+    jobs                          /start_job until the job reads completed,
+                                  with --concurrency jobs in flight
+    status                        /status under --concurrency clients
+
+Results are printed as JSON (and written to --output) so runs on
+different commits can be compared; --baseline adds the p50/p95 change
+against an earlier result file.
+
+Requires mongomock-motor (pip install mongomock-motor) unless --mongo-url
+is given.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 10,1000,100000] [--jobs 50] [--concurrency 10]
+        [--latency-ms 20] [--rate-limit 0] [--llm-latency-ms 500] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_services import FakeServices, FakeServiceServer, tx_details, tx_reference, tx_utxos, wallet_address
+
+# Scenario keys compared against a baseline
+COMPARED_PERCENTILES = ("p50_ms", "p95_ms")
+
+
+def summarize(latencies: List[float], wall_seconds: float) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput for a list of durations (s)"""
+    if not latencies:
+        return {"count": 0}
+    import numpy as np
+
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(latencies),
+        "throughput_per_s": round(len(latencies) / wall_seconds, 3) if wall_seconds > 0 else None,
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(values.max()), 3)
+    }
+
+
+def configure_environment(args, server: FakeServiceServer, workdir: str) -> None:
+    """Point settings at the stand-in server; must run before repo imports"""
+    os.environ.update({
+        "BLOCKFROST_PROJECT_ID": "preprodbenchmark",
+        "BLOCKFROST_BASE_URL": server.blockfrost_url,
+        "BLOCKFROST_RATE_LIMIT": str(args.client_rate_limit),
+        "PAYMENT_SERVICE_URL": server.masumi_url,
+        "PAYMENT_API_KEY": "benchmark",
+        "AGENT_IDENTIFIER": "benchmark-agent",
+        "SELLER_VKEY": "benchmark-vkey",
+        "NETWORK": "preprod",
+        "OPENAI_API_KEY": "sk-benchmark",
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "JOB_EXECUTION_MODE": "inline",
+        "TX_CACHE_PATH": os.path.join(workdir, "transactions.sqlite")
+    })
+    if args.max_transactions is not None:
+        os.environ["BLOCKCHAIN_MAX_TRANSACTIONS"] = str(args.max_transactions)
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+        os.environ["MONGO_DB"] = f"risklens_bench_{int(time.time())}"
+    else:
+        # The transaction cache's and rate limiter's sync clients are not mocked; keep them local
+        os.environ["TX_CACHE_BACKEND"] = "sqlite"
+        os.environ["BLOCKFROST_LIMITER_BACKEND"] = "file"
+        os.environ["BLOCKFROST_LIMITER_PATH"] = os.path.join(workdir, "blockfrost_limiter.json")
+    # Job scenarios should measure the pipeline, not the polling cadence
+    os.environ.setdefault("PAYMENT_POLL_TICK_SECONDS", "0.05")
+    os.environ.setdefault("PAYMENT_POLL_MIN_INTERVAL", "0.1")
+    os.environ.setdefault("PAYMENT_POLL_MAX_INTERVAL", "1")
+
+
+def install_stub_llm(llm_latency_ms: float) -> None:
+    """Replace crew runs with a stub that waits like an LLM would"""
+    import core.batch_screening
+    import core.jobs
+    from core.fast_path import build_deterministic_report
+    from services.blockchain.analyzer import get_blockchain_data
+
+    def stub_run_crew(wallet: str) -> Dict[str, Any]:
+        # The crew's tool call still hits Blockfrost (served from cache)
+        report = build_deterministic_report(wallet, get_blockchain_data(wallet))
+        time.sleep(llm_latency_ms / 1000)
+        report["analysis_method"] = "stub_llm"
+        return report
+
+    core.jobs.run_crew = stub_run_crew
+    core.batch_screening.run_crew = stub_run_crew
+
+
+def install_mock_mongo() -> None:
+    """Back MongoStore with mongomock-motor"""
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("mongomock-motor is not installed; install it or pass --mongo-url")
+    import services.storage.mongo_store as store_module
+
+    store_module.AsyncIOMotorClient = AsyncMongoMockClient
+
+
+def bench_blockchain_data(sizes: List[int], iterations: int) -> Dict[str, Any]:
+    """Cold runs use a new wallet each time; warm runs repeat the last one"""
+    from services.blockchain.analyzer import get_blockchain_data
+
+    results = {}
+    for size in sizes:
+        timings = {"cold": [], "warm": []}
+        walls = {}
+        for phase in ("cold", "warm"):
+            start = time.perf_counter()
+            for i in range(iterations):
+                index = i if phase == "cold" else iterations - 1
+                call_start = time.perf_counter()
+                get_blockchain_data(wallet_address(size, index))
+                timings[phase].append(time.perf_counter() - call_start)
+            walls[phase] = time.perf_counter() - start
+        results[str(size)] = {phase: summarize(timings[phase], walls[phase]) for phase in timings}
+    return results
+
+
+def bench_analyze_patterns(sizes: List[int], iterations: int) -> Dict[str, Any]:
+    from services.blockchain.accounting import parse_endpoints
+    from services.blockchain.analyzer import get_analyzer
+
+    analyzer = get_analyzer("preprod")
+    results = {}
+    for size in sizes:
+        address = wallet_address(size, 0)
+        records = []
+        for index in range(size - 1, -1, -1):
+            reference = tx_reference(address, index)
+            details = tx_details(reference["tx_hash"])
+            utxos = tx_utxos(reference["tx_hash"], address)
+            records.append(analyzer._wallet_view({
+                **reference,
+                "fees": int(details["fees"]),
+                "inputs": parse_endpoints(utxos["inputs"]),
+                "outputs": parse_endpoints(utxos["outputs"])
+            }, address))
+
+        timings = []
+        start = time.perf_counter()
+        for _ in range(iterations):
+            call_start = time.perf_counter()
+            analyzer.analyze_transaction_patterns(records)
+            timings.append(time.perf_counter() - call_start)
+        results[str(size)] = summarize(timings, time.perf_counter() - start)
+    return results
+
+
+async def bench_jobs(client, sizes: List[int], jobs: int, concurrency: int) -> Dict[str, Any]:
+    """Submit jobs with bounded concurrency and follow each until it finishes"""
+    semaphore = asyncio.Semaphore(concurrency)
+    start_latencies, e2e_latencies = [], []
+    outcomes = {"completed": 0, "failed": 0, "rejected": 0}
+    job_ids = []
+
+    async def run_job(index: int) -> None:
+        wallet = wallet_address(sizes[index % len(sizes)], 10_000 + index)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/start_job", json={
+                "identifier_from_purchaser": f"bench{index:06d}",
+                "input_data": {"wallet_address": wallet}
+            })
+            start_latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                outcomes["rejected"] += 1
+                return
+            job_id = response.json()["job_id"]
+            job_ids.append(job_id)
+
+            status = None
+            while status not in ("completed", "failed"):
+                reply = await client.get("/status", params={"job_id": job_id, "wait": 30})
+                status = reply.json().get("status")
+            e2e_latencies.append(time.perf_counter() - started)
+            outcomes[status] += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(run_job(index) for index in range(jobs)))
+    wall = time.perf_counter() - wall_start
+    return {
+        **outcomes,
+        "start_job": summarize(start_latencies, wall),
+        "end_to_end": summarize(e2e_latencies, wall),
+        "job_ids": job_ids
+    }
+
+
+async def bench_status(client, job_ids: List[str], requests: int, concurrency: int) -> Dict[str, Any]:
+    """Hammer /status for existing jobs from concurrent clients"""
+    if not job_ids:
+        return {"count": 0}
+    latencies = []
+    errors = 0
+    per_client = max(1, requests // concurrency)
+    rng = random.Random(0)
+
+    async def run_client() -> None:
+        nonlocal errors
+        for _ in range(per_client):
+            started = time.perf_counter()
+            response = await client.get("/status", params={"job_id": rng.choice(job_ids)})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(concurrency)))
+    return {**summarize(latencies, time.perf_counter() - wall_start), "errors": errors}
+
+
+async def bench_api(args, sizes: List[int]) -> Dict[str, Any]:
+    """Run the job and status scenarios against the app in-process"""
+    import httpx
+    from fastapi import FastAPI
+
+    from api.routes import agent_router, job_router
+    from api.routes.job_routes import payment_callbacks
+    from core.worker_pool import analysis_pool
+    from services.blockchain.client import blockfrost_http
+    from services.payment.masumi_service import payment_service
+    from services.storage.job_events import job_events
+    from services.storage.mongo_store import mongo_store
+
+    app = FastAPI()
+    app.include_router(agent_router)
+    app.include_router(job_router)
+
+    # Same startup/shutdown as main.lifespan; mongomock has no change streams
+    await mongo_store.connect()
+    await blockfrost_http.start()
+    if args.mongo_url:
+        job_events.start(mongo_store.jobs_collection)
+    await payment_service.rehydrate_monitoring(payment_callbacks)
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            jobs = await bench_jobs(client, sizes, args.jobs, args.concurrency)
+            status = await bench_status(client, jobs.pop("job_ids"), args.status_requests, args.concurrency)
+    finally:
+        analysis_pool.shutdown()
+        await blockfrost_http.close()
+        await payment_service.close()
+        await job_events.stop()
+        if args.mongo_url:
+            await mongo_store.db.client.drop_database(mongo_store.mongo_db)
+        await mongo_store.disconnect()
+    return {"jobs": jobs, "status": status}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Percent change of p50/p95 for every scenario present in both runs"""
+    changes = {}
+
+    def walk(current: Any, previous: Any, path: str) -> None:
+        if not isinstance(current, dict) or not isinstance(previous, dict):
+            return
+        for key in COMPARED_PERCENTILES:
+            if isinstance(current.get(key), (int, float)) and previous.get(key):
+                changes.setdefault(path, {})[key] = round((current[key] / previous[key] - 1) * 100, 1)
+        for key, value in current.items():
+            if key != "meta":
+                walk(value, previous.get(key), f"{path}.{key}" if path else key)
+
+    walk(results, baseline, "")
+    return changes
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,100000", help="Wallet history lengths (transactions)")
+    parser.add_argument("--iterations", type=int, default=5, help="Runs per wallet size and phase")
+    parser.add_argument("--jobs", type=int, default=50, help="Jobs submitted in the jobs scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="Jobs in flight / concurrent /status clients")
+    parser.add_argument("--status-requests", type=int, default=2000, help="Total /status requests")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Stand-in server latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=5, help="Uniform jitter around the latency")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Server-side Blockfrost req/s before 429s (0 = off)")
+    parser.add_argument("--burst", type=int, default=500, help="Server-side Blockfrost burst size")
+    parser.add_argument("--client-rate-limit", type=float, default=0, help="BLOCKFROST_RATE_LIMIT for the client (0 = off)")
+    parser.add_argument("--max-transactions", type=int, default=None, help="BLOCKCHAIN_MAX_TRANSACTIONS (0 = full history)")
+    parser.add_argument("--llm-latency-ms", type=float, default=500, help="Latency of the stub LLM per crew run")
+    parser.add_argument("--payment-delay", type=float, default=0, help="Seconds until payments read FundsLocked")
+    parser.add_argument("--mongo-url", default=None, help="Real MongoDB to use instead of mongomock-motor")
+    parser.add_argument("--scenarios", default="blockchain_data,analyze_transaction_patterns,jobs,status",
+                        help="Comma-separated scenarios to run (jobs and status run together)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency jitter")
+    parser.add_argument("--output", default=None, help="Also write the JSON results to this file")
+    parser.add_argument("--baseline", default=None, help="Earlier result file to compare p50/p95 against")
+    parser.add_argument("--verbose", action="store_true", help="Show application logs")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    scenarios = {name.strip() for name in args.scenarios.split(",")}
+
+    server = FakeServiceServer(FakeServices(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        payment_delay=args.payment_delay
+    )).start()
+    workdir = tempfile.mkdtemp(prefix="risklens-bench-")
+    configure_environment(args, server, workdir)
+    logging.getLogger("risklens_ai").setLevel(logging.INFO if args.verbose else logging.ERROR)
+
+    if not args.mongo_url:
+        install_mock_mongo()
+    install_stub_llm(args.llm_latency_ms)
+
+    from core.config import settings
+
+    results: Dict[str, Any] = {"meta": {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sizes": sizes,
+        "args": vars(args),
+        "settings": {
+            "analysis_mode": settings.analysis_mode,
+            "blockchain_max_transactions": settings.blockchain_max_transactions,
+            "blockfrost_max_concurrency": settings.blockfrost_max_concurrency,
+            "analysis_max_workers": settings.analysis_max_workers
+        }
+    }}
+    try:
+        if "blockchain_data" in scenarios:
+            results["blockchain_data"] = bench_blockchain_data(sizes, args.iterations)
+        if "analyze_transaction_patterns" in scenarios:
+            results["analyze_transaction_patterns"] = bench_analyze_patterns(sizes, args.iterations)
+        if scenarios & {"jobs", "status"}:
+            results.update(asyncio.run(bench_api(args, sizes)))
+    finally:
+        server.stop()
+    results["fake_services"] = dict(server.services.counters)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            results["comparison"] = compare(results, json.load(f))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Per-Job Setup Overhead Benchmark
+Compares building the crew and analyzer per job with reusing pooled instances
+
+Usage:
+    python benchmarks/bench_setup_overhead.py [--jobs 20]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Construction only; no LLM or Blockfrost requests are made
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("BLOCKFROST_PROJECT_ID", "preprodbenchmark")
+os.environ["CREWAI_DISABLE_TELEMETRY"] = "true"
+
+
+def measure(setup, jobs: int) -> dict:
+    """Time setup() once per simulated job"""
+    timings = []
+    for _ in range(jobs):
+        start = time.perf_counter()
+        setup()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "jobs": jobs,
+        "total_ms": round(sum(timings), 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20, help="Number of simulated jobs")
+    args = parser.parse_args()
+
+    from core.crew import RiskAnalysisCrew
+    from core.crew_pool import CrewPool
+    from services.blockchain.analyzer import BlockchainAnalyzer, get_analyzer
+
+    pool = CrewPool(max_size=1, verbose=False)
+
+    def pooled_crew():
+        with pool.acquire():
+            pass
+
+    results = {
+        "crew_per_job": measure(lambda: RiskAnalysisCrew(verbose=False), args.jobs),
+        "crew_pooled": measure(pooled_crew, args.jobs),
+        "analyzer_per_job": measure(lambda: BlockchainAnalyzer(network="preprod"), args.jobs),
+        "analyzer_shared": measure(lambda: get_analyzer("preprod"), args.jobs)
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,427 @@
+"""
+Local Service Stand-ins
+Blockfrost- and Masumi-compatible HTTP server with synthetic wallets
+
+The server answers the Blockfrost endpoints the analyzer uses and the
+Masumi payment endpoints the job routes use, so the real pipeline can be
+driven offline. Latency and the Blockfrost rate limit are configurable,
+and every response is derived from the request alone (UTXOs also from
+the wallet whose listing returned the transaction), so runs are
+reproducible.
+
+Synthetic wallet addresses encode their history length
+(see wallet_address), e.g. addr_test1bench1000w0 has 1,000 transactions.
+
+Usage:
+    python benchmarks/fake_services.py [--port 8090] [--latency-ms 20] [--rate-limit 10]
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Blockfrost's maximum page size
+MAX_PAGE_SIZE = 100
+
+# Synthetic chain layout: transaction i of a wallet (0 = oldest)
+FIRST_BLOCK = 1_000_000
+BLOCKS_PER_TX = 3
+FIRST_BLOCK_TIME = 1_650_000_000
+SECONDS_PER_TX = 600
+
+WALLET_PATTERN = re.compile(r"^addr_test1bench(\d+)w(\d+)$")
+
+# Synthetic wallets trade with a shared pool of counterparties, so the
+# counterparty graph has multi-hop paths between wallets
+COUNTERPARTY_POOL = 2000
+
+# Every third transaction also moves one of this many native assets
+ASSET_POOL = 50
+
+BLOCKFROST_PREFIX = "/api/v0"
+MASUMI_PREFIX = "/api/v1"
+
+
+def wallet_address(tx_count: int, index: int = 0) -> str:
+    """Address of a synthetic wallet with tx_count transactions"""
+    return f"addr_test1bench{tx_count}w{index}"
+
+
+def wallet_tx_count(address: str) -> Optional[int]:
+    """History length encoded in a synthetic address, or None if unknown"""
+    match = WALLET_PATTERN.match(address)
+    return int(match.group(1)) if match else None
+
+
+def tx_hash(address: str, index: int) -> str:
+    return hashlib.sha256(f"{address}:{index}".encode()).hexdigest()
+
+
+def tx_reference(address: str, index: int) -> Dict[str, Any]:
+    """Entry of /addresses/{address}/transactions"""
+    return {
+        "tx_hash": tx_hash(address, index),
+        "tx_index": 0,
+        "block_height": FIRST_BLOCK + index * BLOCKS_PER_TX,
+        "block_time": FIRST_BLOCK_TIME + index * SECONDS_PER_TX
+    }
+
+
+def tx_details(hash_: str) -> Dict[str, Any]:
+    """Body of /txs/{hash}, derived from the hash so it is stable"""
+    seed = int(hash_[:16], 16)
+    lovelace = 1_000_000 + seed % 50_000_000_000
+    return {
+        "hash": hash_,
+        "block": hash_[::-1],
+        "block_height": FIRST_BLOCK + seed % 100_000,
+        "block_time": FIRST_BLOCK_TIME + seed % 10_000_000,
+        "slot": seed % 100_000_000,
+        "index": 0,
+        "output_amount": [{"unit": "lovelace", "quantity": str(lovelace)}],
+        "fees": str(160_000 + seed % 100_000),
+        "deposit": "0",
+        "size": 250 + seed % 16_000,
+        "invalid_before": None,
+        "invalid_hereafter": None,
+        "utxo_count": 2 + seed % 6,
+        "withdrawal_count": 0,
+        "mir_cert_count": 0,
+        "delegation_count": 0,
+        "stake_cert_count": 0,
+        "pool_update_count": 0,
+        "pool_retire_count": 0,
+        "asset_mint_or_burn_count": 0,
+        "redeemer_count": 0,
+        "valid_contract": True
+    }
+
+
+def counterparty_address(index: int) -> str:
+    """Address of a shared synthetic counterparty"""
+    return f"addr_test1benchcp{index}"
+
+
+def asset_unit(index: int) -> str:
+    """Unit (policy id + hex asset name) of a synthetic native asset"""
+    return hashlib.sha224(f"policy{index}".encode()).hexdigest() + b"BENCH".hex()
+
+
+def tx_utxos(hash_: str, owner: str) -> Dict[str, Any]:
+    """
+    Body of /txs/{hash}/utxos: owner pays or is paid by a pooled counterparty
+
+    The sender's input also covers the fee and the rest returns as change;
+    every third transaction sends tokens along with the lovelace.
+    """
+    seed = int(hash_[:16], 16)
+    details = tx_details(hash_)
+    lovelace = int(details["output_amount"][0]["quantity"])
+    fee = int(details["fees"])
+    counterparty = counterparty_address(seed % COUNTERPARTY_POOL)
+    sender, receiver = (owner, counterparty) if seed & 1 else (counterparty, owner)
+    paid = lovelace * (1 + seed % 9) // 10
+    tokens = [{"unit": asset_unit(seed % ASSET_POOL), "quantity": str(1 + seed % 1000)}] if seed % 3 == 0 else []
+
+    def utxo(address: str, quantity: int, index: int, assets: list = ()) -> Dict[str, Any]:
+        return {
+            "address": address,
+            "amount": [{"unit": "lovelace", "quantity": str(quantity)}, *assets],
+            "output_index": index,
+            "data_hash": None,
+            "inline_datum": None,
+            "reference_script_hash": None,
+            "collateral": False
+        }
+
+    return {
+        "hash": hash_,
+        "inputs": [{**utxo(sender, lovelace + fee, 0, tokens), "tx_hash": hash_[::-1], "reference": False}],
+        "outputs": [utxo(receiver, paid, 0, tokens), utxo(sender, lovelace - paid, 1)]
+    }
+
+
+def _masumi_time(delta: timedelta) -> str:
+    return (datetime.now(timezone.utc) + delta).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class TokenBucket:
+    """Thread-safe token bucket (rate <= 0 disables limiting)"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class FakeServices:
+    """
+    Shared state of the stand-in server
+
+    Args:
+        latency_ms: Mean added latency per request
+        jitter_ms: Uniform jitter around the mean
+        rate_limit: Blockfrost requests per second before 429s (0 = unlimited)
+        burst: Blockfrost burst size
+        payment_delay: Seconds after creation until a payment reads FundsLocked
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        rate_limit: float = 0,
+        burst: int = 500,
+        payment_delay: float = 0
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bucket = TokenBucket(rate_limit, burst)
+        self.payment_delay = payment_delay
+        self.payments: Dict[str, Dict[str, Any]] = {}
+        self.tx_owners: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self.counters = {"blockfrost": 0, "throttled": 0, "masumi": 0, "not_found": 0}
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def delay(self) -> None:
+        latency = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    # ── Blockfrost ──────────────────────────────────────────────────────
+
+    def blockfrost(self, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if not self.bucket.take():
+            self.count("throttled")
+            return 429, {"status_code": 429, "error": "Project Over Limit", "message": "Usage is over limit."}
+        self.count("blockfrost")
+
+        parts = path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "txs":
+            return 200, tx_details(parts[1])
+        if len(parts) == 3 and parts[0] == "txs" and parts[2] == "utxos":
+            return 200, tx_utxos(parts[1], self.tx_owners.get(parts[1], counterparty_address(COUNTERPARTY_POOL)))
+        if len(parts) < 2 or parts[0] != "addresses" or wallet_tx_count(parts[1]) is None:
+            return self.not_found()
+
+        address = parts[1]
+        if len(parts) == 2:
+            return 200, {
+                "address": address,
+                "amount": [{"unit": "lovelace", "quantity": "42000000"}],
+                "stake_address": None,
+                "type": "shelley",
+                "script": False
+            }
+        if len(parts) == 3 and parts[2] == "transactions":
+            return 200, self.address_transactions(address, query)
+        return self.not_found()
+
+    def address_transactions(self, address: str, query: Dict[str, str]) -> list:
+        total = wallet_tx_count(address)
+        count = min(int(query.get("count", MAX_PAGE_SIZE)), MAX_PAGE_SIZE)
+        page = max(1, int(query.get("page", 1)))
+
+        # "from"/"to" are "block" or "block:index"; heights grow with the index
+        first, last = 0, total - 1
+        if query.get("from"):
+            height = int(query["from"].split(":")[0])
+            first = max(first, -(-(height - FIRST_BLOCK) // BLOCKS_PER_TX))
+        if query.get("to"):
+            height = int(query["to"].split(":")[0])
+            last = min(last, (height - FIRST_BLOCK) // BLOCKS_PER_TX)
+        if last < first:
+            return []
+
+        offset = (page - 1) * count
+        if query.get("order", "asc") == "desc":
+            indices = range(last - offset, max(first, last - offset - count + 1) - 1, -1)
+        else:
+            indices = range(first + offset, min(last, first + offset + count - 1) + 1)
+        references = [tx_reference(address, index) for index in indices]
+        with self._lock:
+            self.tx_owners.update((reference["tx_hash"], address) for reference in references)
+        return references
+
+    def not_found(self) -> Tuple[int, Any]:
+        self.count("not_found")
+        return 404, {
+            "status_code": 404,
+            "error": "Not Found",
+            "message": "The requested component has not been found."
+        }
+
+    # ── Masumi ──────────────────────────────────────────────────────────
+
+    def masumi(self, path: str, body: Dict[str, Any]) -> Tuple[int, Any]:
+        self.count("masumi")
+        route = path.rstrip("/")
+
+        if route == "/payment":
+            identifier = uuid.uuid4().hex
+            with self._lock:
+                self.payments[identifier] = {"created": time.time(), "result_hash": None}
+            return 200, {"status": "success", "data": {
+                "blockchainIdentifier": identifier,
+                "payByTime": body.get("payByTime") or _masumi_time(timedelta(hours=12)),
+                "submitResultTime": body.get("submitResultTime") or _masumi_time(timedelta(hours=24)),
+                "unlockTime": _masumi_time(timedelta(hours=30)),
+                "externalDisputeUnlockTime": _masumi_time(timedelta(hours=36)),
+                "inputHash": body.get("inputHash")
+            }}
+
+        payment = self.payments.get(body.get("blockchainIdentifier", ""))
+        if payment is None:
+            return 404, {"status": "error", "message": "Payment not found"}
+
+        if route == "/payment/resolve-blockchain-identifier":
+            if payment["result_hash"] is not None:
+                state, action = "ResultSubmitted", "None"
+            elif time.time() - payment["created"] >= self.payment_delay:
+                state, action = "FundsLocked", "WaitingForExternalAction"
+            else:
+                state, action = None, "WaitingForExternalAction"
+            return 200, {"status": "success", "data": {
+                "blockchainIdentifier": body["blockchainIdentifier"],
+                "onChainState": state,
+                "NextAction": {"requestedAction": action},
+                "resultHash": payment["result_hash"]
+            }}
+
+        if route == "/payment/submit-result":
+            payment["result_hash"] = body.get("submitResultHash")
+            return 200, {"status": "success", "data": {
+                "blockchainIdentifier": body["blockchainIdentifier"],
+                "resultHash": payment["result_hash"]
+            }}
+
+        return 404, {"status": "error", "message": f"Unknown route {path}"}
+
+
+def _make_handler(services: FakeServices):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: Any) -> None:
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            services.delay()
+            if not url.path.startswith(BLOCKFROST_PREFIX):
+                self._send(*services.not_found())
+                return
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            self._send(*services.blockfrost(url.path[len(BLOCKFROST_PREFIX):], query))
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send(400, {"status": "error", "message": "Invalid JSON"})
+                return
+            services.delay()
+            path = urlparse(self.path).path
+            if not path.startswith(MASUMI_PREFIX):
+                self._send(*services.not_found())
+                return
+            self._send(*services.masumi(path[len(MASUMI_PREFIX):], body))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class FakeServiceServer:
+    """Runs FakeServices on a background thread"""
+
+    def __init__(self, services: FakeServices, host: str = "127.0.0.1", port: int = 0):
+        self.services = services
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(services))
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def blockfrost_url(self) -> str:
+        """Value for BLOCKFROST_BASE_URL (the client appends /v0)"""
+        return f"{self.base_url}/api"
+
+    @property
+    def masumi_url(self) -> str:
+        """Value for PAYMENT_SERVICE_URL"""
+        return f"{self.base_url}{MASUMI_PREFIX}"
+
+    def start(self) -> "FakeServiceServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform jitter around the latency")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Blockfrost requests/sec (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=500, help="Blockfrost burst size")
+    parser.add_argument("--payment-delay", type=float, default=0, help="Seconds until payments read FundsLocked")
+    args = parser.parse_args()
+
+    server = FakeServiceServer(
+        FakeServices(args.latency_ms, args.jitter_ms, args.rate_limit, args.burst, args.payment_delay),
+        args.host,
+        args.port
+    )
+    print(f"BLOCKFROST_BASE_URL={server.blockfrost_url}")
+    print(f"PAYMENT_SERVICE_URL={server.masumi_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Batch Wallet Screening
+Screens many wallets under one job, escalating only flagged wallets to the crew
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from core.config import settings
+from core.logging import get_logger
+from core.metrics import STAGE_SECONDS, timed
+from core.crew_pool import run_crew
+from core.fast_path import MODE_DETERMINISTIC, build_deterministic_report, risk_category
+from core.worker_pool import analysis_pool
+from services.blockchain.analyzer import BASE_RISK_SCORE, get_analyzer
+from services.storage.job_events import STAGE_ANALYZING, STAGE_SCORING
+from services.storage.result_cache import result_cache
+
+logger = get_logger(__name__)
+
+# Job type stored on batch job documents
+JOB_TYPE_BATCH = "batch"
+
+# Wallets listed in the combined report's highest-risk section
+HIGHEST_RISK_LISTED = 10
+
+RISK_CATEGORIES = ("Low", "Medium", "High", "Critical")
+
+
+def parse_wallet_addresses(value: Union[str, Iterable[str], None]) -> Tuple[List[str], int]:
+    """
+    Normalize a submitted wallet list
+
+    Accepts a list of addresses or a single string separated by commas,
+    semicolons or whitespace. Blank entries are dropped and duplicates
+    removed, keeping the first occurrence.
+
+    Args:
+        value: Submitted wallet addresses
+
+    Returns:
+        (unique addresses in submission order, number of duplicates removed)
+    """
+    if value is None:
+        return [], 0
+    if isinstance(value, str):
+        value = re.split(r"[\s,;]+", value)
+
+    addresses = [str(address).strip() for address in value]
+    addresses = [address for address in addresses if address]
+    unique = list(dict.fromkeys(addresses))
+    return unique, len(addresses) - len(unique)
+
+
+@timed(STAGE_SECONDS, "batch_screening")
+def screen_wallets(
+    wallet_addresses: List[str],
+    progress: Optional[Callable[[str], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetch, score and report every wallet deterministically (blocking)
+
+    Wallets are summarized concurrently through the shared analyzer, so
+    transaction details common to several wallets come from the shared
+    transaction cache, and all wallets are scored in one vectorized pass.
+
+    Args:
+        wallet_addresses: Unique wallet addresses
+        progress: Called with the job stage once scoring starts
+
+    Returns:
+        One entry per wallet with its deterministic report and whether it
+        is flagged for escalation to the crew
+    """
+    network = os.getenv("NETWORK", "Preprod").lower()
+    analyzer = get_analyzer(network)
+    max_transactions = settings.blockchain_max_transactions or None
+
+    def summarize(address: str) -> Optional[Dict[str, Any]]:
+        try:
+            summary, _ = analyzer.summarize_wallet(address, max_transactions)
+            return summary
+        except Exception as e:
+            logger.error("Failed to fetch data for %s...: %s", address[:10], e)
+            return None
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, settings.batch_wallet_concurrency),
+        thread_name_prefix="batch"
+    ) as executor:
+        summaries = list(executor.map(summarize, wallet_addresses))
+
+    if progress is not None:
+        progress(STAGE_SCORING)
+
+    fetched = np.array([summary is not None for summary in summaries], dtype=bool)
+    # Rules are evaluated for all wallets in one pass (see analyzer.INDICATOR_RULES)
+    analyses, scores = analyzer.build_analyses([summary or {"count": 0} for summary in summaries])
+
+    # Same rule as fast_path.is_clear_cut: every indicator adds points, so
+    # a wallet has no indicators exactly when it scores the base score
+    live = analyzer.api is not None
+    clear_cut = fetched & live & (
+        ((scores <= settings.fast_path_low_max) & (scores == BASE_RISK_SCORE))
+        | (scores >= settings.fast_path_critical_min)
+    )
+
+    data_source = "blockfrost" if live else "mock"
+    screened = []
+    for index, address in enumerate(wallet_addresses):
+        if not fetched[index]:
+            screened.append({
+                "wallet_address": address,
+                "status": "error",
+                "error": "Blockchain data unavailable",
+                "flagged": False
+            })
+            continue
+
+        blockchain_data = {
+            "analysis": analyses[index],
+            "risk_score": int(scores[index]),
+            "data_source": data_source
+        }
+        screened.append({
+            "wallet_address": address,
+            "status": "screened",
+            "flagged": bool(not clear_cut[index]),
+            "report": build_deterministic_report(address, blockchain_data)
+        })
+
+    logger.info(
+        "Screened %s wallets: %s flagged for review",
+        len(wallet_addresses), int(np.count_nonzero(~clear_cut & fetched))
+    )
+    return screened
+
+
+# Why a flagged wallet kept its deterministic report
+SKIPPED_OVER_LIMIT = "batch escalation limit reached"
+SKIPPED_SATURATED = "analysis queue saturated"
+
+
+async def _escalate(entry: Dict[str, Any], slots: asyncio.Semaphore) -> None:
+    """Replace a flagged wallet's deterministic report with the crew's"""
+    async with slots:
+        # Other jobs may have filled the pool since the batch was accepted
+        if analysis_pool.is_saturated():
+            entry["escalation_skipped"] = SKIPPED_SATURATED
+            return
+
+        address = entry["wallet_address"]
+        entry["escalated"] = True
+        try:
+            key = await result_cache.key_for_wallet(address)
+            entry["report"] = await result_cache.get_or_compute(
+                key,
+                lambda: analysis_pool.run(run_crew, address)
+            )
+        except Exception as e:
+            # Keep the deterministic report rather than failing the batch
+            logger.error("Crew analysis failed for %s...: %s", address[:10], e)
+            entry["crew_error"] = str(e)
+
+
+def build_batch_report(screened: List[Dict[str, Any]], duplicates_removed: int) -> Dict[str, Any]:
+    """
+    Combine per-wallet results into one batch report
+
+    Args:
+        screened: Entries from screen_wallets, after escalation
+        duplicates_removed: Duplicate addresses dropped from the submission
+
+    Returns:
+        Batch report with a risk overview and per-wallet results
+    """
+    wallets = []
+    distribution = {category: 0 for category in RISK_CATEGORIES}
+    for entry in screened:
+        result = {"wallet_address": entry["wallet_address"], "status": entry["status"]}
+        report = entry.get("report")
+        if report is None:
+            result["error"] = entry["error"]
+        else:
+            score = report.get("risk_score")
+            category = report.get("risk_category") or (risk_category(score) if score is not None else None)
+            result.update({
+                "risk_score": score,
+                "risk_category": category,
+                "compliance_status": report.get("compliance_status"),
+                "analysis_method": report.get("analysis_method", "crew"),
+                "flagged": entry["flagged"],
+                "escalated": entry.get("escalated", False),
+                "report": report
+            })
+            if entry.get("crew_error"):
+                result["crew_error"] = entry["crew_error"]
+            if entry.get("escalation_skipped"):
+                result["escalation_skipped"] = entry["escalation_skipped"]
+            if category in distribution:
+                distribution[category] += 1
+        wallets.append(result)
+
+    scored = [wallet for wallet in wallets if isinstance(wallet.get("risk_score"), (int, float))]
+    highest_risk = sorted(scored, key=lambda wallet: wallet["risk_score"], reverse=True)[:HIGHEST_RISK_LISTED]
+
+    batch_report = {
+        "report_type": JOB_TYPE_BATCH,
+        "analysis_timestamp": datetime.now(timezone.utc).isoformat(),
+        "wallet_count": len(wallets),
+        "duplicates_removed": duplicates_removed,
+        "flagged_count": sum(1 for entry in screened if entry["flagged"]),
+        "escalated_count": sum(1 for entry in screened if entry.get("escalated")),
+        "escalation_skipped_count": sum(1 for entry in screened if entry.get("escalation_skipped")),
+        "failed_count": sum(1 for wallet in wallets if wallet["status"] == "error"),
+        "risk_distribution": distribution,
+        "highest_risk": [
+            {key: wallet[key] for key in ("wallet_address", "risk_score", "risk_category")}
+            for wallet in highest_risk
+        ],
+        "wallets": wallets
+    }
+    batch_report["report_hash"] = hashlib.sha256(
+        json.dumps(batch_report, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return batch_report
+
+
+async def execute_batch_task(
+    wallet_addresses: List[str],
+    duplicates_removed: int = 0,
+    progress: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Screen a batch of wallets and escalate flagged ones to the crew
+
+    At most BATCH_MAX_ESCALATIONS flagged wallets (highest scores first)
+    go to the crew, BATCH_ESCALATION_CONCURRENCY at a time, and none while
+    the analysis pool is saturated; the rest keep their deterministic
+    reports, marked with the reason.
+
+    Args:
+        wallet_addresses: Unique wallet addresses
+        duplicates_removed: Duplicates dropped at submission (for the report)
+        progress: Called with job stages as the batch advances
+
+    Returns:
+        Combined batch report
+    """
+    logger.info("Starting batch screening of %s wallets", len(wallet_addresses))
+
+    # Fetching and scoring block, so keep them off the event loop
+    screened = await analysis_pool.run(screen_wallets, wallet_addresses, progress)
+
+    flagged = [entry for entry in screened if entry["flagged"]]
+    if flagged and settings.analysis_mode != MODE_DETERMINISTIC:
+        if progress is not None:
+            progress(STAGE_ANALYZING)
+        flagged.sort(key=lambda entry: entry["report"]["risk_score"], reverse=True)
+        limit = max(settings.batch_max_escalations, 0)
+        for entry in flagged[limit:]:
+            entry["escalation_skipped"] = SKIPPED_OVER_LIMIT
+        flagged = flagged[:limit]
+
+        logger.info("Escalating %s flagged wallets to the crew", len(flagged))
+        slots = asyncio.Semaphore(max(settings.batch_escalation_concurrency, 1))
+        await asyncio.gather(*(_escalate(entry, slots) for entry in flagged))
+
+    return build_batch_report(screened, duplicates_removed)
@@ -13,12 +13,79 @@ class Settings:
         self.api_host: str = os.getenv("API_HOST", "0.0.0.0")
         self.api_port: int = int(os.getenv("API_PORT", "8000"))
         
+        # Logging Configuration
+        self.log_level: str = os.getenv("LOG_LEVEL", "INFO").upper()
+        self.log_format: str = os.getenv("LOG_FORMAT", "text").lower()  # text, json
+        self.log_mode: str = os.getenv("LOG_MODE", "queue").lower()  # queue (background writer), sync
+        self.log_queue_size: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records; 0 = unbounded
+        self.log_sample_rates: str = os.getenv("LOG_SAMPLE_RATES", "")  # e.g. services.payment.poller=0.1
+        
         # OpenAI Configuration
         self.openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
         
         # Blockfrost Configuration
         self.blockfrost_project_id: Optional[str] = os.getenv("BLOCKFROST_PROJECT_ID")
         self.network: str = os.getenv("NETWORK", "preprod")
+        self.blockfrost_base_url: str = os.getenv("BLOCKFROST_BASE_URL", "")  # "" = public Blockfrost for NETWORK
+        self.blockfrost_max_concurrency: int = int(os.getenv("BLOCKFROST_MAX_CONCURRENCY", "8"))
+        self.blockfrost_max_connections: int = int(os.getenv("BLOCKFROST_MAX_CONNECTIONS", "16"))  # per host, whole process
+        self.blockfrost_max_retries: int = int(os.getenv("BLOCKFROST_MAX_RETRIES", "3"))  # on 429/5xx/transport errors
+        self.blockfrost_http2: bool = os.getenv("BLOCKFROST_HTTP2", "true").lower() == "true"  # needs h2 (httpx[http2])
+        self.blockfrost_rate_limit: float = float(os.getenv("BLOCKFROST_RATE_LIMIT", "10"))  # requests/sec per project, all processes
+        self.blockfrost_burst: int = int(os.getenv("BLOCKFROST_BURST", "500"))
+        self.blockfrost_limiter_backend: str = os.getenv("BLOCKFROST_LIMITER_BACKEND", "auto").lower()  # auto, mongo, file, local
+        self.blockfrost_limiter_path: str = os.getenv("BLOCKFROST_LIMITER_PATH", "cache/blockfrost_limiter.json")
+        self.blockchain_max_transactions: int = int(os.getenv("BLOCKCHAIN_MAX_TRANSACTIONS", "1000"))  # 0 = full history
+        
+        # Transaction Cache Configuration
+        self.tx_cache_backend: str = os.getenv("TX_CACHE_BACKEND", "auto").lower()  # auto, mongo, sqlite, off
+        self.tx_cache_path: str = os.getenv("TX_CACHE_PATH", "cache/transactions.sqlite")
+        self.wallet_sync_incremental: bool = os.getenv("WALLET_SYNC_INCREMENTAL", "true").lower() == "true"
+
+        # Counterparty Graph Configuration
+        self.counterparty_graph: bool = os.getenv("COUNTERPARTY_GRAPH", "false").lower() == "true"
+        self.counterparty_max_hops: int = int(os.getenv("COUNTERPARTY_MAX_HOPS", "3"))
+        self.counterparty_damping: float = float(os.getenv("COUNTERPARTY_DAMPING", "0.5"))  # taint kept per hop
+        self.counterparty_graph_path: str = os.getenv("COUNTERPARTY_GRAPH_PATH", "cache/counterparty_graph.npz")  # "" = not persisted
+
+        # Denylist Configuration
+        self.denylist_paths: str = os.getenv("DENYLIST_PATHS", "")  # comma-separated CSV/JSONL files
+        self.denylist_cache_dir: str = os.getenv("DENYLIST_CACHE_DIR", "cache/denylist")
+        self.denylist_reload_seconds: float = float(os.getenv("DENYLIST_RELOAD_SECONDS", "30"))
+        self.denylist_false_positive_rate: float = float(os.getenv("DENYLIST_FALSE_POSITIVE_RATE", "0.001"))
+        
+        # Analysis Pipeline Configuration
+        self.analysis_mode: str = os.getenv("ANALYSIS_MODE", "tiered").lower()  # crew, tiered, deterministic
+        self.fast_path_low_max: int = int(os.getenv("FAST_PATH_LOW_MAX", "20"))
+        self.fast_path_critical_min: int = int(os.getenv("FAST_PATH_CRITICAL_MIN", "76"))
+        self.analysis_max_workers: int = int(os.getenv("ANALYSIS_MAX_WORKERS", "4"))
+        self.analysis_max_queue: int = int(os.getenv("ANALYSIS_MAX_QUEUE", "20"))
+        self.batch_max_wallets: int = int(os.getenv("BATCH_MAX_WALLETS", "500"))
+        self.batch_wallet_concurrency: int = int(os.getenv("BATCH_WALLET_CONCURRENCY", "4"))
+        self.batch_max_escalations: int = int(os.getenv("BATCH_MAX_ESCALATIONS", "25"))  # crew runs per batch, highest scores first
+        self.batch_escalation_concurrency: int = int(os.getenv("BATCH_ESCALATION_CONCURRENCY", "2"))
+        self.prewarm_on_startup: bool = os.getenv("PREWARM_ON_STARTUP", "true").lower() == "true"
+        self.prewarm_crews: int = int(os.getenv("PREWARM_CREWS", "1"))  # crews built by the background pre-warm
+        
+        # Result Cache Configuration
+        self.result_cache_ttl_seconds: int = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))  # 0 = disabled
+        self.result_cache_lru_size: int = int(os.getenv("RESULT_CACHE_LRU_SIZE", "256"))
+        
+        # Job Queue Configuration
+        self.job_execution_mode: str = os.getenv("JOB_EXECUTION_MODE", "inline").lower()  # inline, queue
+        self.job_lease_seconds: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+        self.job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        self.job_max_queued: int = int(os.getenv("JOB_MAX_QUEUED", "100"))  # 0 = unlimited
+        self.worker_poll_interval: float = float(os.getenv("WORKER_POLL_INTERVAL", "2"))
+        self.worker_metrics_port: int = int(os.getenv("WORKER_METRICS_PORT", "0"))  # 0 = no /metrics server
+        
+        # Payment Polling Configuration
+        self.payment_poll_tick_seconds: float = float(os.getenv("PAYMENT_POLL_TICK_SECONDS", "2"))
+        self.payment_poll_min_interval: float = float(os.getenv("PAYMENT_POLL_MIN_INTERVAL", "10"))
+        self.payment_poll_max_interval: float = float(os.getenv("PAYMENT_POLL_MAX_INTERVAL", "300"))
+        self.payment_poll_max_checks: int = int(os.getenv("PAYMENT_POLL_MAX_CHECKS", "25"))  # per tick
+        self.payment_poll_concurrency: int = int(os.getenv("PAYMENT_POLL_CONCURRENCY", "5"))
+        self.payment_monitor_lease_seconds: float = float(os.getenv("PAYMENT_MONITOR_LEASE_SECONDS", "60"))
         
         # Masumi Configuration
         self.agent_identifier: str = os.getenv("AGENT_IDENTIFIER", "")
@@ -2,9 +2,12 @@
 RiskLens AI Crew
 Orchestrates multiple agents for blockchain risk analysis
 """
+import time
 from crewai import Crew, Task
 from agents import TransactionAnalyzerAgent, RiskScorerAgent, ComplianceReporterAgent
 from core.logging import get_logger
+from core.metrics import CREW_TASK_SECONDS
+from services.blockchain.tools import pop_tool_failure
 
 logger = get_logger(__name__)
 
@@ -18,6 +21,7 @@ class RiskAnalysisCrew:
         """Initialize the crew with specialized agents"""
         self.verbose = verbose
         self.logger = logger_instance or logger
+        self._task_started = time.perf_counter()
         self.crew = self._create_crew()
         self.logger.info("RiskAnalysisCrew initialized for blockchain compliance analysis")
     
@@ -143,9 +147,34 @@ class RiskAnalysisCrew:
         # Create crew
         crew = Crew(
             agents=[transaction_analyzer, risk_scorer, compliance_reporter],
-            tasks=tasks
+            tasks=tasks,
+            task_callback=self._on_task_complete
         )
         
         self.logger.info("RiskLens AI crew setup completed")
         return crew
-
+    
+    def _on_task_complete(self, output) -> None:
+        """
+        Record how long the finished task took (tasks run sequentially)
+        
+        Raises the blockchain tool's error, if the task hit one, so the
+        remaining tasks do not run on missing data.
+        """
+        now = time.perf_counter()
+        agent = str(getattr(output, "agent", "") or "unknown").strip()
+        CREW_TASK_SECONDS.labels(agent).observe(now - self._task_started)
+        self._task_started = now
+        failure = pop_tool_failure()
+        if failure is not None:
+            raise failure
+    
+    def kickoff(self, inputs: dict):
+        """Run the crew, timing each task and failing if a tool failed"""
+        pop_tool_failure()
+        self._task_started = time.perf_counter()
+        result = self.crew.kickoff(inputs=inputs)
+        failure = pop_tool_failure()
+        if failure is not None:
+            raise failure
+        return result
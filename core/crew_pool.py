@@ -0,0 +1,124 @@
+"""
+Crew Pool
+Reusable RiskAnalysisCrew instances shared across jobs
+"""
+import json
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from core.config import settings
+from core.logging import get_logger
+from core.metrics import STAGE_SECONDS, timed
+
+if TYPE_CHECKING:
+    from core.crew import RiskAnalysisCrew
+
+logger = get_logger(__name__)
+
+
+class CrewPool:
+    """
+    Pool of pre-built RiskAnalysisCrew instances
+
+    Building a crew creates three agents, the blockchain tool, all tasks
+    and the LLM clients. The pool builds at most max_size crews (one per
+    analysis worker) and hands each to a single job at a time, so jobs
+    never share a crew concurrently. A crew whose run raised is discarded
+    rather than returned to the pool. crewai is only imported when the
+    first crew is built.
+    """
+
+    def __init__(self, max_size: int, verbose: bool = True):
+        self.max_size = max(1, max_size)
+        self.verbose = verbose
+        self._idle: List["RiskAnalysisCrew"] = []
+        self._created = 0
+        self._available = threading.Condition()
+
+    def _checkout(self) -> "RiskAnalysisCrew":
+        with self._available:
+            # Every crew is busy; wait until one is returned, or discarded
+            # (which frees a slot to build a replacement)
+            while not self._idle and self._created >= self.max_size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+
+        try:
+            from core.crew import RiskAnalysisCrew
+            return RiskAnalysisCrew(verbose=self.verbose, logger_instance=logger)
+        except Exception:
+            self._discard()
+            raise
+
+    def _return(self, crew: "RiskAnalysisCrew") -> None:
+        with self._available:
+            self._idle.append(crew)
+            self._available.notify()
+
+    def _discard(self) -> None:
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    @contextmanager
+    def acquire(self) -> Iterator["RiskAnalysisCrew"]:
+        """Borrow a crew for the duration of one job"""
+        crew = self._checkout()
+        try:
+            yield crew
+        except Exception:
+            self._discard()
+            logger.warning("Discarding crew after failed run")
+            raise
+        else:
+            self._return(crew)
+
+    def warm(self, count: int = 1, stop: Optional[threading.Event] = None) -> None:
+        """Pre-build crews so the first jobs skip construction (until stop is set)"""
+        crews = []
+        for _ in range(min(count, self.max_size)):
+            if stop is not None and stop.is_set():
+                break
+            crews.append(self._checkout())
+        for crew in crews:
+            self._return(crew)
+        logger.info("Crew pool warmed with %s crews", len(crews))
+
+    def stats(self) -> dict:
+        with self._available:
+            return {"max_size": self.max_size, "created": self._created, "idle": len(self._idle)}
+
+
+# Global crew pool instance, one crew per analysis worker
+crew_pool = CrewPool(max_size=settings.analysis_max_workers)
+
+
+@timed(STAGE_SECONDS, "crew")
+def run_crew(wallet_address: str) -> Dict[str, Any]:
+    """
+    Run the LLM crew for a wallet on a pooled crew (blocking)
+
+    Args:
+        wallet_address: Wallet address to analyze
+
+    Returns:
+        Parsed compliance report, or {"result": raw_text} if it is not JSON
+    """
+    inputs = {"wallet_address": wallet_address}
+    with crew_pool.acquire() as crew:
+        result = crew.kickoff(inputs)
+
+    logger.info("Analysis completed successfully")
+
+    # Extract the raw result
+    result_raw = result.raw if hasattr(result, "raw") else str(result)
+
+    # Try to parse as JSON
+    try:
+        return json.loads(result_raw)
+    except (json.JSONDecodeError, TypeError):
+        logger.warning("Result is not valid JSON, returning as text")
+        return {"result": result_raw}
@@ -0,0 +1,195 @@
+"""
+Deterministic Fast Path
+Templated compliance reports for wallets whose risk is clear-cut
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, Optional
+
+from core.config import settings
+from core.logging import get_logger
+from core.metrics import STAGE_SECONDS, timed
+from services.blockchain.analyzer import get_blockchain_data
+from services.storage.job_events import STAGE_SCORING
+
+logger = get_logger(__name__)
+
+# Analysis modes
+MODE_CREW = "crew"                    # Always run the LLM crew
+MODE_TIERED = "tiered"                # Fast path for clear-cut wallets, crew otherwise
+MODE_DETERMINISTIC = "deterministic"  # Never run the crew
+
+LOVELACE_PER_ADA = 1_000_000
+
+# Compliance status, closing sentence of the summary and recommendations per risk category
+COMPLIANCE_GUIDANCE = {
+    "Low": (
+        "Compliant",
+        "No action is required.",
+        [
+            "Wallet shows normal behavior patterns",
+            "No immediate concerns identified",
+            "Continue standard monitoring"
+        ]
+    ),
+    "Medium": (
+        "Requires Review",
+        "This wallet requires enhanced due diligence.",
+        [
+            "Perform enhanced due diligence on the wallet owner",
+            "Review the flagged activity before approving further transactions",
+            "Continue enhanced monitoring"
+        ]
+    ),
+    "High": (
+        "Non-Compliant",
+        "Funds should be held pending manual compliance review.",
+        [
+            "Block or hold funds pending manual compliance review",
+            "Perform enhanced due diligence on the wallet owner",
+            "File a suspicious activity report if required by your jurisdiction"
+        ]
+    )
+}
+COMPLIANCE_GUIDANCE["Critical"] = COMPLIANCE_GUIDANCE["High"]
+
+
+def risk_category(score: int) -> str:
+    """Map a 0-100 risk score to the category bands used by the crew"""
+    if score <= 20:
+        return "Low"
+    if score <= 50:
+        return "Medium"
+    if score <= 75:
+        return "High"
+    return "Critical"
+
+
+def is_clear_cut(blockchain_data: Dict[str, Any]) -> bool:
+    """
+    Decide whether a wallet can skip the LLM crew
+
+    Only live (non-mock) data qualifies. Low wallets must score at or
+    below FAST_PATH_LOW_MAX with no risk indicators at all; Critical
+    wallets must score at or above FAST_PATH_CRITICAL_MIN.
+    """
+    if blockchain_data.get("data_source") != "blockfrost":
+        return False
+
+    score = blockchain_data["risk_score"]
+    indicators = blockchain_data["analysis"].get("risk_indicators", [])
+
+    if score <= settings.fast_path_low_max and not indicators:
+        return True
+    return score >= settings.fast_path_critical_min
+
+
+def build_deterministic_report(wallet_address: str, blockchain_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a compliance report from deterministic analysis
+
+    The report follows the JSON schema the compliance reporter agent
+    produces, so it is formatted and stored the same way.
+
+    Args:
+        wallet_address: Analyzed wallet address
+        blockchain_data: Result of get_blockchain_data
+
+    Returns:
+        Compliance report dictionary
+    """
+    analysis = blockchain_data["analysis"]
+    score = blockchain_data["risk_score"]
+    category = risk_category(score)
+    indicators = analysis.get("risk_indicators", [])
+
+    risk_factors = [
+        {
+            "factor": indicator["type"].replace("_", " ").title(),
+            "severity": indicator["severity"].title(),
+            "description": indicator["description"],
+            "impact": f"Raises risk score ({indicator['severity']} severity indicator)"
+        }
+        for indicator in indicators
+    ]
+
+    compliance_status, action, recommendations = COMPLIANCE_GUIDANCE[category]
+    if indicators:
+        executive_summary = (
+            f"Automated screening flagged {len(indicators)} risk indicators across "
+            f"{analysis['total_transactions']} transactions ({category} risk). {action}"
+        )
+    else:
+        executive_summary = (
+            f"This wallet shows normal activity across {analysis['total_transactions']} transactions "
+            f"with no risk indicators detected by automated screening. {action}"
+        )
+    suspicious_activities = [
+        {
+            "activity": indicator["description"],
+            "severity": indicator["severity"].title(),
+            "evidence": f"Deterministic indicator: {indicator['type']}"
+        }
+        for indicator in indicators
+    ]
+
+    report = {
+        "wallet_address": wallet_address,
+        "analysis_timestamp": datetime.now(timezone.utc).isoformat(),
+        "risk_score": score,
+        "risk_category": category,
+        "trust_score": 100 - score,
+        "executive_summary": executive_summary,
+        "transaction_summary": {
+            "total_transactions": analysis["total_transactions"],
+            "total_volume": f"{analysis['total_volume'] / LOVELACE_PER_ADA:,.2f} ADA",
+            "active_period": analysis.get("time_span", "N/A"),
+            "counterparties": "N/A"
+        },
+        "risk_factors": risk_factors,
+        "suspicious_activities": suspicious_activities,
+        "recommendations": list(recommendations),
+        "compliance_status": compliance_status,
+        "confidence_level": "High",
+        "analysis_method": "deterministic"
+    }
+    report["report_hash"] = hashlib.sha256(
+        json.dumps(report, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    return report
+
+
+@timed(STAGE_SECONDS, "fast_path")
+def run_fast_path(
+    wallet_address: str,
+    mode: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Try to produce a report without the LLM crew
+
+    Args:
+        wallet_address: Wallet address to analyze
+        mode: Analysis mode (defaults to ANALYSIS_MODE)
+        progress: Called with the job stage once the wallet is scored deterministically
+
+    Returns:
+        Deterministic report, or None when the wallet must escalate to the crew
+    """
+    mode = mode or settings.analysis_mode
+    if mode == MODE_CREW:
+        return None
+
+    blockchain_data = get_blockchain_data(wallet_address)
+    if mode == MODE_DETERMINISTIC or is_clear_cut(blockchain_data):
+        if progress is not None:
+            progress(STAGE_SCORING)
+        logger.info(
+            "Fast path report for %s... (score %s, mode %s)",
+            wallet_address[:10], blockchain_data["risk_score"], mode
+        )
+        return build_deterministic_report(wallet_address, blockchain_data)
+
+    logger.info("Escalating %s... to crew (score %s)", wallet_address[:10], blockchain_data['risk_score'])
+    return None
@@ -0,0 +1,135 @@
+"""
+Job Queue Worker
+Drains paid jobs from the MongoDB queue in a separate process
+"""
+import asyncio
+import os
+import socket
+import threading
+import uuid
+from typing import Any, Dict, Optional, Set
+
+from core.config import settings
+from core.logging import get_logger
+from core.jobs import process_job
+from services.storage.mongo_store import mongo_store
+
+logger = get_logger(__name__)
+
+# Sweep abandoned jobs every this many polls
+SWEEP_EVERY_POLLS = 30
+
+# Retry delay after a heartbeat write fails
+HEARTBEAT_RETRY_SECONDS = 5
+
+
+class JobWorker:
+    """
+    Claims queued jobs with leases and runs them
+
+    Each claimed job's lease is renewed by a heartbeat while it runs, so
+    if the worker dies the job becomes claimable again once the lease
+    expires. Run any number of workers against the same database.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[int] = None
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.concurrency = concurrency or settings.analysis_max_workers
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self._active: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; running jobs are allowed to finish"""
+        logger.info("Worker %s stopping", self.worker_id)
+        self._stopping.set()
+
+    async def _heartbeat(self, job_id: str, job_task: asyncio.Task, cancel: threading.Event) -> None:
+        """
+        Renew the job lease until cancelled
+
+        A failed renewal is retried (the lease stays valid until it
+        expires); once another worker holds the lease the job is cancelled
+        here so it is not processed twice. Cancelling the task only stops
+        the coroutine, so cancel is set as well to stop the analysis
+        thread at its next stage.
+        """
+        interval = max(self.lease_seconds / 3, 1)
+        delay = interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                renewed = await mongo_store.heartbeat_job(job_id, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                logger.warning("Heartbeat for job %s failed, retrying: %s", job_id, e)
+                delay = min(interval, HEARTBEAT_RETRY_SECONDS)
+                continue
+            if not renewed:
+                logger.warning("Worker %s lost lease on job %s, cancelling it", self.worker_id, job_id)
+                cancel.set()
+                job_task.cancel()
+                return
+            delay = interval
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        cancel = threading.Event()
+        job_task = asyncio.create_task(process_job(job_id, job["payment_id"], job, self.worker_id, cancel))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, job_task, cancel))
+        try:
+            await job_task
+        except asyncio.CancelledError:
+            cancel.set()
+            # Hand the job back for another claim (or the exhausted-job
+            # sweep) unless its new owner or a final status already has it
+            await asyncio.shield(mongo_store.release_job(job_id, self.worker_id))
+            # Cancelled by the heartbeat (lease lost) rather than by shutdown
+            if heartbeat.done() and not heartbeat.cancelled():
+                return
+            raise
+        finally:
+            heartbeat.cancel()
+
+    async def run(self) -> None:
+        """Poll the queue until stopped"""
+        await mongo_store.connect()
+        logger.info("Worker %s started (concurrency %s)", self.worker_id, self.concurrency)
+
+        polls = 0
+        try:
+            while not self._stopping.is_set():
+                polls += 1
+                if polls % SWEEP_EVERY_POLLS == 0:
+                    await mongo_store.fail_exhausted_jobs(settings.job_max_attempts)
+
+                if len(self._active) >= self.concurrency:
+                    await asyncio.wait(self._active, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                job = await mongo_store.claim_job(
+                    self.worker_id,
+                    self.lease_seconds,
+                    settings.job_max_attempts
+                )
+                if job is None:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), timeout=settings.worker_poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                task = asyncio.create_task(self._run_job(job))
+                self._active.add(task)
+                task.add_done_callback(self._active.discard)
+
+            if self._active:
+                logger.info("Worker %s waiting for %s running jobs", self.worker_id, len(self._active))
+                await asyncio.gather(*self._active, return_exceptions=True)
+        finally:
+            await mongo_store.disconnect()
+            logger.info("Worker %s stopped", self.worker_id)
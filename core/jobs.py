@@ -0,0 +1,177 @@
+"""
+Job Execution
+Runs paid analysis jobs and submits their results to Masumi
+"""
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from core.logging import get_logger
+from core.batch_screening import JOB_TYPE_BATCH, execute_batch_task
+from core.crew_pool import run_crew
+from core.fast_path import run_fast_path
+from core.worker_pool import analysis_pool
+from services.storage.mongo_store import mongo_store
+from services.storage.job_events import STAGE_ANALYZING, STAGE_FETCHING, STAGE_REPORTING
+from services.storage.result_cache import result_cache
+from services.payment.masumi_service import payment_service
+from api.formatters import format_result_for_display
+
+logger = get_logger(__name__)
+
+
+class JobCancelled(Exception):
+    """Raised in an analysis thread at a stage boundary once its job was cancelled"""
+
+
+def run_analysis(wallet_address: str, progress: Optional[Callable[[str], None]] = None) -> dict:
+    """Run the blocking analysis pipeline (called on the analysis pool)"""
+    # Clear-cut wallets get a deterministic report without the LLM crew
+    report = run_fast_path(wallet_address, progress=progress)
+    if report is not None:
+        logger.info("Analysis completed via deterministic fast path")
+        return report
+    
+    if progress is not None:
+        progress(STAGE_ANALYZING)
+    return run_crew(wallet_address)
+
+
+async def execute_crew_task(
+    input_data: dict,
+    progress: Optional[Callable[[str], None]] = None
+) -> dict:
+    """Execute RiskLens AI analysis for wallet compliance and risk scoring"""
+    wallet_address = input_data.get("wallet_address", "")
+    logger.info("Starting analysis for wallet: %s", wallet_address)
+    
+    # Reuse a recent report while the wallet has no new transactions
+    key = await result_cache.key_for_wallet(wallet_address)
+    
+    # Analysis blocks (CrewAI, Blockfrost), so keep it off the event loop
+    return await result_cache.get_or_compute(
+        key,
+        lambda: analysis_pool.run(run_analysis, wallet_address, progress)
+    )
+
+
+async def process_job(
+    job_id: str,
+    payment_id: str,
+    job: Optional[Dict[str, Any]] = None,
+    worker_id: Optional[str] = None,
+    cancel: Optional[threading.Event] = None
+) -> None:
+    """
+    Run the analysis for a paid job and submit the result
+    
+    Works in the API process (inline mode) and in queue workers, where
+    the payment instance is rebuilt from the stored job.
+    
+    Args:
+        job_id: Job identifier
+        payment_id: Payment blockchain identifier
+        job: Stored job document (fetched when not given)
+        worker_id: Queue worker holding the job's lease; the result is
+            only submitted and stored while the lease is still held
+        cancel: Set when the job must stop; the analysis thread checks it
+            at every stage boundary, since cancelling the task does not
+            stop a thread that is already running
+    """
+    async def finish(updates: Dict[str, Any]) -> bool:
+        # A job that was failed, finished or reclaimed meanwhile is left alone
+        return await mongo_store.transition_job(job_id, "running", updates, worker_id=worker_id)
+    
+    try:
+        if job is None:
+            job = await mongo_store.get_job(job_id)
+            if not job:
+                logger.error("Job %s not found", job_id)
+                return
+        
+        if not payment_service.has_payment_instance(job_id):
+            payment_service.restore_payment_instance(job_id, job)
+        
+        # Stage updates come from analysis threads, so hop back to the loop
+        loop = asyncio.get_running_loop()
+        
+        def report_stage(stage: str) -> None:
+            if cancel is not None and cancel.is_set():
+                raise JobCancelled(f"Job {job_id} was cancelled before {stage}")
+            asyncio.run_coroutine_threadsafe(mongo_store.update_job(job_id, {"stage": stage}), loop)
+        
+        # Execute the AI task
+        logger.info("Starting CrewAI analysis")
+        await mongo_store.update_job(job_id, {"stage": STAGE_FETCHING})
+        if job.get("job_type") == JOB_TYPE_BATCH:
+            result_dict = await execute_batch_task(
+                job["wallet_addresses"],
+                job.get("duplicates_removed", 0),
+                report_stage
+            )
+        else:
+            result_dict = await execute_crew_task(job["input_data"], report_stage)
+        logger.info("Analysis completed for job %s", job_id)
+        await mongo_store.update_job(job_id, {"stage": STAGE_REPORTING})
+        
+        # Format result
+        result_string = format_result_for_display(result_dict)
+        
+        # Another worker may have reclaimed the job while it ran
+        if worker_id is not None and not await mongo_store.holds_job(job_id, worker_id):
+            logger.warning("Worker %s no longer holds job %s, not submitting its result", worker_id, job_id)
+            return
+        
+        # Submit result to Masumi
+        logger.info("Submitting result to Masumi (length: %s chars)", len(result_string))
+        
+        try:
+            completion_response = await payment_service.complete_payment(
+                job_id,
+                payment_id,
+                result_string
+            )
+            
+            # Check if submission was successful
+            if completion_response and completion_response.get("status") == "success":
+                result_hash = completion_response.get('data', {}).get('resultHash', 'N/A')
+                logger.info("Result submitted successfully. Hash: %s", result_hash)
+                
+                # Update job status
+                await finish({
+                    "status": "completed",
+                    "payment_status": "result_submitted",
+                    "result": result_dict,
+                    "result_hash": result_hash
+                })
+            else:
+                logger.error("Result submission failed: %s", completion_response)
+                await finish({
+                    "status": "failed",
+                    "error": f"Result submission failed: {completion_response}"
+                })
+                
+        except Exception as submit_error:
+            logger.error("Exception during result submission: %s", submit_error)
+            await finish({
+                "status": "failed",
+                "error": f"Result submission error: {str(submit_error)}"
+            })
+            raise
+
+        # Stop monitoring payment status
+        payment_service.stop_monitoring(job_id)
+            
+    except Exception as e:
+        logger.error("Error processing job %s: %s", job_id, e)
+        
+        # Update job status
+        await finish({
+            "status": "failed",
+            "error": str(e)
+        })
+        
+        # Stop monitoring
+        payment_service.stop_monitoring(job_id)
+
+
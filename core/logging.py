@@ -2,50 +2,177 @@
 Logging Configuration
 Centralized logging setup for RiskLens AI
 """
+import atexit
+import copy
+import itertools
+import json
 import logging
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Dict, Optional
+
+from core.config import settings
+
+ROOT_LOGGER = "risklens_ai"
+
+_listener: Optional[QueueListener] = None
+_traceback_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps one in every N records below WARNING for the configured modules
+
+    Rates map module prefixes (relative to the risklens_ai logger, e.g.
+    "services.payment.poller") to the fraction of records kept; the most
+    specific prefix wins. Warnings and errors are never sampled.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rules = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self._counters = {prefix: itertools.count() for prefix in rates}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rules:
+            return True
+        name = record.name[len(ROOT_LOGGER) + 1:] if record.name.startswith(ROOT_LOGGER + ".") else record.name
+        for prefix, rate in self.rules:
+            if name == prefix or name.startswith(prefix + "."):
+                if rate <= 0:
+                    return False
+                return next(self._counters[prefix]) % max(1, round(1 / rate)) == 0
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records rather than block when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may change after the call returns), but keep
+        # the traceback separate so the listener's formatter places it
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse "module=rate,module=rate"; malformed entries are ignored"""
+    rates = {}
+    for item in value.split(","):
+        prefix, _, rate = item.partition("=")
+        try:
+            rates[prefix.strip()] = min(1.0, float(rate))
+        except ValueError:
+            continue
+    rates.pop("", None)
+    return rates
+
 
 def setup_logging() -> logging.Logger:
-    """Setup application logging with file and console handlers"""
+    """
+    Setup application logging with file and console handlers
+
+    In the default queue mode (LOG_MODE=queue) loggers only put records on
+    an in-memory queue, and a listener thread does the formatting and the
+    file/stdout writes, so a slow disk or pipe never stalls the event loop.
+    LOG_MODE=sync writes from the calling thread as before.
+    """
+    global _listener
+
     # Create logs directory
     log_dir = Path("logs")
     log_dir.mkdir(exist_ok=True)
-    
+
     # Configure root logger
-    logger = logging.getLogger("risklens_ai")
-    logger.setLevel(logging.INFO)
-    
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(settings.log_level)
+
     # Prevent duplicate handlers
     if logger.handlers:
         return logger
-    
+
     # File handler with rotation
     file_handler = RotatingFileHandler(
         log_dir / "risklens_ai.log",
         maxBytes=10_000_000,  # 10MB
         backupCount=5
     )
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    file_handler.setFormatter(file_formatter)
-    
+
     # Console handler for Railway (stdout)
     console_handler = logging.StreamHandler(sys.stdout)
-    console_formatter = logging.Formatter(
-        '%(levelname)s - %(message)s'
-    )
-    console_handler.setFormatter(console_formatter)
-    
+
+    if settings.log_format == "json":
+        file_handler.setFormatter(JsonFormatter())
+        console_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        ))
+        console_handler.setFormatter(logging.Formatter(
+            '%(levelname)s - %(message)s'
+        ))
+
+    sampling = SamplingFilter(parse_sample_rates(settings.log_sample_rates))
+
     # Add handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+    if settings.log_mode == "queue":
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=max(0, settings.log_queue_size)))
+        # Sample before enqueueing so skipped records are never formatted
+        queue_handler.addFilter(sampling)
+        _listener = QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        logger.addHandler(queue_handler)
+    else:
+        for handler in (file_handler, console_handler):
+            handler.addFilter(sampling)
+            logger.addHandler(handler)
+
     return logger
 
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger instance for a specific module"""
-    return logging.getLogger(f"risklens_ai.{name}")
-
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
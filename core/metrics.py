@@ -0,0 +1,132 @@
+"""
+Metrics
+Prometheus instrumentation for the analysis pipeline
+"""
+import functools
+import inspect
+import time
+from typing import Any, Callable, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# From single Mongo reads (milliseconds) up to full crew runs (minutes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "risklens_stage_seconds",
+    "Time spent in analysis pipeline stages",
+    ["stage"],
+    buckets=LATENCY_BUCKETS
+)
+BLOCKFROST_REQUEST_SECONDS = Histogram(
+    "risklens_blockfrost_request_seconds",
+    "Blockfrost call latency by endpoint, including retries and rate-limit waits",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS
+)
+BLOCKFROST_THROTTLE_SECONDS = Histogram(
+    "risklens_blockfrost_throttle_seconds",
+    "Time Blockfrost requests waited for the rate limiter",
+    buckets=LATENCY_BUCKETS
+)
+BLOCKFROST_RETRIES = Counter(
+    "risklens_blockfrost_retries",
+    "Blockfrost requests retried, by status code or transport error",
+    ["reason"]
+)
+BLOCKFROST_COALESCED = Counter(
+    "risklens_blockfrost_coalesced",
+    "Blockfrost requests served by an identical request already in flight"
+)
+CREW_TASK_SECONDS = Histogram(
+    "risklens_crew_task_seconds",
+    "Duration of each crew task, by agent",
+    ["agent"],
+    buckets=LATENCY_BUCKETS
+)
+MONGO_OPERATION_SECONDS = Histogram(
+    "risklens_mongo_operation_seconds",
+    "MongoStore call latency by method",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+PAYMENT_OPERATION_SECONDS = Histogram(
+    "risklens_payment_operation_seconds",
+    "MasumiPaymentService call latency by method",
+    ["operation"],
+    buckets=LATENCY_BUCKETS
+)
+
+ANALYSIS_QUEUE_DEPTH = Gauge("risklens_analysis_queue_depth", "Analyses waiting for a worker")
+ANALYSIS_RUNNING = Gauge("risklens_analysis_running", "Analyses currently running")
+PAYMENT_INSTANCES = Gauge("risklens_payment_instances", "Payment instances held in memory")
+PAYMENTS_PENDING = Gauge("risklens_payments_pending", "Payments polled by the shared payment poller")
+CACHE_HIT_RATIO = Gauge("risklens_cache_hit_ratio", "Cache hit ratio since process start", ["cache"])
+BLOCKFROST_RATE_BUDGET = Gauge(
+    "risklens_blockfrost_rate_budget",
+    "Adaptive Blockfrost request rate (requests/second) shared by all processes"
+)
+BLOCKFROST_TOKENS = Gauge("risklens_blockfrost_tokens", "Requests left in the shared Blockfrost bucket at the last lease")
+DENYLIST_ENTRIES = Gauge("risklens_denylist_entries", "Addresses in the loaded denylist")
+
+
+def timed(histogram: Histogram, *labels: str) -> Callable:
+    """
+    Decorator recording a function's duration in a histogram
+
+    Works for plain and async functions; failed calls are recorded too.
+
+    Args:
+        histogram: Histogram to observe
+        *labels: Label values for the histogram
+    """
+    metric = histogram.labels(*labels) if labels else histogram
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    metric.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorator
+
+
+def instrument_methods(histogram: Histogram) -> Callable[[type], type]:
+    """
+    Class decorator timing every public method, labelled by method name
+
+    Generators and async generators are left alone, since their duration
+    is controlled by the consumer.
+
+    Args:
+        histogram: Histogram with a single label for the method name
+    """
+    def decorator(cls: type) -> type:
+        for name, member in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(member):
+                continue
+            if inspect.isgeneratorfunction(member) or inspect.isasyncgenfunction(member):
+                continue
+            setattr(cls, name, timed(histogram, name)(member))
+        return cls
+
+    return decorator
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,75 @@
+"""
+Subsystem Pre-warm
+Loads the heavy subsystems in the background once the process is serving
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def prewarm(build_crews: bool = True, stop: Optional[threading.Event] = None) -> None:
+    """
+    Import crewai and masumi, load the denylist and build the shared clients (blocking)
+
+    The API starts without these so health checks and the MIP-003 info
+    endpoints answer immediately; this runs afterwards on a worker thread
+    so the first paid job does not pay for the imports either. Failures
+    are logged per step and left for first use to surface.
+
+    Args:
+        build_crews: Also build PREWARM_CREWS pooled crews (skipped by API
+            processes that hand analyses to queue workers)
+        stop: Set on shutdown; checked between steps (and between crews),
+            so the thread finishes before the clients it uses are closed
+    """
+    stop = stop or threading.Event()
+    start = time.perf_counter()
+    steps = [("analyzer", _warm_analyzer), ("denylist", _warm_denylist), ("masumi", _warm_masumi)]
+    if build_crews and settings.prewarm_crews > 0:
+        steps.append(("crews", lambda: _warm_crews(stop)))
+    else:
+        steps.append(("crewai", _import_crewai))
+
+    warmed = []
+    for name, step in steps:
+        if stop.is_set():
+            logger.info("Pre-warm stopped before %s", name)
+            break
+        try:
+            step()
+            warmed.append(name)
+        except Exception as e:
+            logger.warning("Pre-warm of %s failed: %s", name, e)
+
+    logger.info("Pre-warmed %s in %.2fs", ", ".join(warmed) or "nothing", time.perf_counter() - start)
+
+
+def _warm_analyzer() -> None:
+    from services.blockchain.analyzer import get_analyzer
+    get_analyzer(os.getenv("NETWORK", "Preprod").lower())
+
+
+def _warm_denylist() -> None:
+    from services.blockchain.denylist import denylist
+    denylist.reload()
+
+
+def _warm_masumi() -> None:
+    import masumi.payment  # noqa: F401
+    from services.payment.masumi_service import payment_service
+    payment_service._ensure_config()
+
+
+def _warm_crews(stop: threading.Event) -> None:
+    from core.crew_pool import crew_pool
+    crew_pool.warm(settings.prewarm_crews, stop)
+
+
+def _import_crewai() -> None:
+    import core.crew  # noqa: F401
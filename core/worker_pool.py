@@ -0,0 +1,102 @@
+"""
+Analysis Worker Pool
+Runs blocking analysis work (CrewAI, Blockfrost) off the event loop
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class AnalysisPool:
+    """
+    Size-bounded thread pool for analysis jobs
+
+    At most max_workers analyses run at once; further submissions wait in
+    the executor queue. The pool reports itself saturated once max_queue
+    jobs are waiting, which callers use to reject new work.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="analysis"
+        )
+        self._pending = 0
+        self._running = 0
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> int:
+        """Jobs currently executing"""
+        with self._lock:
+            return self._running
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting for a free worker"""
+        with self._lock:
+            return self._pending - self._running
+
+    def is_saturated(self) -> bool:
+        """Whether the wait queue is full"""
+        return self.queue_depth >= self.max_queue
+
+    def _track(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+
+    def _on_done(self, future) -> None:
+        # Submissions cancelled before they started never reach _track
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking function on the pool and await its result
+
+        Args:
+            func: Blocking callable
+            *args: Positional arguments for func
+        """
+        with self._lock:
+            self._pending += 1
+        future = self._executor.submit(self._track, func, *args)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        """Current pool utilisation"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running
+            }
+
+    def shutdown(self) -> None:
+        """Stop accepting work and release worker threads"""
+        logger.info("Shutting down analysis pool")
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global analysis pool instance
+analysis_pool = AnalysisPool(
+    max_workers=settings.analysis_max_workers,
+    max_queue=settings.analysis_max_queue
+)
@@ -2,8 +2,10 @@
 RiskLens AI - Main Entry Point
 Blockchain Compliance & Risk Scoring Agent
 """
+import asyncio
 import os
 import sys
+import threading
 import uvicorn
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
@@ -12,12 +14,19 @@ from fastapi import FastAPI
 # Load environment variables FIRST before any imports that use them
 load_dotenv(override=True)
 
-# Import from modular structure (after .env is loaded)
+# Import from modular structure (after .env is loaded). crewai and masumi
+# are not imported here; they load on first use or in the background pre-warm
 from core.logging import setup_logging
 from core.config import settings
-from core.crew import RiskAnalysisCrew
+from core.prewarm import prewarm
+from core.worker_pool import analysis_pool
+from services.blockchain.client import blockfrost_http
+from services.blockchain.graph import load_counterparty_graph, save_counterparty_graph
 from services.storage.mongo_store import mongo_store
+from services.storage.job_events import job_events
+from services.payment.masumi_service import payment_service
 from api.routes import job_router, agent_router
+from api.routes.job_routes import payment_callbacks
 
 # Configure logging
 logger = setup_logging()
@@ -30,9 +39,30 @@ async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
     # Startup
     await mongo_store.connect()
+    await blockfrost_http.start()
+    job_events.start(mongo_store.jobs_collection)
+    await payment_service.rehydrate_monitoring(payment_callbacks)
+    await asyncio.to_thread(load_counterparty_graph)
+    prewarm_task = None
+    prewarm_stop = threading.Event()
+    if settings.prewarm_on_startup:
+        # Runs once the server is accepting requests
+        prewarm_task = asyncio.create_task(
+            asyncio.to_thread(prewarm, settings.job_execution_mode == "inline", prewarm_stop)
+        )
     logger.info("Application started successfully")
     yield
     # Shutdown
+    if prewarm_task is not None:
+        # Cancelling the task would leave its thread running against the
+        # clients closed below, so stop it and wait for the current step
+        prewarm_stop.set()
+        await asyncio.gather(prewarm_task, return_exceptions=True)
+    analysis_pool.shutdown()
+    await asyncio.to_thread(save_counterparty_graph)
+    await blockfrost_http.close()
+    await payment_service.close()
+    await job_events.stop()
     await mongo_store.disconnect()
     logger.info("Application shutdown complete")
 
@@ -67,6 +97,7 @@ def main():
     print(f"Analyzing Wallet: {input_data['wallet_address']}\n")
     
     # Initialize and run the crew
+    from core.crew import RiskAnalysisCrew
     crew = RiskAnalysisCrew(verbose=True)
     result = crew.crew.kickoff(inputs=input_data)
     
@@ -80,11 +111,44 @@ def main():
     sys.stderr.flush()
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Worker Mode
+# ─────────────────────────────────────────────────────────────────────────────
+def run_worker():
+    """Run a job queue worker that drains paid jobs from MongoDB"""
+    import signal
+    from core.job_worker import JobWorker
+    
+    os.environ['CREWAI_DISABLE_TELEMETRY'] = 'true'
+    worker = JobWorker()
+    
+    # Workers have no API, so expose their metrics on a separate port
+    if settings.worker_metrics_port:
+        from prometheus_client import start_http_server
+        start_http_server(settings.worker_metrics_port)
+        logger.info("Worker metrics on port %s", settings.worker_metrics_port)
+    
+    async def serve():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await blockfrost_http.start()
+        await asyncio.to_thread(load_counterparty_graph)
+        await worker.run()
+        await asyncio.to_thread(save_counterparty_graph)
+        await blockfrost_http.close()
+    
+    asyncio.run(serve())
+
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1 and sys.argv[1] == "api":
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        # Run queue worker mode
+        run_worker()
+    elif len(sys.argv) > 1 and sys.argv[1] == "api":
         # Run API mode
-        logger.info(f"Starting FastAPI server on {settings.api_host}:{settings.api_port}")
-        logger.info(f"API Documentation: http://{settings.api_host}:{settings.api_port}/docs")
+        logger.info("Starting FastAPI server on %s:%s", settings.api_host, settings.api_port)
+        logger.info("API Documentation: http://%s:%s/docs", settings.api_host, settings.api_port)
         
         uvicorn.run(app, host=settings.api_host, port=settings.api_port, log_level="info")
     else:
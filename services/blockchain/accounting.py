@@ -0,0 +1,173 @@
+"""
+Transaction Accounting
+Per-wallet net lovelace and native-asset flows from UTXO endpoints
+"""
+from typing import Dict, Any, Iterable, List, Tuple
+
+import numpy as np
+
+from services.blockchain.graph import Interner
+
+LOVELACE = "lovelace"
+
+# Pending asset deltas folded into a ledger's arrays at a time
+_COMPACT_EVERY = 4096
+
+# Per-asset deltas saturate at the int64 range
+_INT64_MAX = 2 ** 63 - 1
+
+# Deltas whose absolute values sum below this cannot overflow when added
+_SAFE_SUM = 2.0 ** 62
+
+# Process-wide asset unit (policy id + hex name) to id mapping
+asset_ids = Interner()
+
+
+def parse_endpoints(entries: List[Dict[str, Any]]) -> List[List[Any]]:
+    """
+    Aggregate the inputs or outputs of a /txs/{hash}/utxos body per address
+
+    Collateral and reference inputs (and collateral returns) do not move
+    value in a valid transaction and are skipped.
+
+    Args:
+        entries: Raw "inputs" or "outputs" entries
+
+    Returns:
+        [address, lovelace, [[unit, quantity], ...]] per address; the asset
+        list is empty for ADA-only endpoints
+    """
+    lovelace: Dict[str, int] = {}
+    assets: Dict[str, Dict[str, int]] = {}
+    for entry in entries:
+        if entry.get("collateral") or entry.get("reference"):
+            continue
+        address = entry["address"]
+        lovelace.setdefault(address, 0)
+        for amount in entry["amount"]:
+            quantity = int(amount["quantity"])
+            if amount["unit"] == LOVELACE:
+                lovelace[address] += quantity
+            else:
+                held = assets.setdefault(address, {})
+                held[amount["unit"]] = held.get(amount["unit"], 0) + quantity
+    return [
+        [address, total, [[unit, quantity] for unit, quantity in assets.get(address, {}).items()]]
+        for address, total in lovelace.items()
+    ]
+
+
+def implied_fee(inputs: List[List[Any]], outputs: List[List[Any]]) -> int:
+    """
+    Lovelace a transaction consumed: its inputs minus its outputs
+
+    This is the fee, unless the transaction also paid or refunded a
+    deposit or withdrew rewards.
+
+    Args:
+        inputs: parse_endpoints of the inputs
+        outputs: parse_endpoints of the outputs
+    """
+    return sum(item[1] for item in inputs) - sum(item[1] for item in outputs)
+
+
+def wallet_flow(record: Dict[str, Any], address: str) -> Tuple[int, List[List[Any]]]:
+    """
+    Net effect of one transaction on a wallet
+
+    Only the wallet's own endpoints are read, so the cost does not grow
+    with the size of the rest of the transaction. Change returned to the
+    wallet cancels out, and a fee paid by the wallet is part of its
+    outflow.
+
+    Returns:
+        (net lovelace received (negative when sent), [[unit, delta], ...]
+        for every native asset whose balance changed)
+    """
+    net = 0
+    deltas: Dict[str, int] = {}
+    for sign, side in ((1, record["outputs"]), (-1, record["inputs"])):
+        for endpoint_address, lovelace, assets in side:
+            if endpoint_address != address:
+                continue
+            net += sign * lovelace
+            for unit, quantity in assets:
+                deltas[unit] = deltas.get(unit, 0) + sign * quantity
+    return net, [[unit, delta] for unit, delta in deltas.items() if delta]
+
+
+class AssetLedger:
+    """
+    Net native-asset deltas of one wallet
+
+    Held as a sorted int32 array of interned asset ids and a parallel
+    int64 array of deltas, so a wallet holding thousands of tokens costs
+    12 bytes per token rather than a dict entry per token per transaction.
+    Deltas are appended to a pending list and folded in batches.
+    """
+
+    def __init__(self, ids: np.ndarray = None, deltas: np.ndarray = None):
+        self.ids = ids if ids is not None else np.empty(0, dtype=np.int32)
+        self.deltas = deltas if deltas is not None else np.empty(0, dtype=np.int64)
+        self._pending_ids: List[int] = []
+        self._pending_deltas: List[int] = []
+
+    def __len__(self) -> int:
+        """Number of assets with a non-zero net delta"""
+        self._compact()
+        return len(self.ids)
+
+    def add(self, deltas: Iterable[List[Any]]) -> None:
+        """Add [[unit, delta], ...] from wallet_flow"""
+        for unit, delta in deltas:
+            self._pending_ids.append(asset_ids.intern(unit))
+            self._pending_deltas.append(max(-_INT64_MAX, min(_INT64_MAX, delta)))
+        if len(self._pending_ids) >= _COMPACT_EVERY:
+            self._compact()
+
+    def merge(self, other: "AssetLedger") -> None:
+        other._compact()
+        self._pending_ids.extend(other.ids.tolist())
+        self._pending_deltas.extend(other.deltas.tolist())
+        self._compact()
+
+    def _compact(self) -> None:
+        """Fold pending deltas into the sorted arrays, dropping zero balances"""
+        if not self._pending_ids:
+            return
+        ids = np.concatenate([self.ids, np.array(self._pending_ids, dtype=np.int32)])
+        deltas = np.concatenate([self.deltas, np.array(self._pending_deltas, dtype=np.int64)])
+        self._pending_ids, self._pending_deltas = [], []
+
+        unique, inverse = np.unique(ids, return_inverse=True)
+        if np.abs(deltas).sum(dtype=np.float64) < _SAFE_SUM:
+            totals = np.zeros(len(unique), dtype=np.int64)
+            np.add.at(totals, inverse, deltas)
+        else:
+            # Sums could overflow int64: add exactly as Python ints, then saturate
+            exact = [0] * len(unique)
+            for index, delta in zip(inverse.tolist(), deltas.tolist()):
+                exact[index] += delta
+            totals = np.array([max(-_INT64_MAX, min(_INT64_MAX, total)) for total in exact], dtype=np.int64)
+        nonzero = totals != 0
+        self.ids, self.deltas = unique[nonzero], totals[nonzero]
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """Assets with the largest absolute net deltas"""
+        self._compact()
+        order = np.argsort(-np.abs(self.deltas), kind="stable")[:limit]
+        return [
+            {"unit": asset_ids.strings[self.ids[index]], "net": int(self.deltas[index])}
+            for index in order
+        ]
+
+    def to_dict(self) -> Dict[str, int]:
+        self._compact()
+        return {asset_ids.strings[asset]: int(delta) for asset, delta in zip(self.ids, self.deltas)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, int]) -> "AssetLedger":
+        ledger = cls()
+        ledger.add(data.items())
+        ledger._compact()
+        return ledger
@@ -3,23 +3,152 @@ Blockchain Data Analyzer using Blockfrost API
 Fetches real transaction data from Cardano blockchain
 """
 import os
-from typing import Dict, List, Any
-from blockfrost import BlockFrostApi, ApiError, ApiUrls
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple, Union
+import httpx
+import numpy as np
+from blockfrost import ApiError, ApiUrls
+from core.config import settings
 from core.logging import get_logger
+from core.metrics import BLOCKFROST_REQUEST_SECONDS, STAGE_SECONDS, timed
+from services.blockchain.accounting import implied_fee, parse_endpoints, wallet_flow
+from services.blockchain.client import BlockfrostClient
+from services.blockchain.denylist import denylist
+from services.blockchain.graph import counterparty_graph
+from services.blockchain.batch import TransactionBatch, fee_outlier_fences
+from services.blockchain.stats import STATS_VERSION, TOP_ASSETS, TransactionStats
+from services.blockchain.tx_cache import TransactionCache, transaction_cache
+from services.blockchain.wallet_sync import WalletSyncStore, wallet_sync_store
 
 logger = get_logger(__name__)
 
+# Transactions above this output amount are flagged as large (100k ADA)
+LARGE_TRANSACTION_LOVELACE = 100_000_000_000
+
+# Fee patterns are flagged when more than this share of transactions are outliers
+UNUSUAL_FEE_RATIO = 0.2
+
+# Inputs minus outputs in this range is taken as the fee (the protocol's
+# fixed fee term up to 2 ADA); anything else means a deposit, refund or
+# withdrawal was involved and the fee is fetched from /txs/{hash}
+MIN_TX_FEE = 155_381
+MAX_IMPLIED_FEE = 2_000_000
+
+# Number of most recent transactions returned alongside the analysis
+RECENT_TRANSACTIONS_KEPT = 10
+
+# Wallets with more transactions than this are flagged as high frequency
+HIGH_FREQUENCY_COUNT = 50
+
+# Risk score before indicators, and points added per indicator severity
+BASE_RISK_SCORE = 20
+SEVERITY_POINTS = {"low": 5, "medium": 15, "high": 25, "critical": 40}
+
+# Wallets on the denylist score this regardless of other indicators
+DENYLISTED_RISK_SCORE = 100
+
+# Risk indicator rules, the one place both the per-wallet analysis and the
+# batch scoring read them from: (type, severity, test over summary
+# columns, description of a wallet summary the test fired for)
+INDICATOR_RULES = (
+    (
+        "denylisted_address", "critical",
+        lambda columns: columns["denylisted"] > 0,
+        lambda summary: f"Wallet is on the {summary['denylist_category']} denylist"
+    ),
+    (
+        "high_frequency", "medium",
+        lambda columns: columns["count"] > HIGH_FREQUENCY_COUNT,
+        lambda summary: f"High transaction frequency: {summary['count']} transactions"
+    ),
+    (
+        "large_transactions", "high",
+        lambda columns: columns["large_count"] > 0,
+        lambda summary: f"Found {summary['large_count']} large transactions"
+    ),
+    (
+        # Counterparties found on the denylist
+        "counterparty_exposure", "high",
+        lambda columns: columns["flagged_counterparties"] > 0,
+        lambda summary: (
+            f"Transacted directly with {summary['flagged_counterparties']} denylisted addresses "
+            f"({', '.join(summary['flagged_categories'])})"
+        )
+    ),
+    (
+        # Fees outside the interquartile fences
+        "unusual_fees", "medium",
+        lambda columns: (columns["total_fees"] > 0) & (columns["fee_outliers"] > columns["count"] * UNUSUAL_FEE_RATIO),
+        lambda summary: f"Unusual fee patterns detected in {summary['fee_outliers']} transactions"
+    )
+)
+RULE_POINTS = np.array([SEVERITY_POINTS[severity] for _, severity, _, _ in INDICATOR_RULES], dtype=np.int64)
+RULE_INDEX = {rule[0]: index for index, rule in enumerate(INDICATOR_RULES)}
+
+
+class _SummaryColumns(dict):
+    """Numeric summary fields as float64 arrays, built on first use"""
+
+    def __init__(self, summaries: List[Dict[str, Any]]):
+        super().__init__()
+        self.summaries = summaries
+
+    def __missing__(self, name: str) -> np.ndarray:
+        column = np.fromiter(
+            (float(summary.get(name) or 0) for summary in self.summaries),
+            dtype=np.float64,
+            count=len(self.summaries)
+        )
+        self[name] = column
+        return column
+
+
+def indicator_matrix(summaries: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Evaluate every indicator rule over many wallet summaries at once
+    
+    Returns:
+        Boolean array of shape (len(INDICATOR_RULES), len(summaries))
+    """
+    columns = _SummaryColumns(summaries)
+    fired = np.zeros((len(INDICATOR_RULES), len(summaries)), dtype=bool)
+    for index, (_, _, test, _) in enumerate(INDICATOR_RULES):
+        fired[index] = test(columns)
+    return fired
+
+
+def score_indicators(fired: np.ndarray) -> np.ndarray:
+    """Risk scores for the columns of an indicator_matrix"""
+    scores = np.minimum(BASE_RISK_SCORE + RULE_POINTS @ fired, 100)
+    return np.where(fired[RULE_INDEX["denylisted_address"]], DENYLISTED_RISK_SCORE, scores)
+
+
+def _not_found(error: Exception) -> bool:
+    """Whether Blockfrost answered 404 (e.g. an address that never appeared on-chain)"""
+    return isinstance(error, ApiError) and error.status_code == 404
+
 class BlockchainAnalyzer:
     """Analyzes blockchain wallet data using Blockfrost API"""
     
-    def __init__(self, network: str = "preprod"):
+    def __init__(
+        self,
+        network: str = "preprod",
+        cache: Optional[TransactionCache] = None,
+        sync_store: Optional[WalletSyncStore] = None
+    ):
         """
         Initialize Blockfrost API client
         
         Args:
             network: 'mainnet' or 'preprod'
+            cache: Transaction detail cache (defaults to the global cache)
+            sync_store: Per-address streaming statistics (defaults to the global store)
         """
         self.network = network
+        self.cache = cache or transaction_cache
+        self.sync_store = sync_store or wallet_sync_store
         project_id = os.getenv("BLOCKFROST_PROJECT_ID")
         
         if not project_id:
@@ -27,160 +156,492 @@ class BlockchainAnalyzer:
             self.api = None
         else:
             try:
-                # Use the correct ApiUrls enum
-                if network == "mainnet":
+                # Use the correct ApiUrls enum unless a self-hosted endpoint is configured
+                if settings.blockfrost_base_url:
+                    base_url = settings.blockfrost_base_url.rstrip("/")
+                elif network == "mainnet":
                     base_url = ApiUrls.mainnet.value
                 else:
                     base_url = ApiUrls.preprod.value
                 
-                self.api = BlockFrostApi(
+                self.api = BlockfrostClient(
                     project_id=project_id,
                     base_url=base_url
                 )
-                logger.info(f"Blockfrost API initialized for {network} ({base_url})")
+                logger.info("Blockfrost API initialized for %s (%s)", network, base_url)
             except Exception as e:
-                logger.error(f"Failed to initialize Blockfrost: {e}")
+                logger.error("Failed to initialize Blockfrost: %s", e)
                 self.api = None
     
+    @timed(STAGE_SECONDS, "get_address_info")
     def get_address_info(self, address: str) -> Dict[str, Any]:
-        """Get basic address information"""
+        """
+        Get basic address information
+        
+        Errors other than an unknown address are raised: falling back to
+        mock data (e.g. when throttled) would be scored as a real wallet.
+        """
         if not self.api:
             return self._mock_address_info(address)
         
         try:
-            info = self.api.address(address)
-            return {
-                "address": address,
-                "stake_address": info.stake_address if hasattr(info, 'stake_address') else None,
-                "type": info.type if hasattr(info, 'type') else "unknown",
-                "script": info.script if hasattr(info, 'script') else False
-            }
+            info = self._call(self.api.address, address)
         except ApiError as e:
-            logger.warning(f"Blockfrost API error for address {address[:10]}...: {e.message}")
-            return self._mock_address_info(address)
-        except Exception as e:
-            logger.error(f"Unexpected error fetching address info: {str(e)}")
-            return self._mock_address_info(address)
+            if not _not_found(e):
+                raise
+            logger.info("Address %s... not found on-chain", address[:10])
+            return {"address": address, "stake_address": None, "type": "unknown", "script": False}
+        return {
+            "address": address,
+            "stake_address": info.stake_address if hasattr(info, 'stake_address') else None,
+            "type": info.type if hasattr(info, 'type') else "unknown",
+            "script": info.script if hasattr(info, 'script') else False
+        }
     
-    def get_transactions(self, address: str, count: int = 100) -> List[Dict[str, Any]]:
-        """Get transaction history for an address"""
+    def get_latest_tx_hash(self, address: str) -> Optional[str]:
+        """
+        Get the hash of an address's newest transaction
+        
+        Returns:
+            The tx_hash, "" for an address without transactions, or None
+            when it cannot be determined (mock data or API error)
+        """
         if not self.api:
-            return self._mock_transactions(address, count)
+            return None
         
         try:
-            txs = self.api.address_transactions(address, count=count, order='desc')
+            txs = self._call(self.api.address_transactions, address, count=1, order='desc')
+            return txs[0].tx_hash if txs else ""
+        except Exception as e:
+            logger.warning("Could not fetch latest transaction for %s...: %s", address[:10], e)
+            return None
+    
+    def _call(self, func, *args, **kwargs):
+        """Invoke a Blockfrost endpoint (rate limited and retried by the shared client)"""
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            BLOCKFROST_REQUEST_SECONDS.labels(func.__name__).observe(time.perf_counter() - start)
+    
+    def _fetch_transaction(self, tx) -> Optional[Dict[str, Any]]:
+        """
+        Fetch details for a single transaction
+        
+        The record is wallet-independent: block height and time from the
+        address listing, and the lovelace and native assets per input and
+        output address from /txs/{hash}/utxos (see
+        accounting.parse_endpoints). The fee is what the inputs leave
+        unspent, so one request per transaction is enough; only when that
+        amount cannot be a plain fee (a deposit paid or refunded, rewards
+        withdrawn) is /txs/{hash} asked for the real one.
+        
+        Returns:
+            The record, or None when the transaction is unknown (rolled
+            back since it was listed); other errors are raised rather than
+            leaving a gap in the history
+        """
+        try:
+            utxos = self._call(self.api.transaction_utxos, tx.tx_hash)
+            inputs, outputs = parse_endpoints(utxos["inputs"]), parse_endpoints(utxos["outputs"])
+            fees = implied_fee(inputs, outputs)
+            if not MIN_TX_FEE <= fees < MAX_IMPLIED_FEE:
+                fees = int(self._call(self.api.transaction, tx.tx_hash).fees)
+        except ApiError as e:
+            if not _not_found(e):
+                raise
+            logger.warning("Transaction %s not found, skipping", tx.tx_hash)
+            return None
+        return {
+            "tx_hash": tx.tx_hash,
+            "block_height": tx.block_height,
+            "block_time": tx.block_time,
+            "fees": fees,
+            "inputs": inputs,
+            "outputs": outputs
+        }
+    
+    @staticmethod
+    def _wallet_view(record: Dict[str, Any], address: str, listed: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Per-wallet record of a transaction
+        
+        output_amount is the lovelace that actually entered or left the
+        wallet (change excluded, fees included when the wallet paid),
+        net_lovelace the same with its sign, and asset_deltas the native
+        assets whose balance changed. Counterparties found in `listed`
+        (denylist hits) are kept as flagged_counterparties; the endpoint
+        lists are dropped.
+        """
+        net, asset_deltas = wallet_flow(record, address)
+        view = {key: record[key] for key in ("tx_hash", "block_height", "block_time", "fees")}
+        view.update(output_amount=abs(net), net_lovelace=net, asset_deltas=asset_deltas)
+        if listed:
+            flagged = sorted({
+                endpoint[0]
+                for side in (record["inputs"], record["outputs"])
+                for endpoint in side
+                if endpoint[0] in listed
+            })
+            if flagged:
+                view["flagged_counterparties"] = [[counterparty, listed[counterparty]] for counterparty in flagged]
+        return view
+    
+    def _hydrate_transactions(self, txs, address: str, max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Resolve transaction references into records for a wallet
+        
+        Details already in the transaction cache are served from it; the rest
+        are fetched concurrently on a bounded thread pool and cached. The
+        input order is preserved. Every counterparty is checked against the
+        denylist, and resolved records are added to the counterparty graph
+        and returned as the wallet's view of them.
+        """
+        cached = self.cache.get_many(tx.tx_hash for tx in txs)
+        missing = [tx for tx in txs if tx.tx_hash not in cached]
+        
+        workers = min(max_workers or settings.blockfrost_max_concurrency, len(missing))
+        if workers <= 1:
+            details = [self._fetch_transaction(tx) for tx in missing]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blockfrost") as pool:
+                details = list(pool.map(self._fetch_transaction, missing))
+        
+        fetched = {tx["tx_hash"]: tx for tx in details if tx is not None}
+        self.cache.put_many(list(fetched.values()))
+        
+        logger.info("Resolved %s transactions (%s cached, %s from Blockfrost)", len(txs), len(cached), len(fetched))
+        records = [
+            cached.get(tx.tx_hash) or fetched[tx.tx_hash]
+            for tx in txs
+            if tx.tx_hash in cached or tx.tx_hash in fetched
+        ]
+        if settings.counterparty_graph:
+            counterparty_graph.ingest(records)
+        
+        listed = denylist.lookup_many({
+            endpoint[0]
+            for record in records
+            for side in (record["inputs"], record["outputs"])
+            for endpoint in side
+        } - {address})
+        return [self._wallet_view(record, address, listed) for record in records]
+    
+    def iter_transactions(
+        self,
+        address: str,
+        chunk_size: int = 100,
+        max_transactions: Optional[int] = None,
+        since_block: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        fallback_to_mock: bool = True
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream an address's transaction history newest-first in chunks
+        
+        Blockfrost pages are listed lazily, one per chunk, and each chunk is
+        resolved through the transaction cache before it is yielded, so only
+        one chunk of records is held in memory at a time.
+        
+        Args:
+            address: Wallet address to fetch
+            chunk_size: Records per chunk (Blockfrost page size, max 100)
+            max_transactions: Stop after this many transactions (None = full history)
+            since_block: Only include transactions at or above this block height
+            max_workers: Concurrency ceiling for detail fetches
+            fallback_to_mock: Yield mock data when Blockfrost is not
+                configured (otherwise a RuntimeError is raised)
+        
+        API errors are raised, except a 404 on the first page, which means
+        the address has no history.
+        """
+        if not self.api:
+            if not fallback_to_mock:
+                raise RuntimeError("Blockfrost API not configured")
+            yield self._mock_transactions(address, max_transactions or chunk_size)
+            return
+        
+        chunk_size = max(1, min(chunk_size, 100))
+        from_block = str(since_block) if since_block is not None else None
+        remaining = max_transactions
+        page = 1
+        
+        while remaining is None or remaining > 0:
+            try:
+                txs = self._call(
+                    self.api.address_transactions,
+                    address,
+                    from_block=from_block,
+                    count=chunk_size,
+                    page=page,
+                    order='desc'
+                )
+            except ApiError as e:
+                if page == 1 and _not_found(e):
+                    logger.info("Address %s... has no transactions", address[:10])
+                    return
+                raise
             
-            transactions = []
-            for tx in txs[:min(len(txs), count)]:
-                try:
-                    tx_details = self.api.transaction(tx.tx_hash)
-                    transactions.append({
-                        "tx_hash": tx.tx_hash,
-                        "block_height": tx.block_height,
-                        "block_time": tx.block_time,
-                        "output_amount": sum([int(out.amount[0].quantity) for out in tx_details.outputs]) if hasattr(tx_details, 'outputs') else 0,
-                        "fees": int(tx_details.fees) if hasattr(tx_details, 'fees') else 0,
-                        "size": tx_details.size if hasattr(tx_details, 'size') else 0
-                    })
-                except Exception as tx_error:
-                    logger.warning(f"Error processing transaction {tx.tx_hash}: {str(tx_error)}")
-                    continue
+            page_size = len(txs)
+            if remaining is not None:
+                txs = txs[:remaining]
+                remaining -= len(txs)
             
-            logger.info(f"Fetched {len(transactions)} transactions for {address[:10]}...")
-            return transactions
+            chunk = self._hydrate_transactions(txs, address, max_workers)
+            if chunk:
+                yield chunk
             
-        except ApiError as e:
-            logger.warning(f"Blockfrost API error for transactions: {e.message}")
-            return self._mock_transactions(address, count)
-        except Exception as e:
-            logger.error(f"Unexpected error fetching transactions: {str(e)}")
-            return self._mock_transactions(address, count)
+            if page_size < chunk_size:
+                return
+            page += 1
     
-    def analyze_transaction_patterns(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze transaction patterns for risk assessment"""
-        if not transactions:
-            return {
-                "total_transactions": 0,
-                "total_volume": 0,
-                "average_transaction": 0,
-                "risk_indicators": []
-            }
+    @timed(STAGE_SECONDS, "analyze_transaction_patterns")
+    def analyze_transaction_patterns(
+        self,
+        transactions: Union[TransactionBatch, List[Dict[str, Any]], Iterable[List[Dict[str, Any]]]]
+    ) -> Dict[str, Any]:
+        """
+        Analyze transaction patterns for risk assessment
         
-        total_volume = sum(tx["output_amount"] for tx in transactions)
-        avg_transaction = total_volume / len(transactions) if transactions else 0
+        Args:
+            transactions: A TransactionBatch, a list of transaction records,
+                or an iterable of record chunks such as iter_transactions()
+        """
+        if isinstance(transactions, TransactionBatch):
+            batch = transactions
+        elif isinstance(transactions, list):
+            batch = TransactionBatch.from_records(transactions)
+        else:
+            batch = TransactionBatch.from_chunks(transactions)
         
-        # Detect suspicious patterns
-        risk_indicators = []
+        return self._build_analysis(self._summarize_batch(batch))
+    
+    def refresh_stats(
+        self,
+        address: str,
+        max_transactions: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Update an address's stored streaming statistics with new transactions
         
-        # Check for rapid transactions
-        if len(transactions) > 50:
-            risk_indicators.append({
-                "type": "high_frequency",
-                "severity": "medium",
-                "description": f"High transaction frequency: {len(transactions)} transactions"
-            })
+        The first call seeds the statistics from the newest max_transactions
+        records; later calls only stream blocks at or above the last one
+        counted, so a refresh costs O(new transactions).
         
-        # Check for large transactions
-        large_txs = [tx for tx in transactions if tx["output_amount"] > 100_000_000_000]  # > 100k ADA
-        if large_txs:
-            risk_indicators.append({
-                "type": "large_transactions",
-                "severity": "high",
-                "description": f"Found {len(large_txs)} large transactions"
-            })
+        Args:
+            address: Wallet address
+            max_transactions: Limit for the initial seed (None = full history)
+            
+        Returns:
+            (summary, recent_transactions)
+        """
+        # Counterparties were checked against the denylist as they were
+        # counted, so the stored statistics are only valid for the same list
+        denylist_fingerprint = denylist.fingerprint()
+        state = self.sync_store.get_stats(self.network, address)
+        if state and (
+            state["stats"].get("version") != STATS_VERSION
+            or state.get("denylist_fingerprint", "") != denylist_fingerprint
+        ):
+            state = None
+        if state:
+            stats = TransactionStats.from_dict(state["stats"])
+            recent = state["recent_transactions"]
+        else:
+            stats = TransactionStats(large_threshold=LARGE_TRANSACTION_LOVELACE)
+            recent = []
+        
+        already_counted = set(stats.boundary_hashes)
+        new_recent: List[Dict[str, Any]] = []
+        added = 0
+        for chunk in self.iter_transactions(
+            address,
+            max_transactions=None if state else max_transactions,
+            since_block=stats.last_block_height,
+            fallback_to_mock=False
+        ):
+            for tx in chunk:
+                if tx["tx_hash"] in already_counted:
+                    continue
+                stats.add(tx)
+                added += 1
+                if len(new_recent) < RECENT_TRANSACTIONS_KEPT:
+                    new_recent.append(tx)
+        
+        recent = (new_recent + recent)[:RECENT_TRANSACTIONS_KEPT]
+        if added or not state:
+            self.sync_store.save_stats(self.network, address, stats.to_dict(), recent, denylist_fingerprint)
+        
+        logger.info("Refreshed stats for %s...: %s new, %s total transactions", address[:10], added, stats.count)
+        return stats.summary(), recent
+    
+    @timed(STAGE_SECONDS, "summarize_wallet")
+    def summarize_wallet(
+        self,
+        address: str,
+        max_transactions: Optional[int] = None
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Compute an address's transaction summary statistics
+        
+        Uses the stored incremental statistics when enabled, otherwise
+        streams the history through a columnar batch. A wallet on the
+        denylist is marked with its category, and direct counterparties
+        on it are counted with theirs.
+        
+        Multi-hop counterparty exposure is not part of the summary: the
+        counterparty graph only holds what this process has ingested, so
+        it would make scores (and cached reports) depend on which replica
+        served the request.
+        
+        Args:
+            address: Wallet address
+            max_transactions: Transaction limit (None = full history)
+            
+        Returns:
+            (summary, recent_transactions)
+        """
+        summary = None
+        
+        # Incremental mode: fold only new transactions into the stored statistics
+        if settings.wallet_sync_incremental and self.api:
+            try:
+                summary, recent_transactions = self.refresh_stats(address, max_transactions)
+            except (ApiError, httpx.HTTPError):
+                # Streaming from scratch would hit the same Blockfrost failure
+                raise
+            except Exception as e:
+                logger.warning("Incremental stats refresh failed, analyzing from scratch: %s", e)
         
-        # Check for unusual patterns (very small or very large fees)
-        avg_fee = sum(tx["fees"] for tx in transactions) / len(transactions) if transactions else 0
-        if avg_fee > 0:
-            unusual_fees = [tx for tx in transactions if tx["fees"] > avg_fee * 3 or tx["fees"] < avg_fee * 0.3]
-            if len(unusual_fees) > len(transactions) * 0.2:  # More than 20% unusual
-                risk_indicators.append({
-                    "type": "unusual_fees",
-                    "severity": "medium",
-                    "description": f"Unusual fee patterns detected in {len(unusual_fees)} transactions"
-                })
+        if summary is None:
+            # Stream the transaction history and summarize it in a single pass,
+            # keeping only the most recent records for the report
+            recent_transactions = []
+            
+            def stream():
+                for chunk in self.iter_transactions(address, max_transactions=max_transactions):
+                    if len(recent_transactions) < RECENT_TRANSACTIONS_KEPT:
+                        recent_transactions.extend(chunk[:RECENT_TRANSACTIONS_KEPT - len(recent_transactions)])
+                    yield chunk
+            
+            summary = self._summarize_batch(TransactionBatch.from_chunks(stream()))
+        
+        category = denylist.lookup(address)
+        if category:
+            summary["denylisted"] = 1
+            summary["denylist_category"] = category
+        return summary, recent_transactions
+    
+    def _summarize_batch(self, batch: TransactionBatch) -> Dict[str, Any]:
+        """Compute the statistics behind every risk indicator, column-wise"""
+        count = len(batch)
+        if not count:
+            return {"count": 0}
+        
+        fees = batch.fees
+        q25, q50, q75, p95, p99 = np.percentile(fees, [25, 50, 75, 95, 99])
+        low, high = fee_outlier_fences(q25, q50, q75)
         
         return {
-            "total_transactions": len(transactions),
+            "count": count,
+            "total_volume": int(batch.output_amount.sum()),
+            "total_fees": int(fees.sum()),
+            "received_lovelace": int(batch.net_lovelace[batch.net_lovelace > 0].sum()),
+            "sent_lovelace": int(-batch.net_lovelace[batch.net_lovelace < 0].sum()),
+            "native_assets": len(batch.assets),
+            "top_assets": batch.assets.top(TOP_ASSETS),
+            "large_count": int(np.count_nonzero(batch.output_amount > LARGE_TRANSACTION_LOVELACE)),
+            "fee_outliers": int(np.count_nonzero((fees < low) | (fees > high))),
+            "fee_percentiles": {"p50": float(q50), "p95": float(p95), "p99": float(p99)},
+            "flagged_counterparties": len(batch.flagged),
+            "flagged_categories": sorted(set(batch.flagged.values())),
+            "oldest": int(batch.block_time.min()),
+            "newest": int(batch.block_time.max())
+        }
+    
+    def _build_analysis(self, summary: Dict[str, Any], fired: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Turn transaction summary statistics into risk indicators
+        
+        Args:
+            summary: Summary statistics (see _summarize_batch)
+            fired: The wallet's column of indicator_matrix, when the rules
+                were already evaluated for a batch
+        """
+        if fired is None:
+            fired = indicator_matrix([summary])[:, 0]
+        risk_indicators = [
+            {"type": indicator_type, "severity": severity, "description": describe(summary)}
+            for (indicator_type, severity, _, describe), hit in zip(INDICATOR_RULES, fired)
+            if hit
+        ]
+        
+        count = summary["count"]
+        if not count:
+            return {
+                "total_transactions": 0,
+                "total_volume": 0,
+                "average_transaction": 0,
+                "risk_indicators": risk_indicators
+            }
+        
+        total_volume = summary["total_volume"]
+        analysis = {
+            "total_transactions": count,
             "total_volume": total_volume,
-            "average_transaction": avg_transaction,
-            "average_fee": avg_fee,
+            "average_transaction": total_volume / count,
+            "average_fee": summary["total_fees"] / count,
+            "fee_percentiles": summary["fee_percentiles"],
+            "net_flow": summary.get("received_lovelace", 0) - summary.get("sent_lovelace", 0),
+            "native_assets": summary.get("native_assets", 0),
+            "top_assets": summary.get("top_assets", []),
+            "flagged_counterparties": summary.get("flagged_counterparties", 0),
             "risk_indicators": risk_indicators,
-            "time_span": self._calculate_time_span(transactions)
+            "time_span": self._format_time_span(count, summary["oldest"], summary["newest"])
         }
+        return analysis
     
     def calculate_risk_score(self, analysis: Dict[str, Any]) -> int:
         """Calculate risk score based on transaction analysis"""
-        base_score = 20  # Start with low risk
-        
-        # Add points for risk indicators
-        for indicator in analysis.get("risk_indicators", []):
-            if indicator["severity"] == "low":
-                base_score += 5
-            elif indicator["severity"] == "medium":
-                base_score += 15
-            elif indicator["severity"] == "high":
-                base_score += 25
-            elif indicator["severity"] == "critical":
-                base_score += 40
-        
-        # Cap at 100
-        return min(base_score, 100)
-    
-    def _calculate_time_span(self, transactions: List[Dict[str, Any]]) -> str:
-        """Calculate time span of transactions"""
-        if not transactions or len(transactions) < 2:
+        found = {indicator["type"] for indicator in analysis.get("risk_indicators", [])}
+        fired = np.array([[rule[0] in found] for rule in INDICATOR_RULES], dtype=bool)
+        return int(score_indicators(fired)[0])
+    
+    def calculate_risk_scores(self, summaries: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Score many wallets at once from their transaction summaries
+        
+        Args:
+            summaries: Summary statistics per wallet (see _summarize_batch)
+            
+        Returns:
+            int64 array of risk scores, in input order
+        """
+        return score_indicators(indicator_matrix(summaries))
+    
+    def build_analyses(self, summaries: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """
+        Analyze and score a batch of wallets, evaluating the rules once
+        
+        Returns:
+            (analysis per summary, int64 array of risk scores), in input order
+        """
+        fired = indicator_matrix(summaries)
+        analyses = [self._build_analysis(summary, fired[:, index]) for index, summary in enumerate(summaries)]
+        return analyses, score_indicators(fired)
+    
+    def _format_time_span(self, count: int, oldest: Optional[int], newest: Optional[int]) -> str:
+        """Format the time span between the oldest and newest transaction"""
+        if count < 2:
             return "N/A"
         
-        oldest = min(tx["block_time"] for tx in transactions)
-        newest = max(tx["block_time"] for tx in transactions)
         days = (newest - oldest) / 86400  # Convert seconds to days
         
         return f"{int(days)} days"
     
     def _mock_address_info(self, address: str) -> Dict[str, Any]:
         """Mock address info for testing"""
-        logger.info(f"Using mock data for address {address[:10]}...")
+        logger.info("Using mock data for address %s...", address[:10])
         return {
             "address": address,
             "stake_address": "stake_test1...",
@@ -190,7 +651,6 @@ class BlockchainAnalyzer:
     
     def _mock_transactions(self, address: str, count: int) -> List[Dict[str, Any]]:
         """Mock transaction data for testing"""
-        import time
         current_time = int(time.time())
         
         transactions = []
@@ -200,13 +660,33 @@ class BlockchainAnalyzer:
                 "block_height": 1000000 + i,
                 "block_time": current_time - (i * 3600),  # 1 hour apart
                 "output_amount": 50_000_000 + (i * 10_000_000),  # 50-150 ADA
-                "fees": 170_000 + (i * 1000),
-                "size": 300 + (i * 10)
+                "net_lovelace": 50_000_000 + (i * 10_000_000),
+                "fees": 170_000 + (i * 1000)
             })
         
-        logger.info(f"Generated {len(transactions)} mock transactions for {address[:10]}...")
+        logger.info("Generated %s mock transactions for %s...", len(transactions), address[:10])
         return transactions
 
+# Shared analyzers, one per network, reused across jobs
+_analyzers: Dict[str, BlockchainAnalyzer] = {}
+_analyzers_lock = threading.Lock()
+
+def get_analyzer(network: str) -> BlockchainAnalyzer:
+    """
+    Get the shared analyzer for a network
+    
+    The analyzer (and its Blockfrost client) is built once per
+    process; it holds no per-wallet state, so jobs can share it.
+    """
+    analyzer = _analyzers.get(network)
+    if analyzer is None:
+        with _analyzers_lock:
+            analyzer = _analyzers.get(network)
+            if analyzer is None:
+                analyzer = BlockchainAnalyzer(network=network)
+                _analyzers[network] = analyzer
+    return analyzer
+
 def get_blockchain_data(wallet_address: str) -> Dict[str, Any]:
     """
     Main function to fetch and analyze blockchain data
@@ -215,29 +695,28 @@ def get_blockchain_data(wallet_address: str) -> Dict[str, Any]:
         wallet_address: Cardano wallet address to analyze
         
     Returns:
-        Dictionary with address info, transactions, and analysis
+        Dictionary with address info, recent transactions, and analysis
     """
     network = os.getenv("NETWORK", "Preprod").lower()
-    analyzer = BlockchainAnalyzer(network=network)
+    analyzer = get_analyzer(network)
     
     # Get address info
     address_info = analyzer.get_address_info(wallet_address)
     
-    # Get transactions
-    transactions = analyzer.get_transactions(wallet_address, count=100)
+    max_transactions = settings.blockchain_max_transactions or None
     
     # Analyze patterns
-    analysis = analyzer.analyze_transaction_patterns(transactions)
+    summary, recent_transactions = analyzer.summarize_wallet(wallet_address, max_transactions)
+    analysis = analyzer._build_analysis(summary)
     
     # Calculate risk score
     risk_score = analyzer.calculate_risk_score(analysis)
     
     return {
         "address_info": address_info,
-        "transactions": transactions,
+        "recent_transactions": recent_transactions,
         "analysis": analysis,
         "risk_score": risk_score,
-        "transaction_count": len(transactions)
+        "transaction_count": analysis["total_transactions"],
+        "data_source": "blockfrost" if analyzer.api else "mock"
     }
-
-
@@ -0,0 +1,100 @@
+"""
+Columnar Transaction Batch
+NumPy-backed column store for transaction records
+"""
+from typing import Dict, Any, Iterable, List, Tuple
+
+import numpy as np
+
+from services.blockchain.accounting import AssetLedger
+
+# Numeric columns kept from each transaction record
+COLUMNS = ("block_time", "block_height", "output_amount", "net_lovelace", "fees")
+
+
+class TransactionBatch:
+    """
+    Transaction records stored as one int64 array per column
+
+    Analysis works on whole columns instead of walking a list of dicts,
+    and only the numeric fields are retained, which keeps full-history
+    batches small (40 bytes per transaction). Native-asset deltas are
+    folded into a single AssetLedger and denylisted counterparties into
+    one address -> category dict rather than kept per transaction.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], assets: AssetLedger = None, flagged: Dict[str, str] = None):
+        self.block_time = columns["block_time"]
+        self.block_height = columns["block_height"]
+        self.output_amount = columns["output_amount"]
+        self.net_lovelace = columns["net_lovelace"]
+        self.fees = columns["fees"]
+        self.assets = assets or AssetLedger()
+        self.flagged = flagged or {}
+
+    def __len__(self) -> int:
+        return len(self.block_time)
+
+    @classmethod
+    def empty(cls) -> "TransactionBatch":
+        return cls({name: np.empty(0, dtype=np.int64) for name in COLUMNS})
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> "TransactionBatch":
+        """Build a batch from a list of transaction records"""
+        assets = AssetLedger()
+        flagged = {}
+        for record in records:
+            assets.add(record.get("asset_deltas", ()))
+            flagged.update(record.get("flagged_counterparties", ()))
+        return cls({
+            name: np.fromiter((record.get(name) or 0 for record in records), dtype=np.int64, count=len(records))
+            for name in COLUMNS
+        }, assets, flagged)
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[List[Dict[str, Any]]]) -> "TransactionBatch":
+        """
+        Build a batch from a stream of record chunks
+
+        Each chunk is converted to columns as soon as it arrives, so the
+        record dicts can be released while the stream is still running.
+        """
+        parts = [cls.from_records(chunk) for chunk in chunks if chunk]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        assets = AssetLedger()
+        flagged = {}
+        for part in parts:
+            assets.merge(part.assets)
+            flagged.update(part.flagged)
+        return cls({
+            name: np.concatenate([getattr(part, name) for part in parts])
+            for name in COLUMNS
+        }, assets, flagged)
+
+
+# Fees further than this many interquartile ranges outside Q1/Q3 are outliers
+FEE_OUTLIER_FENCE = 1.5
+
+# Minimum fence width as a fraction of the median fee, so wallets whose
+# fees are nearly identical don't flag every small deviation
+MIN_FEE_SPREAD = 0.1
+
+
+def fee_outlier_fences(q25: float, q50: float, q75: float) -> Tuple[float, float]:
+    """
+    Tukey fences for fee outliers
+
+    Args:
+        q25: First quartile of fees
+        q50: Median fee
+        q75: Third quartile of fees
+
+    Returns:
+        (low, high) bounds; fees outside them are outliers
+    """
+    spread = max(q75 - q25, q50 * MIN_FEE_SPREAD)
+    return q25 - FEE_OUTLIER_FENCE * spread, q75 + FEE_OUTLIER_FENCE * spread
@@ -0,0 +1,272 @@
+"""
+Blockfrost HTTP Client
+Process-wide async Blockfrost client with pooled connections, retries and request coalescing
+"""
+import asyncio
+import json
+import random
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from blockfrost import ApiError
+from blockfrost.utils import convert_json_to_object
+
+from core.config import settings
+from core.logging import get_logger
+from core.metrics import BLOCKFROST_COALESCED, BLOCKFROST_RETRIES, BLOCKFROST_THROTTLE_SECONDS
+from services.blockchain.rate_limiter import blockfrost_limiter
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = get_logger(__name__)
+
+DEFAULT_API_VERSION = "v0"
+REQUEST_TIMEOUT = 30
+CONNECT_TIMEOUT = 10
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Full-jitter exponential backoff: a retry waits up to base * 2^attempt seconds, capped
+RETRY_BASE_SECONDS = 0.25
+RETRY_MAX_SECONDS = 8.0
+
+
+def _backoff(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Jittered delay before retry number attempt + 1, honouring Retry-After"""
+    delay = random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+    if response is not None:
+        try:
+            delay = max(delay, min(RETRY_MAX_SECONDS, float(response.headers.get("retry-after", 0))))
+        except ValueError:
+            pass
+    return delay
+
+
+class BlockfrostHttp:
+    """
+    Shared httpx.AsyncClient for every Blockfrost request in the process
+
+    Connections are kept alive (multiplexed over HTTP/2 when the h2
+    package is installed) and capped per host at
+    BLOCKFROST_MAX_CONNECTIONS. Every attempt, retries included, first
+    waits for the shared rate limiter, and a 429 is reported back to it.
+    429 and 5xx responses and transport errors are retried up to
+    BLOCKFROST_MAX_RETRIES times with jittered backoff.
+    Identical GETs already in flight (same URL, query and project) are
+    coalesced: later callers wait for the first request's response
+    instead of sending their own.
+
+    The API and worker entry points start the client on their event loop
+    and close it on shutdown. Analyses run on worker threads and call
+    get_json_blocking, which hands the request to that loop. Processes
+    that never start it (CLI runs, benchmarks) get a private loop thread
+    on first use.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    async def start(self) -> None:
+        """Create the client on the running event loop"""
+        if self._client is not None and self._loop is not None and not self._loop.is_closed():
+            return
+        http2 = settings.blockfrost_http2 and HTTP2_AVAILABLE
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=None,  # bounded per host by _host_slots
+                max_keepalive_connections=max(settings.blockfrost_max_connections, 1)
+            ),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+        )
+        self._loop = asyncio.get_running_loop()
+        self._host_slots = {}
+        self._inflight = {}
+        logger.info(
+            "Blockfrost HTTP client started (%s, %s connections per host)",
+            "HTTP/2" if http2 else "HTTP/1.1 keep-alive",
+            settings.blockfrost_max_connections
+        )
+
+    async def close(self) -> None:
+        """Close pooled connections (and the private loop thread, if one was started)"""
+        with self._lock:
+            client, loop, thread = self._client, self._loop, self._thread
+            self._client = self._loop = self._thread = None
+        if client is None:
+            return
+        if thread is None:
+            await client.aclose()
+        else:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+            loop.call_soon_threadsafe(loop.stop)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """The loop the client runs on, starting a private one if needed"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="blockfrost-http", daemon=True)
+                thread.start()
+                asyncio.run_coroutine_threadsafe(self.start(), loop).result()
+                self._thread = thread
+            return self._loop
+
+    async def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> bytes:
+        """
+        GET a Blockfrost URL, sharing the response with identical requests in flight
+
+        Args:
+            url: Full endpoint URL
+            params: Query parameters (None values are dropped)
+            headers: Request headers (the project_id)
+
+        Returns:
+            Raw response body of a 200 response
+
+        Raises:
+            ApiError: Non-200 response after retries
+        """
+        params = {name: value for name, value in (params or {}).items() if value is not None}
+        key = (url, tuple(sorted(params.items())), tuple(sorted((headers or {}).items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, params, headers))
+            self._inflight[key] = task
+
+            def _done(finished: asyncio.Future) -> None:
+                self._inflight.pop(key, None)
+                if not finished.cancelled():
+                    finished.exception()  # retrieved even if every waiter was cancelled
+
+            task.add_done_callback(_done)
+        else:
+            BLOCKFROST_COALESCED.inc()
+        # A cancelled waiter must not cancel the request others are waiting on
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str, params: dict, headers: Optional[dict]) -> bytes:
+        host = urlsplit(url).netloc
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots.setdefault(host, asyncio.Semaphore(max(settings.blockfrost_max_connections, 1)))
+
+        attempt = 0
+        while True:
+            response = None
+            BLOCKFROST_THROTTLE_SECONDS.observe(await blockfrost_limiter.acquire())
+            try:
+                async with slots:
+                    response = await self._client.get(url, params=params, headers=headers)
+            except httpx.TransportError as e:
+                if attempt >= settings.blockfrost_max_retries:
+                    raise
+                reason = type(e).__name__
+            else:
+                if response.status_code == 200:
+                    return response.content
+                if response.status_code == 429:
+                    await blockfrost_limiter.throttled()
+                if response.status_code not in RETRY_STATUSES or attempt >= settings.blockfrost_max_retries:
+                    raise ApiError(response)
+                reason = str(response.status_code)
+
+            delay = _backoff(attempt, response)
+            BLOCKFROST_RETRIES.labels(reason).inc()
+            logger.debug("Retrying %s after %s in %.2fs", urlsplit(url).path, reason, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def get_json_blocking(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> Any:
+        """
+        Run get() on the client's loop from a worker thread and decode the JSON
+
+        Decoding happens on the calling thread, so large bodies do not hold
+        up the event loop and coalesced callers each get their own objects.
+        """
+        loop = self._ensure_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            raise RuntimeError("Blocking Blockfrost call on the event loop thread; await blockfrost_http.get() instead")
+        body = asyncio.run_coroutine_threadsafe(self.get(url, params, headers), loop).result()
+        return json.loads(body)
+
+
+class BlockfrostClient:
+    """
+    Blockfrost endpoints used by the analyzer, for one project and network
+
+    Same return types (Namespace objects) and errors (ApiError) as
+    blockfrost-python's BlockFrostApi, but every request goes through the
+    process-wide BlockfrostHttp client instead of a module-level
+    requests.get that opens a new connection each time. Calls block the
+    calling thread.
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        base_url: str,
+        api_version: str = DEFAULT_API_VERSION,
+        http: Optional[BlockfrostHttp] = None
+    ):
+        self.url = f"{base_url}/{api_version}"
+        self.headers = {"project_id": project_id}
+        self.http = http or blockfrost_http
+
+    def _get_json(self, path: str, params: Optional[dict] = None) -> Any:
+        return self.http.get_json_blocking(f"{self.url}{path}", params, self.headers)
+
+    def _get(self, path: str, params: Optional[dict] = None) -> Any:
+        return convert_json_to_object(self._get_json(path, params))
+
+    def address(self, address: str):
+        """GET /addresses/{address}"""
+        return self._get(f"/addresses/{address}")
+
+    def address_transactions(
+        self,
+        address: str,
+        from_block: Optional[str] = None,
+        to_block: Optional[str] = None,
+        count: int = 100,
+        page: int = 1,
+        order: str = "asc"
+    ):
+        """GET /addresses/{address}/transactions"""
+        return self._get(
+            f"/addresses/{address}/transactions",
+            params={"from": from_block, "to": to_block, "count": count, "page": page, "order": order}
+        )
+
+    def transaction(self, tx_hash: str):
+        """GET /txs/{hash}"""
+        return self._get(f"/txs/{tx_hash}")
+
+    def transaction_utxos(self, tx_hash: str) -> dict:
+        """
+        GET /txs/{hash}/utxos
+
+        Returned as plain JSON: large transactions have hundreds of
+        endpoints, and they are only aggregated, never accessed by name.
+        """
+        return self._get_json(f"/txs/{tx_hash}/utxos")
+
+
+# Global Blockfrost HTTP client
+blockfrost_http = BlockfrostHttp()
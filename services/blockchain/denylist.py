@@ -0,0 +1,300 @@
+"""
+Address Denylist
+Sanctioned and flagged address index with a bloom-filter prefilter
+"""
+import csv
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.logging import get_logger
+from core.metrics import DENYLIST_ENTRIES
+
+logger = get_logger(__name__)
+
+# Bump when the compiled file layout changes
+INDEX_VERSION = 1
+
+_ARRAYS = ("bloom", "keys", "codes", "offsets", "blob")
+
+
+def address_hashes(address: str) -> Tuple[int, int]:
+    """
+    Two 64-bit hashes of an address
+
+    The first is the exact-index key; both drive the bloom filter's
+    double hashing (h1 + i * h2).
+    """
+    digest = hashlib.blake2b(address.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+def iter_entries(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (address, category) from a CSV or JSONL denylist file
+
+    JSONL lines need an "address" and may carry a "category". CSV files may
+    have a header naming "address" and "category" columns; without one the
+    first column is the address and the second the category. Entries
+    without a category take the file name (e.g. ofac_sdn.csv -> ofac_sdn).
+    """
+    default_category = Path(path).stem
+    with open(path, newline="", encoding="utf-8") as handle:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in handle:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get("address"):
+                    yield entry["address"].strip(), entry.get("category") or default_category
+            return
+
+        rows = csv.reader(line for line in handle if line.strip() and not line.startswith("#"))
+        first = next(rows, None)
+        if first is None:
+            return
+        header = [column.strip().lower() for column in first]
+        if "address" in header:
+            address_column = header.index("address")
+            category_column = header.index("category") if "category" in header else None
+        else:
+            address_column, category_column = 0, 1
+            rows = iter([first, *rows])
+        for row in rows:
+            if len(row) <= address_column or not row[address_column].strip():
+                continue
+            category = row[category_column].strip() if category_column is not None and len(row) > category_column else ""
+            yield row[address_column].strip(), category or default_category
+
+
+def compile_index(sources: List[str], target: Path, false_positive_rate: float) -> None:
+    """
+    Compile denylist files into the memory-mapped index layout
+
+    Writes into a temporary directory and renames it into place, so readers
+    never see a partial index; if another process won the race its copy
+    is kept.
+    """
+    addresses: List[str] = []
+    entry_categories: List[str] = []
+    for path in sources:
+        for address, category in iter_entries(path):
+            addresses.append(address)
+            entry_categories.append(category)
+
+    # Same hashes as address_hashes, computed column-wise; duplicates keep
+    # their first occurrence (np.unique sorts stably with return_index)
+    digests = b"".join(hashlib.blake2b(address.encode(), digest_size=16).digest() for address in addresses)
+    pairs = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+    keys, first = np.unique(pairs[:, 0], return_index=True)
+    second = pairs[first, 1] | np.uint64(1)
+    count = len(keys)
+
+    categories = sorted(set(entry_categories))
+    category_codes = {category: code for code, category in enumerate(categories)}
+    codes = np.array([category_codes[entry_categories[i]] for i in first], dtype=np.uint16)
+
+    encoded = [addresses[i].encode() for i in first]
+    offsets = np.zeros(count + 1, dtype=np.uint64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    # Bloom filter sized for the target false-positive rate
+    bits = max(64, int(-max(count, 1) * np.log(false_positive_rate) / np.log(2) ** 2))
+    hashes = max(1, round(bits / max(count, 1) * np.log(2)))
+    filled = np.zeros(bits, dtype=bool)
+    for i in range(hashes):
+        filled[((keys + np.uint64(i) * second) % np.uint64(bits)).astype(np.int64)] = True
+    bloom = np.packbits(filled, bitorder="little")
+
+    staging = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    staging.mkdir(parents=True, exist_ok=True)
+    for name, array in zip(_ARRAYS, (bloom, keys, codes, offsets, blob)):
+        np.save(staging / f"{name}.npy", array)
+    (staging / "meta.json").write_text(json.dumps({
+        "version": INDEX_VERSION,
+        "count": count,
+        "bloom_bits": bits,
+        "bloom_hashes": hashes,
+        "categories": categories,
+        "sources": sources
+    }))
+    try:
+        staging.rename(target)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+class DenylistIndex:
+    """
+    Read-only view of a compiled index, memory-mapped from disk
+
+    Every process maps the same files, so workers share one copy through
+    the page cache. A lookup hashes the address once, checks the bloom
+    filter (most addresses stop here), then binary-searches the sorted
+    keys and compares the stored address to rule out hash collisions.
+    """
+
+    def __init__(self, directory: Path):
+        meta = json.loads((directory / "meta.json").read_text())
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+        self.count = meta["count"]
+        self.categories: List[str] = meta["categories"]
+        self._bits = meta["bloom_bits"]
+        self._hashes = meta["bloom_hashes"]
+        # memoryviews over the mapped arrays index and bisect as plain
+        # Python ints, avoiding per-lookup NumPy scalar overhead
+        self._bloom = memoryview(arrays["bloom"]) if self.count else None
+        self._keys = memoryview(arrays["keys"])
+        self._codes = memoryview(arrays["codes"])
+        self._offsets = memoryview(arrays["offsets"])
+        self._blob = memoryview(arrays["blob"])
+
+    def might_contain(self, h1: int, h2: int) -> bool:
+        if self._bloom is None:
+            return False
+        for i in range(self._hashes):
+            position = (h1 + i * h2) % (1 << 64) % self._bits
+            if not self._bloom[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def lookup(self, address: str) -> Optional[str]:
+        """Category of a listed address, or None"""
+        h1, h2 = address_hashes(address)
+        if not self.might_contain(h1, h2):
+            return None
+        index = bisect_left(self._keys, h1)
+        if index >= self.count or self._keys[index] != h1:
+            return None
+        if self._blob[self._offsets[index]:self._offsets[index + 1]] != address.encode():
+            return None
+        return self.categories[self._codes[index]]
+
+
+class Denylist:
+    """
+    Process-wide denylist loaded from DENYLIST_PATHS
+
+    Source files are compiled once into DENYLIST_CACHE_DIR under a name
+    derived from their paths, sizes and modification times; processes
+    that find the compiled index already there just map it. Sources are
+    re-checked at most every DENYLIST_RELOAD_SECONDS and a changed file
+    is picked up without a restart. `version` increases on every swap so
+    callers can tell when results computed against it are stale.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._index: Optional[DenylistIndex] = None
+        self._fingerprint: Optional[str] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def sources(self) -> List[str]:
+        return [path.strip() for path in settings.denylist_paths.split(",") if path.strip()]
+
+    def _source_fingerprint(self, sources: List[str]) -> str:
+        digest = hashlib.sha256(f"v{INDEX_VERSION}:{settings.denylist_false_positive_rate}".encode())
+        for path in sources:
+            stat = os.stat(path)
+            digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()[:16]
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Swap in a new index if the source files changed (blocking)
+
+        Returns:
+            True when a new index was loaded
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            sources = self.sources
+            try:
+                fingerprint = self._source_fingerprint(sources) if sources else None
+            except OSError as e:
+                logger.warning("Denylist source unavailable, keeping the current index: %s", e)
+                return False
+            if fingerprint == self._fingerprint and not force:
+                return False
+
+            if fingerprint is None:
+                index = None
+            else:
+                start = time.perf_counter()
+                target = Path(settings.denylist_cache_dir) / fingerprint
+                try:
+                    if not target.exists():
+                        compile_index(sources, target, settings.denylist_false_positive_rate)
+                    index = DenylistIndex(target)
+                except Exception as e:
+                    logger.error("Failed to load denylist, keeping the current index: %s", e)
+                    return False
+                logger.info(
+                    "Loaded denylist: %s addresses in %s categories from %s files in %.2fs",
+                    index.count, len(index.categories), len(sources), time.perf_counter() - start
+                )
+
+            self._index = index
+            self._fingerprint = fingerprint
+            self.version += 1
+            DENYLIST_ENTRIES.set(index.count if index else 0)
+            if fingerprint is not None:
+                self._prune(fingerprint)
+            return True
+
+    def _prune(self, keep: str) -> None:
+        """Delete older compiled indexes (processes still mapping them keep their copy)"""
+        cache_dir = Path(settings.denylist_cache_dir)
+        current = (cache_dir / keep).stat().st_mtime
+        for directory in cache_dir.iterdir():
+            if directory.name != keep and directory.is_dir() and directory.stat().st_mtime < current:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _current(self) -> Optional[DenylistIndex]:
+        """The loaded index, re-checking the sources when the reload interval has passed"""
+        if not self._checked or time.monotonic() - self._checked >= settings.denylist_reload_seconds:
+            self.reload()
+        return self._index
+
+    def fingerprint(self) -> str:
+        """Identifies the loaded sources ("" when no denylist is configured)"""
+        self._current()
+        return self._fingerprint or ""
+
+    def lookup(self, address: str) -> Optional[str]:
+        """
+        Category of a listed address, or None
+
+        Unlisted addresses are rejected by the bloom filter in a few
+        microseconds without touching the exact index.
+        """
+        index = self._current()
+        return index.lookup(address) if index else None
+
+    def lookup_many(self, addresses: Iterable[str]) -> Dict[str, str]:
+        """Listed addresses among the given ones, mapped to their category"""
+        index = self._current()
+        if index is None:
+            return {}
+        hits = {}
+        for address in addresses:
+            category = index.lookup(address)
+            if category is not None:
+                hits[address] = category
+        return hits
+
+
+# Global denylist instance
+denylist = Denylist()
@@ -0,0 +1,556 @@
+"""
+Counterparty Graph
+CSR adjacency of UTXO counterparties with k-hop exposure to flagged addresses
+"""
+import fcntl
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.logging import get_logger
+from services.blockchain.denylist import denylist
+
+logger = get_logger(__name__)
+
+# Inputs/outputs per transaction linked into the graph (largest by value);
+# bounds the edges a single consolidation or airdrop transaction adds
+MAX_TX_ENDPOINTS = 32
+
+# Rebuild the CSR snapshot once pending edges exceed this share of it
+REBUILD_RATIO = 0.1
+
+# Transaction hashes are deduplicated on their first 64 bits
+_HASH_KEY_CHARS = 16
+
+
+class Interner:
+    """Maps strings (addresses, asset units) to dense int32 ids"""
+
+    def __init__(self, strings: Iterable[str] = ()):
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for string in strings:
+            self.intern(string)
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def intern(self, string: str) -> int:
+        node = self._ids.get(string)
+        if node is None:
+            with self._lock:
+                node = self._ids.get(string)
+                if node is None:
+                    node = len(self.strings)
+                    self.strings.append(string)
+                    self._ids[string] = node
+        return node
+
+    def get(self, string: str) -> Optional[int]:
+        return self._ids.get(string)
+
+
+class CounterpartyGraph:
+    """
+    Immutable undirected counterparty graph in CSR form
+
+    The neighbours of node v are indices[indptr[v]:indptr[v + 1]], and
+    weights holds each edge's share of v's total flow (rows sum to 1), so
+    propagation is a weighted average over counterparties. Memory is
+    12 bytes per directed edge plus 8 per node.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        # Row id of every edge, used to aggregate per node with bincount
+        self._rows = np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(indptr))
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def from_edges(cls, src: np.ndarray, dst: np.ndarray, values: np.ndarray, num_nodes: int) -> "CounterpartyGraph":
+        """
+        Build the graph from directed value flows
+
+        Both directions of every flow are stored, and repeated pairs are
+        merged by summing their values before row normalisation.
+        """
+        rows = np.concatenate([src, dst]).astype(np.int64)
+        cols = np.concatenate([dst, src]).astype(np.int64)
+        keys, inverse = np.unique(rows * num_nodes + cols, return_inverse=True)
+        values = np.bincount(inverse, weights=np.concatenate([values, values]), minlength=len(keys))
+
+        rows = keys // num_nodes
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+
+        totals = np.bincount(rows, weights=values, minlength=num_nodes)
+        # Zero-value flows still link two addresses; give them equal shares
+        degree = np.diff(indptr)
+        shares = np.where(
+            totals[rows] > 0,
+            values / np.maximum(totals[rows], 1),
+            1 / np.maximum(degree[rows], 1)
+        )
+        return cls(indptr, (keys % num_nodes).astype(np.int32), shares.astype(np.float32))
+
+    def neighbors(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Neighbour ids and flow shares of a node"""
+        if node >= self.num_nodes:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+    def hop_distances(self, seeds: np.ndarray, max_hops: int) -> np.ndarray:
+        """
+        Multi-source BFS, one vectorised frontier expansion per hop
+
+        Returns:
+            int8 array of hop distances to the nearest seed, -1 beyond max_hops
+        """
+        distances = np.full(self.num_nodes, -1, dtype=np.int8)
+        frontier = np.unique(seeds[seeds < self.num_nodes]).astype(np.int64)
+        distances[frontier] = 0
+
+        for hop in range(1, max_hops + 1):
+            if not len(frontier):
+                break
+            starts = self.indptr[frontier]
+            lengths = self.indptr[frontier + 1] - starts
+            total = int(lengths.sum())
+            if not total:
+                break
+            # Positions of every frontier node's edges, without a Python loop
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+            reached = self.indices[offsets]
+            frontier = np.unique(reached[distances[reached] < 0]).astype(np.int64)
+            distances[frontier] = hop
+
+        return distances
+
+    def propagate(self, seeds: np.ndarray, max_hops: int, damping: float) -> np.ndarray:
+        """
+        Spread taint from the seeds for max_hops iterations
+
+        Each iteration sets a node's taint to damping times the flow-weighted
+        average taint of its counterparties (seeds stay at 1), a PageRank-style
+        walk truncated at max_hops so exposure decays with distance and is
+        diluted through high-volume hubs.
+
+        Returns:
+            float32 array of taint in [0, 1]
+        """
+        seed_mask = np.zeros(self.num_nodes, dtype=np.float32)
+        seed_mask[seeds[seeds < self.num_nodes]] = 1.0
+        taint = seed_mask.copy()
+        for _ in range(max_hops):
+            spread = np.bincount(self._rows, weights=self.weights * taint[self.indices], minlength=self.num_nodes)
+            taint = np.maximum(seed_mask, damping * spread.astype(np.float32))
+        return taint
+
+
+class _EdgeBuffer:
+    """Growable parallel arrays of directed flows and the transactions they came from"""
+
+    def __init__(self, capacity: int = 1024):
+        self.src = np.empty(capacity, dtype=np.int32)
+        self.dst = np.empty(capacity, dtype=np.int32)
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.txs = np.empty(capacity, dtype=np.uint64)
+        self.size = 0
+
+    def extend(self, src: List[int], dst: List[int], values: List[float], txs: List[int]) -> None:
+        end = self.size + len(src)
+        if end > len(self.src):
+            capacity = max(end, 2 * len(self.src))
+            for name in ("src", "dst", "values", "txs"):
+                grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+                grown[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, grown)
+        self.src[self.size:end] = src
+        self.dst[self.size:end] = dst
+        self.values[self.size:end] = values
+        self.txs[self.size:end] = txs
+        self.size = end
+
+
+def transaction_flows(inputs: List[List[Any]], outputs: List[List[Any]]) -> List[Tuple[str, str, float]]:
+    """
+    Directed value flows of one transaction
+
+    Every input address is linked to every non-change output address, with
+    the output's value split across inputs by their share of the input
+    value. Outputs back to an input address are change and are skipped.
+
+    Args:
+        inputs: [address, lovelace, ...] per input address
+        outputs: [address, lovelace, ...] per output address
+    """
+    inputs = sorted(inputs, key=lambda item: item[1], reverse=True)[:MAX_TX_ENDPOINTS]
+    senders = {item[0] for item in inputs}
+    outputs = sorted(
+        (item for item in outputs if item[0] not in senders),
+        key=lambda item: item[1],
+        reverse=True
+    )[:MAX_TX_ENDPOINTS]
+
+    total_in = sum(item[1] for item in inputs)
+    flows = []
+    for sender, sent, *_ in inputs:
+        share = sent / total_in if total_in else 1 / len(inputs)
+        for receiver, received, *_ in outputs:
+            flows.append((sender, receiver, received * share))
+    return flows
+
+
+class CounterpartyGraphStore:
+    """
+    Process-wide counterparty graph fed by every resolved transaction
+
+    Flows are appended to edge buffers and folded into an immutable CSR
+    snapshot once enough are pending, so ingesting costs O(new edges) and
+    the O(E log E) rebuild is amortised. Exposure queries read the
+    wallet's own counterparties from the snapshot plus the pending
+    edges, and their distance and taint from a propagation over the
+    snapshot that is cached until the snapshot or the flagged set changes.
+
+    Flagged addresses are those marked with flag() plus every interned
+    address on the denylist; new addresses are checked as they appear and
+    all of them again when the denylist is reloaded.
+
+    The graph only covers transactions this process has resolved, so its
+    exposure figures differ between replicas and are not used in risk
+    scores.
+    """
+
+    def __init__(self):
+        self.interner = Interner()
+        self._edges = _EdgeBuffer()
+        self._seen_txs = set()
+        self._flagged = set()
+        self._listed = set()
+        self._listed_checked = 0
+        self._denylist_version = None
+        self._snapshot = CounterpartyGraph.from_edges(
+            np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0), 0
+        )
+        self._snapshot_edges = 0
+        self._propagation: Optional[Tuple[Any, np.ndarray, np.ndarray]] = None
+        self._lock = threading.RLock()
+
+    @property
+    def num_edges(self) -> int:
+        return self._edges.size
+
+    def ingest(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add the flows of transaction records carrying UTXO endpoints
+
+        Records without "inputs"/"outputs" and transactions already
+        ingested are skipped.
+
+        Returns:
+            Number of new transactions added
+        """
+        src, dst, values, txs = [], [], [], []
+        added = 0
+        with self._lock:
+            for record in records:
+                if "inputs" not in record:
+                    continue
+                key = int(record["tx_hash"][:_HASH_KEY_CHARS], 16)
+                if key in self._seen_txs:
+                    continue
+                self._seen_txs.add(key)
+                added += 1
+                for sender, receiver, value in transaction_flows(record["inputs"], record["outputs"]):
+                    src.append(self.interner.intern(sender))
+                    dst.append(self.interner.intern(receiver))
+                    values.append(value)
+                    txs.append(key)
+            if src:
+                self._edges.extend(src, dst, values, txs)
+        return added
+
+    def flag(self, addresses: Iterable[str]) -> int:
+        """
+        Mark addresses as risky sources of exposure
+
+        Returns:
+            Number of addresses newly flagged
+        """
+        with self._lock:
+            before = len(self._flagged)
+            self._flagged.update(self.interner.intern(address) for address in addresses)
+            added = len(self._flagged) - before
+            if added:
+                self._propagation = None
+        return added
+
+    def is_flagged(self, address: str) -> bool:
+        node = self.interner.get(address)
+        return node is not None and (node in self._flagged or node in self._listed)
+
+    def _sync_denylist(self) -> None:
+        """Check addresses interned since the last call against the denylist (caller holds the lock)"""
+        addresses = self.interner.strings
+        hits = denylist.lookup_many(addresses[self._listed_checked:])
+        if denylist.version != self._denylist_version:
+            # Reloaded (or first use): every address is checked again
+            self._denylist_version = denylist.version
+            self._listed = set()
+            self._propagation = None
+            hits = denylist.lookup_many(addresses)
+        self._listed_checked = len(addresses)
+        if hits:
+            self._listed.update(self.interner.get(address) for address in hits)
+            self._propagation = None
+
+    def snapshot(self) -> CounterpartyGraph:
+        """Current CSR snapshot, rebuilt when enough edges are pending"""
+        with self._lock:
+            pending = self._edges.size - self._snapshot_edges
+            if pending and pending >= REBUILD_RATIO * self._snapshot_edges:
+                self._rebuild()
+            return self._snapshot
+
+    def _rebuild(self) -> None:
+        """Fold every buffered edge into a new snapshot (caller holds the lock)"""
+        size = self._edges.size
+        self._snapshot = CounterpartyGraph.from_edges(
+            self._edges.src[:size], self._edges.dst[:size], self._edges.values[:size], len(self.interner)
+        )
+        self._snapshot_edges = size
+        self._propagation = None
+        logger.info(
+            "Rebuilt counterparty graph: %s addresses, %s edges",
+            self._snapshot.num_nodes, self._snapshot.num_edges
+        )
+
+    def _propagated(self, max_hops: int, damping: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Hop distances and taint over the snapshot (caller holds the lock)"""
+        key = (max_hops, damping)
+        if self._propagation is None or self._propagation[0] != key:
+            flagged = self._flagged | self._listed
+            seeds = np.fromiter(flagged, dtype=np.int64, count=len(flagged))
+            self._propagation = (
+                key,
+                self._snapshot.hop_distances(seeds, max_hops),
+                self._snapshot.propagate(seeds, max_hops, damping)
+            )
+        return self._propagation[1], self._propagation[2]
+
+    def _direct_counterparties(self, node: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Unique counterparties of a node and their flow values (caller holds the lock)"""
+        neighbors, shares = self._snapshot.neighbors(node)
+        start, end = self._snapshot_edges, self._edges.size
+        src, dst = self._edges.src[start:end], self._edges.dst[start:end]
+        outgoing, incoming = src == node, dst == node
+        # Snapshot shares are relative, so pending flows are scaled against
+        # the node's pending total and given equal weight to the snapshot row
+        pending_ids = np.concatenate([dst[outgoing], src[incoming]])
+        pending_values = np.concatenate([self._edges.values[start:end][outgoing], self._edges.values[start:end][incoming]])
+        if len(pending_ids):
+            pending_total = pending_values.sum()
+            pending_shares = pending_values / pending_total if pending_total else np.full(len(pending_ids), 1 / len(pending_ids))
+            neighbors = np.concatenate([neighbors, pending_ids])
+            shares = np.concatenate([shares, pending_shares])
+        if not len(neighbors):
+            return neighbors, shares
+        unique, inverse = np.unique(neighbors, return_inverse=True)
+        return unique, np.bincount(inverse, weights=shares, minlength=len(unique))
+
+    def exposure(self, address: str, max_hops: Optional[int] = None, damping: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Exposure of an address to flagged addresses
+
+        Args:
+            address: Wallet address
+            max_hops: Hop bound (defaults to COUNTERPARTY_MAX_HOPS)
+            damping: Taint kept per hop (defaults to COUNTERPARTY_DAMPING)
+
+        Returns:
+            counterparties: Distinct addresses transacted with
+            flagged_counterparties: How many of them are flagged
+            flagged_categories: Denylist categories of those ("flagged" for flag())
+            exposure_hops: Hops to the nearest flagged address (0 = none within max_hops)
+            taint: Flow-weighted exposure in [0, 1]
+        """
+        max_hops = settings.counterparty_max_hops if max_hops is None else max_hops
+        damping = settings.counterparty_damping if damping is None else damping
+        self.snapshot()
+
+        with self._lock:
+            node = self.interner.get(address)
+            if node is None:
+                return {
+                    "counterparties": 0,
+                    "flagged_counterparties": 0,
+                    "flagged_categories": [],
+                    "exposure_hops": 0,
+                    "taint": 0.0
+                }
+            self._sync_denylist()
+            neighbors, shares = self._direct_counterparties(node)
+            distances, taint = self._propagated(max(max_hops - 1, 0), damping)
+            flagged = np.fromiter(
+                (int(n) in self._flagged or int(n) in self._listed for n in neighbors),
+                dtype=bool,
+                count=len(neighbors)
+            )
+            flagged_addresses = [self.interner.strings[n] for n in neighbors[flagged]]
+            # A flagged wallet's counterparties are near a flagged address
+            # through the wallet itself, so only direct hits count for it
+            known = neighbors < len(distances)
+            if node in self._flagged or node in self._listed:
+                known[:] = False
+
+        categories = {denylist.lookup(address) or "flagged" for address in flagged_addresses}
+        neighbor_distances = np.full(len(neighbors), -1, dtype=np.int16)
+        neighbor_distances[known] = distances[neighbors[known]]
+        neighbor_distances[flagged] = 0
+        neighbor_taint = np.zeros(len(neighbors), dtype=np.float64)
+        neighbor_taint[known] = taint[neighbors[known]]
+        neighbor_taint[flagged] = 1.0
+
+        reachable = neighbor_distances[neighbor_distances >= 0]
+        total_share = shares.sum()
+        return {
+            "counterparties": int(len(neighbors)),
+            "flagged_counterparties": int(np.count_nonzero(flagged)),
+            "flagged_categories": sorted(categories),
+            "exposure_hops": int(reachable.min()) + 1 if len(reachable) else 0,
+            "taint": round(float(damping * (shares * neighbor_taint).sum() / total_share), 4) if total_share else 0.0
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Merge the graph into the .npz file at path
+
+        API and worker processes all save to the same file on shutdown, so
+        under an exclusive lock on path.lock the file is first read back and
+        the transactions other processes added since are folded into this
+        graph (see _absorb); the union is then written to a temp file unique
+        to this process and moved into place.
+        """
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        lock_fd = os.open(f"{target}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            if target.exists():
+                with np.load(target) as data:
+                    merged = self._absorb(data)
+                if merged:
+                    logger.info("Merged %s transactions saved by other processes into the counterparty graph", merged)
+
+            temp = target.with_name(f"{target.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+            try:
+                with self._lock:
+                    size = self._edges.size
+                    with open(temp, "wb") as handle:
+                        np.savez(
+                            handle,
+                            addresses=np.frombuffer("\n".join(self.interner.strings).encode(), dtype=np.uint8),
+                            src=self._edges.src[:size],
+                            dst=self._edges.dst[:size],
+                            values=self._edges.values[:size],
+                            txs=self._edges.txs[:size],
+                            flagged=np.fromiter(self._flagged, dtype=np.int32, count=len(self._flagged)),
+                            seen=np.fromiter(self._seen_txs, dtype=np.uint64, count=len(self._seen_txs))
+                        )
+                temp.replace(target)
+            finally:
+                temp.unlink(missing_ok=True)
+        finally:
+            os.close(lock_fd)  # releases the lock
+        logger.info("Saved counterparty graph to %s (%s edges)", path, size)
+
+    def load(self, path: str) -> bool:
+        """
+        Replace the graph with one written by save()
+
+        Returns:
+            False when the file does not exist
+        """
+        if not Path(path).exists():
+            return False
+        with np.load(path) as data:
+            with self._lock:
+                self.interner = Interner()
+                self._edges = _EdgeBuffer(max(len(data["src"]), 1024))
+                self._flagged = set()
+                self._listed, self._listed_checked = set(), 0
+                self._seen_txs = set()
+                self._absorb(data)
+                self._rebuild()
+        return True
+
+    def _absorb(self, data) -> int:
+        """
+        Add the transactions of a saved graph that this one does not have yet
+
+        Address ids differ between processes, so the saved ones are mapped
+        through this graph's interner; transactions are matched by hash key.
+
+        Returns:
+            Number of transactions added
+        """
+        addresses = data["addresses"].tobytes().decode()
+        with self._lock:
+            ids = np.fromiter(
+                (self.interner.intern(address) for address in (addresses.split("\n") if addresses else [])),
+                dtype=np.int32
+            )
+            known = np.fromiter(self._seen_txs, dtype=np.uint64, count=len(self._seen_txs))
+            txs = data["txs"]
+            new = ~np.isin(txs, known)
+            if new.any():
+                self._edges.extend(ids[data["src"][new]], ids[data["dst"][new]], data["values"][new], txs[new])
+
+            before = len(self._seen_txs)
+            self._seen_txs.update(data["seen"].tolist())
+            flagged_before = len(self._flagged)
+            self._flagged.update(ids[data["flagged"]].tolist())
+            if len(self._flagged) != flagged_before:
+                self._propagation = None
+            return len(self._seen_txs) - before
+
+
+# Global counterparty graph instance
+counterparty_graph = CounterpartyGraphStore()
+
+
+def load_counterparty_graph() -> None:
+    """Restore the graph saved at COUNTERPARTY_GRAPH_PATH (blocking)"""
+    if not settings.counterparty_graph or not settings.counterparty_graph_path:
+        return
+    try:
+        if counterparty_graph.load(settings.counterparty_graph_path):
+            logger.info("Loaded counterparty graph from %s", settings.counterparty_graph_path)
+    except Exception as e:
+        logger.warning("Could not load counterparty graph, starting empty: %s", e)
+
+
+def save_counterparty_graph() -> None:
+    """Persist the graph to COUNTERPARTY_GRAPH_PATH (blocking)"""
+    if not settings.counterparty_graph or not settings.counterparty_graph_path or not counterparty_graph.num_edges:
+        return
+    try:
+        counterparty_graph.save(settings.counterparty_graph_path)
+    except Exception as e:
+        logger.warning("Could not save counterparty graph: %s", e)
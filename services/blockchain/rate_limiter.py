@@ -0,0 +1,303 @@
+"""
+Blockfrost Rate Limiting
+Adaptive token bucket shared by every Blockfrost call across worker processes
+"""
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from core.config import settings
+from core.logging import get_logger
+from core.metrics import BLOCKFROST_RATE_BUDGET, BLOCKFROST_TOKENS
+from services.storage.mongo_store import mongo_store, RATE_LIMITS_COLLECTION
+
+logger = get_logger(__name__)
+
+# Each lease takes up to this many seconds' worth of requests from the shared bucket
+LEASE_SECONDS = 0.5
+
+# A 429 cuts the shared rate to this share of its current value
+THROTTLE_BACKOFF = 0.5
+
+# Further 429s within this window count as the same overload (every
+# process sees the burst that triggered it; the rate is cut once)
+THROTTLE_COOLDOWN_SECONDS = 2.0
+
+# Share of the configured rate won back per second without 429s
+RECOVERY_PER_SECOND = 0.02
+
+# The adaptive rate never drops below this share of the configured rate
+MIN_RATE_RATIO = 0.05
+
+# Seconds a process uses its local bucket after the shared store failed
+FALLBACK_SECONDS = 30
+
+# Attempts at an optimistic MongoDB update before giving up
+_MONGO_RETRIES = 20
+
+# State transition: current state (None if absent) -> (new state, result)
+Transition = Callable[[Optional[Dict[str, float]]], Tuple[Dict[str, float], Any]]
+
+
+def refill(state: Optional[Dict[str, float]], now: float, ceiling: float, capacity: int) -> Dict[str, float]:
+    """
+    Bring a bucket state up to `now`
+
+    Tokens accrue at the current rate, and the rate itself creeps back
+    towards the configured ceiling (additive increase after the
+    multiplicative decrease applied on a 429).
+    """
+    if state is None:
+        return {"tokens": float(capacity), "rate": ceiling, "updated": now, "throttled": 0.0}
+    elapsed = max(0.0, now - state["updated"])
+    rate = min(state["rate"], ceiling)
+    return {
+        "tokens": min(float(capacity), state["tokens"] + elapsed * rate),
+        "rate": min(ceiling, rate + ceiling * RECOVERY_PER_SECOND * elapsed),
+        "updated": max(now, state["updated"]),
+        "throttled": state["throttled"]
+    }
+
+
+class MemoryLimiterBackend:
+    """Bucket state held in this process only"""
+
+    name = "local"
+
+    def __init__(self):
+        self._states: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def transact(self, key: str, transition: Transition) -> Any:
+        with self._lock:
+            self._states[key], result = transition(self._states.get(key))
+            return result
+
+
+class FileLimiterBackend:
+    """Bucket state in a JSON file, updated under an exclusive flock (processes on one host)"""
+
+    name = "file"
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+
+    def transact(self, key: str, transition: Transition) -> Any:
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), "r+") as handle:
+                content = handle.read()
+                states = json.loads(content) if content else {}
+                states[key], result = transition(states.get(key))
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(states))
+            return result
+        finally:
+            os.close(fd)  # releases the lock
+
+
+class MongoLimiterBackend:
+    """Bucket state in the MongoDB rate_limits collection (processes on any host)"""
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def transact(self, key: str, transition: Transition) -> Any:
+        """Optimistic read-modify-write, retried when another process got there first"""
+        from pymongo.errors import DuplicateKeyError
+
+        for attempt in range(_MONGO_RETRIES):
+            doc = self.collection.find_one({"_id": key})
+            state, result = transition(doc["state"] if doc else None)
+            if doc is None:
+                try:
+                    self.collection.insert_one({"_id": key, "v": 1, "state": state})
+                    return result
+                except DuplicateKeyError:
+                    pass
+            elif self.collection.update_one(
+                {"_id": key, "v": doc["v"]},
+                {"$set": {"state": state}, "$inc": {"v": 1}}
+            ).modified_count:
+                return result
+            time.sleep(random.uniform(0, 0.002 * (attempt + 1)))
+        raise RuntimeError(f"Rate limit state for {key} is too contended")
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by every process calling one Blockfrost project
+
+    The bucket itself (tokens, current rate) lives in a shared backend
+    chosen from BLOCKFROST_LIMITER_BACKEND: MongoDB when reachable,
+    otherwise a flock-protected file, so all API and queue-worker
+    processes draw from one per-project quota. Each process leases about
+    LEASE_SECONDS' worth of tokens at a time and hands them out locally,
+    so most acquisitions never touch the backend.
+
+    The rate starts at BLOCKFROST_RATE_LIMIT. A 429 halves it for every
+    process and empties the bucket; it then recovers linearly, so the
+    limiter settles just under the real quota instead of repeatedly
+    running into it.
+    """
+
+    def __init__(self, rate: float, capacity: int, backend=None, mode: Optional[str] = None, key: Optional[str] = None):
+        """
+        Initialize the limiter
+
+        Args:
+            rate: Configured requests per second, the ceiling of the adaptive rate (0 or less disables limiting)
+            capacity: Maximum burst size
+            backend: Shared state backend (defaults to BLOCKFROST_LIMITER_BACKEND)
+            mode: auto, mongo, file or local
+            key: Bucket name in the backend (defaults to one per Blockfrost project)
+        """
+        self.ceiling = rate
+        self.capacity = max(1, capacity)
+        self.mode = mode or settings.blockfrost_limiter_backend
+        self.key = key or "blockfrost:" + hashlib.sha256((settings.blockfrost_project_id or "").encode()).hexdigest()[:12]
+        self.rate = rate
+        self._backend = backend
+        self._fallback = MemoryLimiterBackend()
+        self._fallback_until = 0.0
+        self._leased = 0
+        self._lock = threading.Lock()
+        self._lease_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ceiling > 0
+
+    def _get_backend(self):
+        """Resolve the shared backend on first use"""
+        if self._backend is not None:
+            return self._backend
+
+        with self._lock:
+            if self._backend is not None:
+                return self._backend
+
+            if self.mode in ("auto", "mongo"):
+                try:
+                    collection = mongo_store.get_sync_collection(RATE_LIMITS_COLLECTION)
+                    collection.database.client.admin.command("ping")
+                    self._backend = MongoLimiterBackend(collection)
+                except Exception as e:
+                    if self.mode == "mongo":
+                        raise
+                    logger.warning("MongoDB unavailable for the Blockfrost rate limiter, using a lock file: %s", e)
+
+            if self._backend is None:
+                self._backend = (
+                    self._fallback if self.mode == "local"
+                    else FileLimiterBackend(settings.blockfrost_limiter_path)
+                )
+
+            logger.info("Blockfrost rate limiter using %s backend", self._backend.name)
+            return self._backend
+
+    def _transact(self, transition: Transition) -> Any:
+        """Apply a transition to the shared bucket, falling back to a local one if it fails"""
+        if time.monotonic() >= self._fallback_until:
+            try:
+                return self._get_backend().transact(self.key, transition)
+            except Exception as e:
+                logger.warning("Shared rate limit state unavailable, limiting locally for %ss: %s", FALLBACK_SECONDS, e)
+                self._fallback_until = time.monotonic() + FALLBACK_SECONDS
+        return self._fallback.transact(self.key, transition)
+
+    def _lease(self) -> float:
+        """
+        Move a batch of tokens from the shared bucket to this process (blocking)
+
+        Returns:
+            0 when tokens were leased, otherwise seconds until the shared
+            bucket holds a whole token
+        """
+        with self._lease_lock:
+            with self._lock:
+                if self._leased >= 1:
+                    return 0.0
+            want = max(1, min(self.capacity, round(self.rate * LEASE_SECONDS)))
+
+            def take(state):
+                state = refill(state, time.time(), self.ceiling, self.capacity)
+                granted = min(want, int(state["tokens"]))
+                state["tokens"] -= granted
+                wait = 0.0 if granted else (1 - state["tokens"]) / state["rate"]
+                return state, (granted, wait, state["rate"], state["tokens"])
+
+            granted, wait, rate, tokens = self._transact(take)
+            with self._lock:
+                self._leased += granted
+                self.rate = rate
+            BLOCKFROST_RATE_BUDGET.set(rate)
+            BLOCKFROST_TOKENS.set(tokens)
+            return wait
+
+    async def acquire(self) -> float:
+        """
+        Wait for permission to send one request
+
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.enabled:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                if self._leased >= 1:
+                    self._leased -= 1
+                    return waited
+            delay = await asyncio.to_thread(self._lease)
+            if delay > 0:
+                # Spread out processes polling the same empty bucket
+                delay *= random.uniform(1.0, 1.2)
+                await asyncio.sleep(delay)
+                waited += delay
+
+    async def throttled(self) -> None:
+        """Record a 429: cut the shared rate (once per cooldown) and empty the bucket"""
+        if not self.enabled:
+            return
+
+        def cut(state):
+            now = time.time()
+            state = refill(state, now, self.ceiling, self.capacity)
+            lowered = now - state["throttled"] >= THROTTLE_COOLDOWN_SECONDS
+            if lowered:
+                state["rate"] = max(self.ceiling * MIN_RATE_RATIO, state["rate"] * THROTTLE_BACKOFF)
+                state["throttled"] = now
+            state["tokens"] = min(state["tokens"], 0.0)
+            return state, (state["rate"], lowered)
+
+        with self._lock:
+            self._leased = 0
+        rate, lowered = await asyncio.to_thread(self._transact, cut)
+        with self._lock:
+            self.rate = rate
+        BLOCKFROST_RATE_BUDGET.set(rate)
+        BLOCKFROST_TOKENS.set(0)
+        if lowered:
+            logger.warning("Blockfrost returned 429, request rate lowered to %.2f/s", rate)
+
+
+# Global Blockfrost rate limiter
+blockfrost_limiter = AdaptiveRateLimiter(
+    rate=settings.blockfrost_rate_limit,
+    capacity=settings.blockfrost_burst
+)
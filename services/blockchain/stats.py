@@ -0,0 +1,328 @@
+"""
+Streaming Transaction Statistics
+Incremental accumulator for transaction risk indicators
+"""
+import bisect
+import math
+from typing import Dict, Any, Iterable, List, Optional
+
+from services.blockchain.accounting import AssetLedger
+from services.blockchain.batch import fee_outlier_fences
+
+# Bump when the meaning of a stored field changes so old state is reseeded
+STATS_VERSION = 4
+
+# Observations a quantile estimator keeps verbatim before switching to
+# P² markers, so short histories get exact (interpolated) percentiles
+EXACT_SAMPLES = 256
+
+
+class RunningMoments:
+    """Welford's online mean and variance"""
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningMoments":
+        return cls(data["count"], data["mean"], data["m2"])
+
+
+class P2Quantile:
+    """
+    P² streaming quantile estimator (Jain & Chlamtac, 1985)
+
+    The first EXACT_SAMPLES observations are kept sorted and the quantile
+    is interpolated from them exactly as np.percentile does. Beyond that
+    the estimator tracks the quantile with five markers seeded from those
+    samples, so memory stays bounded however many observations are added.
+    """
+
+    def __init__(self, p: float):
+        self.p = p
+        self.count = 0
+        self.samples: List[float] = []
+        self.heights: List[float] = []
+        self.positions: List[int] = []
+        self.desired: List[float] = []
+        self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if not self.heights:
+            bisect.insort(self.samples, value)
+            if self.count > EXACT_SAMPLES:
+                self._start_markers()
+            return
+
+        heights = self.heights
+        positions = self.positions
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Adjust the three middle markers towards their desired positions
+        for i in range(1, 4):
+            offset = self.desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or \
+               (offset <= -1 and positions[i - 1] - positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                candidate = self._parabolic(i, step)
+                if heights[i - 1] < candidate < heights[i + 1]:
+                    heights[i] = candidate
+                else:
+                    heights[i] = self._linear(i, step)
+                positions[i] += step
+
+    def _start_markers(self) -> None:
+        """Place the five markers at their desired ranks in the exact samples"""
+        n = len(self.samples)
+        self.desired = [1 + (n - 1) * increment for increment in self.increments]
+        positions = [round(desired) for desired in self.desired]
+        # Markers need distinct ranks (p close to 0 or 1 can round two together)
+        for i in range(1, 5):
+            positions[i] = max(positions[i], positions[i - 1] + 1)
+        for i in range(3, -1, -1):
+            positions[i] = min(positions[i], positions[i + 1] - 1)
+        self.positions = positions
+        # Middle markers start at the interpolated quantiles, so the estimate
+        # carries on from the exact value instead of jumping to a neighbour
+        middle = [self._interpolate(rank - 1) for rank in self.desired[1:4]]
+        self.heights = [self.samples[0], *middle, self.samples[-1]]
+        self.samples = []
+
+    def _interpolate(self, rank: float) -> float:
+        """Linearly interpolated sample at a 0-based fractional rank"""
+        samples = self.samples
+        lower = int(rank)
+        upper = min(lower + 1, len(samples) - 1)
+        return samples[lower] + (rank - lower) * (samples[upper] - samples[lower])
+
+    def _parabolic(self, i: int, step: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i: int, step: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + step * (q[i + step] - q[i]) / (n[i + step] - n[i])
+
+    @property
+    def value(self) -> float:
+        """Current quantile estimate (exact up to EXACT_SAMPLES observations)"""
+        if self.heights:
+            return self.heights[2]
+        if not self.samples:
+            return 0.0
+        return self._interpolate(self.p * (len(self.samples) - 1))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "p": self.p,
+            "count": self.count,
+            "samples": list(self.samples),
+            "heights": list(self.heights),
+            "positions": list(self.positions),
+            "desired": list(self.desired)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "P2Quantile":
+        estimator = cls(data["p"])
+        estimator.count = data["count"]
+        estimator.samples = list(data["samples"])
+        estimator.heights = list(data["heights"])
+        estimator.positions = list(data["positions"])
+        estimator.desired = list(data["desired"])
+        return estimator
+
+
+# Fee quantiles tracked by the accumulator
+FEE_QUANTILES = {"p25": 0.25, "p50": 0.5, "p75": 0.75, "p95": 0.95, "p99": 0.99}
+
+# Native assets listed in a summary, by absolute net delta
+TOP_ASSETS = 5
+
+
+class TransactionStats:
+    """
+    Accumulates transaction indicators one record at a time
+
+    Produces the same summary as BlockchainAnalyzer._summarize_batch, but
+    in bounded memory, and its state round-trips through to_dict/from_dict so
+    a wallet refresh only has to fold in the transactions added since the
+    last run. Fee outliers are judged against the quantile estimates at
+    the time each fee is added, which makes them approximate.
+    """
+
+    def __init__(self, large_threshold: int):
+        self.large_threshold = large_threshold
+        self.count = 0
+        self.total_volume = 0
+        self.total_fees = 0
+        self.received_lovelace = 0
+        self.sent_lovelace = 0
+        self.large_count = 0
+        self.fee_outliers = 0
+        self.assets = AssetLedger()
+        self.flagged: Dict[str, str] = {}
+        self.amounts = RunningMoments()
+        self.fees = RunningMoments()
+        self.fee_quantiles = {name: P2Quantile(p) for name, p in FEE_QUANTILES.items()}
+        self.oldest: Optional[int] = None
+        self.newest: Optional[int] = None
+        self.last_block_height: Optional[int] = None
+        self.boundary_hashes: List[str] = []
+
+    def add(self, tx: Dict[str, Any]) -> None:
+        """Fold a single transaction record into the statistics"""
+        amount = tx["output_amount"]
+        fee = tx["fees"]
+
+        self.count += 1
+        self.total_volume += amount
+        self.total_fees += fee
+        net = tx.get("net_lovelace") or 0
+        if net > 0:
+            self.received_lovelace += net
+        else:
+            self.sent_lovelace -= net
+        self.assets.add(tx.get("asset_deltas", ()))
+        self.flagged.update(tx.get("flagged_counterparties", ()))
+        if amount > self.large_threshold:
+            self.large_count += 1
+
+        self.amounts.add(amount)
+        self.fees.add(fee)
+
+        quantiles = self.fee_quantiles
+        if quantiles["p50"].count >= 5:
+            low, high = fee_outlier_fences(
+                quantiles["p25"].value, quantiles["p50"].value, quantiles["p75"].value
+            )
+            if fee < low or fee > high:
+                self.fee_outliers += 1
+        for estimator in quantiles.values():
+            estimator.add(fee)
+
+        block_time = tx["block_time"]
+        if self.oldest is None or block_time < self.oldest:
+            self.oldest = block_time
+        if self.newest is None or block_time > self.newest:
+            self.newest = block_time
+
+        # Remember every hash in the highest block so a refresh starting at
+        # that block (inclusive) can skip what was already counted
+        block_height = tx.get("block_height")
+        if block_height is not None:
+            if self.last_block_height is None or block_height > self.last_block_height:
+                self.last_block_height = block_height
+                self.boundary_hashes = [tx["tx_hash"]]
+            elif block_height == self.last_block_height:
+                self.boundary_hashes.append(tx["tx_hash"])
+
+    def add_many(self, transactions: Iterable[Dict[str, Any]]) -> None:
+        for tx in transactions:
+            self.add(tx)
+
+    def summary(self) -> Dict[str, Any]:
+        """Summary statistics in the shape used by _build_analysis"""
+        if not self.count:
+            return {"count": 0}
+
+        return {
+            "count": self.count,
+            "total_volume": self.total_volume,
+            "total_fees": self.total_fees,
+            "received_lovelace": self.received_lovelace,
+            "sent_lovelace": self.sent_lovelace,
+            "native_assets": len(self.assets),
+            "top_assets": self.assets.top(TOP_ASSETS),
+            "large_count": self.large_count,
+            "fee_outliers": self.fee_outliers,
+            "fee_percentiles": {
+                name: self.fee_quantiles[name].value for name in ("p50", "p95", "p99")
+            },
+            "flagged_counterparties": len(self.flagged),
+            "flagged_categories": sorted(set(self.flagged.values())),
+            "amount_stddev": self.amounts.stddev,
+            "fee_stddev": self.fees.stddev,
+            "oldest": self.oldest,
+            "newest": self.newest
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": STATS_VERSION,
+            "large_threshold": self.large_threshold,
+            "count": self.count,
+            "total_volume": self.total_volume,
+            "total_fees": self.total_fees,
+            "received_lovelace": self.received_lovelace,
+            "sent_lovelace": self.sent_lovelace,
+            "assets": self.assets.to_dict(),
+            "flagged": dict(self.flagged),
+            "large_count": self.large_count,
+            "fee_outliers": self.fee_outliers,
+            "amounts": self.amounts.to_dict(),
+            "fees": self.fees.to_dict(),
+            "fee_quantiles": {name: q.to_dict() for name, q in self.fee_quantiles.items()},
+            "oldest": self.oldest,
+            "newest": self.newest,
+            "last_block_height": self.last_block_height,
+            "boundary_hashes": list(self.boundary_hashes)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TransactionStats":
+        stats = cls(data["large_threshold"])
+        stats.count = data["count"]
+        stats.total_volume = data["total_volume"]
+        stats.total_fees = data["total_fees"]
+        stats.received_lovelace = data["received_lovelace"]
+        stats.sent_lovelace = data["sent_lovelace"]
+        stats.assets = AssetLedger.from_dict(data["assets"])
+        stats.flagged = dict(data["flagged"])
+        stats.large_count = data["large_count"]
+        stats.fee_outliers = data["fee_outliers"]
+        stats.amounts = RunningMoments.from_dict(data["amounts"])
+        stats.fees = RunningMoments.from_dict(data["fees"])
+        stats.fee_quantiles = {
+            name: P2Quantile.from_dict(q) for name, q in data["fee_quantiles"].items()
+        }
+        stats.oldest = data["oldest"]
+        stats.newest = data["newest"]
+        stats.last_block_height = data["last_block_height"]
+        stats.boundary_hashes = list(data["boundary_hashes"])
+        return stats
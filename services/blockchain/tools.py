@@ -2,10 +2,27 @@
 Custom tools for CrewAI agents to interact with blockchain data
 """
 from crewai.tools import BaseTool
-from typing import Type
+from typing import Optional, Type
 from pydantic import BaseModel, Field
+from core.logging import get_logger
 from services.blockchain.analyzer import get_blockchain_data
 import json
+import threading
+
+logger = get_logger(__name__)
+
+# CrewAI hands exceptions raised by a tool to the agent as text, so the
+# failure is also kept here for the crew to re-raise (one per thread,
+# since each analysis thread runs its own crew)
+_failures = threading.local()
+
+
+def pop_tool_failure() -> Optional[Exception]:
+    """Return and clear the last tool failure in this thread"""
+    failure = getattr(_failures, "error", None)
+    _failures.error = None
+    return failure
+
 
 class BlockchainAnalysisInput(BaseModel):
     """Input schema for blockchain analysis tool"""
@@ -20,25 +37,31 @@ class BlockchainAnalysisTool(BaseTool):
         "data for any Cardano wallet address."
     )
     args_schema: Type[BaseModel] = BlockchainAnalysisInput
-    
+
     def _run(self, wallet_address: str) -> str:
-        """Execute blockchain analysis"""
+        """
+        Execute blockchain analysis
+
+        Errors are raised rather than described to the agent, so a report
+        is never written without the on-chain data; the crew re-raises
+        them (see RiskAnalysisCrew.kickoff) and the job is failed.
+        """
         try:
             # Get blockchain data
             data = get_blockchain_data(wallet_address)
-            
-            # Format the response for the AI agent
-            result = {
-                "wallet_address": wallet_address,
-                "total_transactions": data["transaction_count"],
-                "analysis_summary": data["analysis"],
-                "preliminary_risk_score": data["risk_score"],
-                "address_type": data["address_info"].get("type", "unknown"),
-                "recent_transactions": data["transactions"][:5] if data["transactions"] else []
-            }
-            
-            return json.dumps(result, indent=2)
-            
         except Exception as e:
-            return f"Error analyzing blockchain data: {str(e)}"
+            logger.error("Blockchain analysis tool failed for %s...: %s", wallet_address[:10], e)
+            _failures.error = e
+            raise
+
+        # Format the response for the AI agent
+        result = {
+            "wallet_address": wallet_address,
+            "total_transactions": data["transaction_count"],
+            "analysis_summary": data["analysis"],
+            "preliminary_risk_score": data["risk_score"],
+            "address_type": data["address_info"].get("type", "unknown"),
+            "recent_transactions": data["recent_transactions"][:5]
+        }
 
+        return json.dumps(result, indent=2)
@@ -0,0 +1,186 @@
+"""
+Transaction Cache
+Content-addressed cache for confirmed Cardano transaction details
+"""
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+from core.config import settings
+from core.logging import get_logger
+from services.storage.mongo_store import mongo_store, TRANSACTIONS_COLLECTION
+
+logger = get_logger(__name__)
+
+# Bump when the shape of cached records changes so stale entries are ignored
+CACHE_VERSION = 2
+
+# SQLite bound-parameter limit is 999 on older builds
+_SQLITE_CHUNK = 500
+
+
+class MongoTransactionBackend:
+    """Stores transaction records in the MongoDB transactions collection"""
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_many(self, tx_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        cursor = self.collection.find(
+            {"tx_hash": {"$in": tx_hashes}, "v": CACHE_VERSION},
+            {"_id": 0, "tx_hash": 1, "data": 1}
+        )
+        return {doc["tx_hash"]: doc["data"] for doc in cursor}
+
+    def put_many(self, records: List[Dict[str, Any]]) -> None:
+        from pymongo import UpdateOne
+
+        operations = [
+            UpdateOne(
+                {"tx_hash": record["tx_hash"]},
+                {"$set": {"v": CACHE_VERSION, "data": record}},
+                upsert=True
+            )
+            for record in records
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+
+
+class SQLiteTransactionBackend:
+    """Stores transaction records in a local SQLite file"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transactions ("
+                "tx_hash TEXT PRIMARY KEY, v INTEGER NOT NULL, data TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get_many(self, tx_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(tx_hashes), _SQLITE_CHUNK):
+                chunk = tx_hashes[start:start + _SQLITE_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT tx_hash, data FROM transactions WHERE v = ? AND tx_hash IN ({placeholders})",
+                    [CACHE_VERSION, *chunk]
+                )
+                for tx_hash, data in rows:
+                    found[tx_hash] = json.loads(data)
+        return found
+
+    def put_many(self, records: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO transactions (tx_hash, v, data) VALUES (?, ?, ?)",
+                [(record["tx_hash"], CACHE_VERSION, json.dumps(record)) for record in records]
+            )
+            self._conn.commit()
+
+
+class TransactionCache:
+    """
+    Cache of confirmed transaction details keyed by tx_hash
+
+    Confirmed transactions are immutable, so entries never expire. The
+    backend is chosen lazily from TX_CACHE_BACKEND: MongoDB when reachable,
+    otherwise a local SQLite file.
+    """
+
+    def __init__(self, backend=None, mode: Optional[str] = None):
+        self._backend = backend
+        self.mode = mode or settings.tx_cache_backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _get_backend(self):
+        """Resolve the storage backend on first use"""
+        if self._backend is not None:
+            return self._backend
+
+        with self._lock:
+            if self._backend is not None:
+                return self._backend
+
+            if self.mode in ("auto", "mongo"):
+                try:
+                    collection = mongo_store.get_sync_collection(TRANSACTIONS_COLLECTION)
+                    collection.database.client.admin.command("ping")
+                    self._backend = MongoTransactionBackend(collection)
+                except Exception as e:
+                    if self.mode == "mongo":
+                        raise
+                    logger.warning("MongoDB unavailable for transaction cache, using SQLite: %s", e)
+
+            if self._backend is None:
+                self._backend = SQLiteTransactionBackend(settings.tx_cache_path)
+
+            logger.info("Transaction cache using %s backend", self._backend.name)
+            return self._backend
+
+    def get_many(self, tx_hashes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up cached transaction records
+
+        Args:
+            tx_hashes: Transaction hashes to look up
+
+        Returns:
+            Mapping of tx_hash to cached record for every hit
+        """
+        tx_hashes = list(tx_hashes)
+        if not self.enabled or not tx_hashes:
+            return {}
+
+        try:
+            found = self._get_backend().get_many(tx_hashes)
+        except Exception as e:
+            logger.warning("Transaction cache lookup failed: %s", e)
+            found = {}
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(tx_hashes) - len(found)
+        return found
+
+    def put_many(self, records: List[Dict[str, Any]]) -> None:
+        """Store confirmed transaction records"""
+        records = [record for record in records if record.get("block_height") is not None]
+        if not self.enabled or not records:
+            return
+
+        try:
+            self._get_backend().put_many(records)
+        except Exception as e:
+            logger.warning("Transaction cache write failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since process start"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0
+            }
+
+
+# Global transaction cache instance
+transaction_cache = TransactionCache()
@@ -0,0 +1,163 @@
+"""
+Wallet Sync State
+Per-address streaming statistics used for incremental wallet refreshes
+"""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from core.config import settings
+from core.logging import get_logger
+from services.storage.mongo_store import mongo_store, WALLET_SYNC_COLLECTION
+
+logger = get_logger(__name__)
+
+
+class MongoWalletSyncBackend:
+    """Stores sync state in the MongoDB wallet_sync collection"""
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one({"key": key}, {"_id": 0})
+
+    def put(self, key: str, state: Dict[str, Any]) -> None:
+        self.collection.replace_one({"key": key}, {"key": key, **state}, upsert=True)
+
+
+class SQLiteWalletSyncBackend:
+    """Stores sync state in a local SQLite file"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS wallet_sync (key TEXT PRIMARY KEY, state TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM wallet_sync WHERE key = ?", (key,)).fetchone()
+        return {"key": key, **json.loads(row[0])} if row else None
+
+    def put(self, key: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO wallet_sync (key, state) VALUES (?, ?)",
+                (key, json.dumps(state))
+            )
+            self._conn.commit()
+
+
+class WalletSyncStore:
+    """
+    Keeps each analyzed address's streaming statistics
+
+    The state is a serialized TransactionStats (which records the last
+    block counted) plus the most recent transaction records, so a refresh
+    only streams blocks at or above that one (see
+    BlockchainAnalyzer.refresh_stats).
+    """
+
+    def __init__(self, backend=None, mode: Optional[str] = None):
+        self._backend = backend
+        self.mode = mode or settings.tx_cache_backend
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _get_backend(self):
+        """Resolve the storage backend on first use"""
+        if self._backend is not None:
+            return self._backend
+
+        with self._lock:
+            if self._backend is not None:
+                return self._backend
+
+            if self.mode in ("auto", "mongo"):
+                try:
+                    collection = mongo_store.get_sync_collection(WALLET_SYNC_COLLECTION)
+                    collection.database.client.admin.command("ping")
+                    self._backend = MongoWalletSyncBackend(collection)
+                except Exception as e:
+                    if self.mode == "mongo":
+                        raise
+                    logger.warning("MongoDB unavailable for wallet sync state, using SQLite: %s", e)
+
+            if self._backend is None:
+                self._backend = SQLiteWalletSyncBackend(settings.tx_cache_path)
+
+            return self._backend
+
+    @staticmethod
+    def _key(network: str, address: str) -> str:
+        return f"{network}:{address}"
+
+    def get_stats(self, network: str, address: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored streaming statistics state for an address
+
+        Returns:
+            Dict with "stats" (TransactionStats.to_dict()) and
+            "recent_transactions", or None if never stored
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            return self._get_backend().get(f"stats:{self._key(network, address)}")
+        except Exception as e:
+            logger.warning("Failed to read transaction stats for %s...: %s", address[:10], e)
+            return None
+
+    def save_stats(
+        self,
+        network: str,
+        address: str,
+        stats: Dict[str, Any],
+        recent_transactions: List[Dict[str, Any]],
+        denylist_fingerprint: str = ""
+    ) -> None:
+        """
+        Store the streaming statistics state for an address
+
+        Args:
+            network: Cardano network name
+            address: Wallet address
+            stats: Serialized TransactionStats
+            recent_transactions: Most recent transaction records, newest first
+            denylist_fingerprint: Denylist the counterparties were checked against
+        """
+        if not self.enabled:
+            return
+
+        state = {
+            "network": network,
+            "address": address,
+            "stats": stats,
+            "recent_transactions": recent_transactions,
+            "denylist_fingerprint": denylist_fingerprint,
+            "updated_at": int(time.time())
+        }
+        try:
+            self._get_backend().put(f"stats:{self._key(network, address)}", state)
+        except Exception as e:
+            logger.warning("Failed to store transaction stats for %s...: %s", address[:10], e)
+
+
+# Global wallet sync store instance
+wallet_sync_store = WalletSyncStore()
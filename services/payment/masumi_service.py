@@ -2,29 +2,59 @@
 Masumi Payment Service
 Handles payment creation, monitoring, and completion
 """
+import asyncio
+import os
+import socket
+import time
 import uuid
-from typing import Dict, Any, Callable, Optional
-from masumi.config import Config
-from masumi.payment import Payment
+from typing import TYPE_CHECKING, Dict, Any, Awaitable, Callable, Optional, Tuple
+
+import aiohttp
 
 from core.logging import get_logger
 from core.config import settings
+from core.metrics import PAYMENT_OPERATION_SECONDS, instrument_methods
+from services.payment.poller import create_payment_poller
+from services.storage.mongo_store import mongo_store
+
+if TYPE_CHECKING:
+    # masumi's package import pulls in its own server stack, so it is
+    # loaded on first use rather than at startup
+    from masumi.config import Config
+    from masumi.payment import Payment
 
 logger = get_logger(__name__)
 
+# Job fields needed to resume monitoring after a restart
+REHYDRATE_FIELDS = {
+    "job_id": 1,
+    "blockchain_identifier": 1,
+    "identifier_from_purchaser": 1,
+    "input_data": 1,
+    "pay_by_time": 1
+}
+
 
+@instrument_methods(PAYMENT_OPERATION_SECONDS)
 class MasumiPaymentService:
     """Service for managing Masumi payments"""
     
     def __init__(self):
         """Initialize Masumi payment service"""
-        self.config: Optional[Config] = None
-        self.payment_instances: Dict[str, Payment] = {}
+        self.config: Optional["Config"] = None
+        self.payment_instances: Dict[str, "Payment"] = {}
+        self.poller = create_payment_poller(self.resolve_payment_status, self.save_payment_state)
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Identifies this process as the owner of the payments it polls
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._make_callbacks: Optional[Callable[[str], Tuple[Callable[..., Awaitable[Any]], Callable[[], Awaitable[Any]]]]] = None
+        self._lease_task: Optional[asyncio.Task] = None
         logger.info("MasumiPaymentService initialized")
     
     def _ensure_config(self):
         """Lazy-load config when first needed"""
         if self.config is None:
+            from masumi.config import Config
             self.config = Config(
                 payment_service_url=settings.payment_service_url,
                 payment_api_key=settings.payment_api_key
@@ -49,9 +79,10 @@ class MasumiPaymentService:
             Payment request data including blockchain identifier
         """
         self._ensure_config()
-        logger.info(f"Creating payment request for job {job_id}")
+        logger.info("Creating payment request for job %s", job_id)
         
         # Create payment instance
+        from masumi.payment import Payment
         payment = Payment(
             agent_identifier=settings.agent_identifier,
             config=self.config,
@@ -68,7 +99,7 @@ class MasumiPaymentService:
         # Store payment instance
         self.payment_instances[job_id] = payment
         
-        logger.info(f"Payment request created with blockchain ID: {blockchain_identifier}")
+        logger.info("Payment request created with blockchain ID: %s", blockchain_identifier)
         
         return {
             "blockchain_identifier": blockchain_identifier,
@@ -79,45 +110,238 @@ class MasumiPaymentService:
             "input_hash": payment.input_hash
         }
     
+    def restore_payment_instance(self, job_id: str, job: Dict[str, Any]) -> "Payment":
+        """
+        Rebuild a payment instance from a stored job
+        
+        Used by processes that did not create the payment request
+        (queue workers, restarted API nodes).
+        
+        Args:
+            job_id: Job identifier
+            job: Stored job document
+            
+        Returns:
+            The restored payment instance
+        """
+        self._ensure_config()
+        from masumi.payment import Payment
+        payment = Payment(
+            agent_identifier=settings.agent_identifier,
+            config=self.config,
+            identifier_from_purchaser=job["identifier_from_purchaser"],
+            input_data=job["input_data"],
+            network=settings.network
+        )
+        payment.payment_ids.add(job["blockchain_identifier"])
+        self.payment_instances[job_id] = payment
+        
+        logger.debug("Restored payment instance for job %s", job_id)
+        return payment
+    
     async def start_monitoring(
         self,
         job_id: str,
-        callback: Callable[[str], Any]
+        callback: Callable[[Dict[str, Any]], Awaitable[Any]],
+        pay_by_time: Optional[str] = None,
+        on_expired: Optional[Callable[[], Awaitable[Any]]] = None
     ) -> None:
         """
         Start monitoring payment status
         
+        The payment is registered with the shared poller rather than
+        starting a monitoring loop per payment instance.
+        
         Args:
             job_id: Job identifier
             callback: Callback function to call when payment is confirmed
+            pay_by_time: Payment deadline (payByTime) from the payment request
+            on_expired: Callback function to call when the deadline passes unpaid
         """
         if job_id not in self.payment_instances:
-            logger.error(f"No payment instance found for job {job_id}")
+            logger.error("No payment instance found for job %s", job_id)
             return
         
-        logger.info(f"Starting payment monitoring for job {job_id}")
-        await self.payment_instances[job_id].start_status_monitoring(callback)
+        logger.info("Starting payment monitoring for job %s", job_id)
+        blockchain_identifier = next(iter(self.payment_instances[job_id].payment_ids))
+        self.poller.register(job_id, blockchain_identifier, callback, pay_by_time, on_expired)
     
-    async def check_payment_status(self, job_id: str) -> Dict[str, Any]:
+    def monitor_claim(self) -> Dict[str, Any]:
+        """Monitoring ownership fields for a job created (and polled) by this process"""
+        return {
+            "monitor_owner": self.owner_id,
+            "monitor_lease_expires_at": time.time() + settings.payment_monitor_lease_seconds
+        }
+    
+    async def rehydrate_monitoring(
+        self,
+        make_callbacks: Callable[[str], Tuple[Callable[..., Awaitable[Any]], Callable[[], Awaitable[Any]]]]
+    ) -> int:
         """
-        Check current payment status
+        Resume monitoring for jobs awaiting payment that no process owns
+        
+        Payment instances only live in process memory, so after a deploy
+        or crash they are rebuilt from MongoDB. Each job is claimed first
+        (see MongoStore.claim_monitoring), so with several API replicas a
+        payment is polled by one of them. The claims are then renewed in
+        the background, and jobs whose owner stopped renewing are adopted.
+        
+        Jobs are streamed with a cursor in batches of PAYMENT_POLL_MAX_CHECKS,
+        and each batch's first status check is pushed back one poller tick
+        so a large backlog is spread out instead of hitting the payment API
+        at once.
         
         Args:
-            job_id: Job identifier
+            make_callbacks: Returns (payment callback, expiry callback) for a job ID
             
         Returns:
-            Payment status data
+            Number of jobs whose monitoring was resumed
         """
-        if job_id not in self.payment_instances:
-            logger.warning(f"No payment instance found for job {job_id}")
-            return {"status": "unknown"}
-        
+        self._make_callbacks = make_callbacks
+        restored = await self._adopt_jobs()
+        logger.info("Resumed payment monitoring for %s jobs", restored)
+        if self._lease_task is None or self._lease_task.done():
+            self._lease_task = asyncio.create_task(self._maintain_leases())
+        return restored
+    
+    async def _adopt_jobs(self) -> int:
+        """Claim and start polling awaiting_payment jobs without a live owner"""
+        batch_size = self.poller.max_checks
+        restored = 0
         try:
-            status = await self.payment_instances[job_id].check_payment_status()
-            return status
+            async for job in mongo_store.iter_jobs(
+                status="awaiting_payment",
+                projection=REHYDRATE_FIELDS,
+                batch_size=batch_size,
+                filters={"$or": [
+                    {"monitor_owner": None},
+                    {"monitor_lease_expires_at": {"$lt": time.time()}}
+                ]}
+            ):
+                job_id = job["job_id"]
+                if job_id in self.payment_instances:
+                    continue
+                if not await mongo_store.claim_monitoring(job_id, self.owner_id, settings.payment_monitor_lease_seconds):
+                    continue
+                try:
+                    self.restore_payment_instance(job_id, job)
+                except Exception as e:
+                    logger.error("Cannot resume monitoring for job %s: %s", job_id, e)
+                    continue
+                
+                callback, on_expired = self._make_callbacks(job_id)
+                delay = self.poller.min_interval + (restored // batch_size) * self.poller.tick_seconds
+                self.poller.register(
+                    job_id,
+                    job["blockchain_identifier"],
+                    callback,
+                    job.get("pay_by_time"),
+                    on_expired,
+                    delay=delay
+                )
+                restored += 1
+                if restored % batch_size == 0:
+                    # Let the event loop serve requests between batches
+                    await asyncio.sleep(0)
         except Exception as e:
-            logger.error(f"Error checking payment status: {str(e)}")
-            return {"status": "error", "error": str(e)}
+            logger.error("Error rehydrating payment monitoring: %s", e)
+        return restored
+    
+    async def _maintain_leases(self) -> None:
+        """
+        Renew this process's monitoring leases and adopt orphaned jobs
+        
+        Runs every third of the lease. Payments this process no longer
+        owns (paid, expired or taken over while a renewal failed) stop
+        being polled here.
+        """
+        interval = settings.payment_monitor_lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                job_ids = self.poller.job_ids()
+                if job_ids:
+                    owned = await mongo_store.renew_monitoring(
+                        self.owner_id, job_ids, settings.payment_monitor_lease_seconds
+                    )
+                    for job_id in job_ids:
+                        if job_id not in owned:
+                            logger.info("No longer monitoring payment for job %s", job_id)
+                            self.stop_monitoring(job_id)
+                adopted = await self._adopt_jobs()
+                if adopted:
+                    logger.info("Adopted payment monitoring for %s orphaned jobs", adopted)
+            except Exception as e:
+                logger.error("Error renewing payment monitoring leases: %s", e)
+    
+    async def resolve_payment_status(self, blockchain_identifier: str) -> Dict[str, Any]:
+        """
+        Look up a payment by blockchain identifier
+        
+        Equivalent to Payment.check_payment_status_by_identifier, but over
+        one shared HTTP session instead of a new connection per request.
+        
+        Args:
+            blockchain_identifier: Payment blockchain identifier
+            
+        Returns:
+            Payment status data
+        """
+        self._ensure_config()
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers={
+                "token": self.config.payment_api_key,
+                "Content-Type": "application/json"
+            })
+        
+        payload = {
+            "network": settings.network,
+            "blockchainIdentifier": blockchain_identifier,
+            "includeHistory": "false"
+        }
+        url = f"{self.config.payment_service_url}/payment/resolve-blockchain-identifier"
+        async with self._session.post(url, json=payload) as response:
+            if response.status == 404:
+                return {"status": "error", "message": f"Payment {blockchain_identifier} not found", "data": None}
+            if response.status != 200:
+                raise Exception(f"Status check failed: {await response.text()}")
+            return await response.json()
+    
+    async def check_payment_status(self, job_id: str, blockchain_identifier: str) -> Dict[str, Any]:
+        """
+        Check current payment status and persist the snapshot
+        
+        Args:
+            job_id: Job identifier
+            blockchain_identifier: Payment blockchain identifier
+            
+        Returns:
+            Payment state snapshot as stored on the job
+        """
+        result = await self.resolve_payment_status(blockchain_identifier)
+        return await self.save_payment_state(job_id, result.get("data") or {})
+    
+    async def save_payment_state(self, job_id: str, payment: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Store a payment state snapshot on the job document
+        
+        Called by the poller whenever a payment's on-chain state changes,
+        so /status can answer from MongoDB alone.
+        
+        Args:
+            job_id: Job identifier
+            payment: Payment record from the payment service
+            
+        Returns:
+            The stored snapshot
+        """
+        snapshot = {
+            "on_chain_state": payment.get("onChainState"),
+            "next_action": (payment.get("NextAction") or {}).get("requestedAction"),
+            "checked_at": time.time()
+        }
+        await mongo_store.update_job(job_id, {"payment_state": snapshot})
+        return snapshot
     
     async def complete_payment(
         self,
@@ -137,18 +361,18 @@ class MasumiPaymentService:
             Completion response from Masumi
         """
         if job_id not in self.payment_instances:
-            logger.error(f"No payment instance found for job {job_id}")
+            logger.error("No payment instance found for job %s", job_id)
             raise ValueError(f"No payment instance for job {job_id}")
         
-        logger.info(f"Completing payment {payment_id} for job {job_id}")
-        logger.info(f"Result length: {len(result)} characters")
+        logger.info("Completing payment %s for job %s", payment_id, job_id)
+        logger.info("Result length: %s characters", len(result))
         
         completion_response = await self.payment_instances[job_id].complete_payment(
             payment_id,
             result
         )
         
-        logger.info(f"Payment completion response: {completion_response}")
+        logger.debug("Payment completion response: %s", completion_response)
         return completion_response
     
     def stop_monitoring(self, job_id: str) -> None:
@@ -159,13 +383,24 @@ class MasumiPaymentService:
             job_id: Job identifier
         """
         if job_id in self.payment_instances:
-            logger.info(f"Stopping payment monitoring for job {job_id}")
-            self.payment_instances[job_id].stop_status_monitoring()
+            logger.info("Stopping payment monitoring for job %s", job_id)
             del self.payment_instances[job_id]
+        self.poller.unregister(job_id)
     
     def has_payment_instance(self, job_id: str) -> bool:
         """Check if payment instance exists for job"""
         return job_id in self.payment_instances
+    
+    async def close(self) -> None:
+        """Stop the payment poller, hand its payments to other processes and close the HTTP session"""
+        if self._lease_task is not None:
+            self._lease_task.cancel()
+            await asyncio.gather(self._lease_task, return_exceptions=True)
+            self._lease_task = None
+            await mongo_store.release_monitoring(self.owner_id)
+        await self.poller.stop()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
 
 
 # Global payment service instance
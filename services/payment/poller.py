@@ -0,0 +1,279 @@
+"""
+Payment Status Poller
+Single scheduler that checks every pending payment from one loop
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from core.config import settings
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Growth of a payment's check interval after each unsuccessful check
+BACKOFF_FACTOR = 1.5
+# How long after payByTime a payment is still checked before it expires
+EXPIRY_GRACE_SECONDS = 120
+
+# Marker for payments whose state has not been observed yet
+_UNSEEN = object()
+
+
+def parse_pay_by_time(value: Any) -> Optional[float]:
+    """
+    Convert a Masumi payByTime into a Unix timestamp
+
+    Masumi returns ISO 8601 strings, but epoch milliseconds are accepted too.
+
+    Args:
+        value: payByTime as returned by the payment service
+
+    Returns:
+        Unix timestamp in seconds, or None when it cannot be parsed
+    """
+    if value is None:
+        return None
+    try:
+        if isinstance(value, (int, float)) or str(value).isdigit():
+            return int(value) / 1000
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        logger.warning("Could not parse payByTime %r", value)
+        return None
+
+
+class PendingPayment:
+    """Scheduling state of one monitored payment"""
+
+    __slots__ = (
+        "job_id", "blockchain_identifier", "callback", "on_expired",
+        "pay_by", "checks", "next_check", "last_state"
+    )
+
+    def __init__(
+        self,
+        job_id: str,
+        blockchain_identifier: str,
+        callback: Callable[[Dict[str, Any]], Awaitable[Any]],
+        on_expired: Optional[Callable[[], Awaitable[Any]]],
+        pay_by: Optional[float],
+        next_check: float
+    ):
+        self.job_id = job_id
+        self.blockchain_identifier = blockchain_identifier
+        self.callback = callback
+        self.on_expired = on_expired
+        self.pay_by = pay_by
+        self.checks = 0
+        self.next_check = next_check
+        self.last_state: Any = _UNSEEN
+
+
+class PaymentStatusPoller:
+    """
+    Shared payment-status scheduler
+
+    Replaces one Payment.start_status_monitoring loop per job. Each tick
+    picks the payments whose next check is due (at most max_checks, oldest
+    first) and resolves them with bounded concurrency, so outbound requests
+    are capped per tick regardless of how many jobs are waiting. A
+    payment's interval backs off from min_interval towards max_interval
+    but is clamped so the last check before payByTime is never skipped.
+    Once payByTime plus a grace period passes without funds, the payment
+    is dropped and its on_expired hook runs. Whenever a payment's
+    on-chain state changes, on_state_change receives the payment record so
+    it can be persisted without a write per check.
+    """
+
+    def __init__(
+        self,
+        resolve: Callable[[str], Awaitable[Dict[str, Any]]],
+        tick_seconds: float,
+        min_interval: float,
+        max_interval: float,
+        max_checks: int,
+        concurrency: int,
+        on_state_change: Optional[Callable[[str, Dict[str, Any]], Awaitable[Any]]] = None
+    ):
+        self.resolve = resolve
+        self.on_state_change = on_state_change
+        self.tick_seconds = tick_seconds
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.max_checks = max(1, max_checks)
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._pending: Dict[str, PendingPayment] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._callback_tasks: Set[asyncio.Task] = set()
+        self.checks_total = 0
+
+    def register(
+        self,
+        job_id: str,
+        blockchain_identifier: str,
+        callback: Callable[[Dict[str, Any]], Awaitable[Any]],
+        pay_by_time: Any = None,
+        on_expired: Optional[Callable[[], Awaitable[Any]]] = None,
+        delay: Optional[float] = None
+    ) -> None:
+        """
+        Start polling a payment
+
+        Args:
+            job_id: Job identifier
+            blockchain_identifier: Payment blockchain identifier
+            callback: Coroutine called with the payment record once funds are locked
+            pay_by_time: Masumi payByTime, used to schedule the final checks
+            on_expired: Coroutine called when payByTime passes without payment
+            delay: Seconds until the first check (defaults to min_interval)
+        """
+        self._pending[job_id] = PendingPayment(
+            job_id=job_id,
+            blockchain_identifier=blockchain_identifier,
+            callback=callback,
+            on_expired=on_expired,
+            pay_by=parse_pay_by_time(pay_by_time),
+            next_check=time.time() + (self.min_interval if delay is None else delay)
+        )
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        logger.debug("Polling payment for job %s (%s pending)", job_id, len(self._pending))
+
+    def unregister(self, job_id: str) -> None:
+        """Stop polling a payment"""
+        self._pending.pop(job_id, None)
+
+    def is_registered(self, job_id: str) -> bool:
+        return job_id in self._pending
+
+    def job_ids(self) -> List[str]:
+        """Jobs whose payments are being polled"""
+        return list(self._pending)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _next_interval(self, entry: PendingPayment, now: float) -> float:
+        interval = min(self.max_interval, self.min_interval * BACKOFF_FACTOR ** entry.checks)
+        if entry.pay_by is not None:
+            remaining = entry.pay_by - now
+            if remaining > 0:
+                # Never sleep past the deadline
+                interval = min(interval, max(self.min_interval, remaining))
+            else:
+                interval = min(interval, EXPIRY_GRACE_SECONDS)
+        return interval
+
+    def _dispatch(self, coro: Awaitable[Any], job_id: str) -> None:
+        async def run():
+            try:
+                await coro
+            except Exception as e:
+                logger.error("Payment callback failed for job %s: %s", job_id, e)
+
+        task = asyncio.create_task(run())
+        self._callback_tasks.add(task)
+        task.add_done_callback(self._callback_tasks.discard)
+
+    async def _check(self, entry: PendingPayment) -> None:
+        from masumi.payment import PaymentNextAction, PaymentOnChainState
+
+        async with self._semaphore:
+            try:
+                result = await self.resolve(entry.blockchain_identifier)
+            except Exception as e:
+                logger.error("Error checking payment for job %s: %s", entry.job_id, e)
+                result = None
+        self.checks_total += 1
+
+        # The job may have been unregistered while the request was in flight
+        if self._pending.get(entry.job_id) is not entry:
+            return
+
+        now = time.time()
+        payment = (result or {}).get("data") or {}
+        on_chain_state = payment.get("onChainState")
+        next_action = (payment.get("NextAction") or {}).get("requestedAction")
+
+        if result is not None and on_chain_state != entry.last_state:
+            entry.last_state = on_chain_state
+            if self.on_state_change is not None:
+                self._dispatch(self.on_state_change(entry.job_id, payment), entry.job_id)
+
+        if on_chain_state == PaymentOnChainState.FUNDS_LOCKED.value:
+            logger.info("Payment for job %s reached FundsLocked, triggering callback", entry.job_id)
+            self.unregister(entry.job_id)
+            self._dispatch(entry.callback(payment), entry.job_id)
+            return
+
+        if on_chain_state is not None and (
+            on_chain_state == PaymentOnChainState.RESULT_SUBMITTED.value
+            or next_action == PaymentNextAction.NONE.value
+        ):
+            logger.info("Payment for job %s is settled (%s), no longer polling", entry.job_id, on_chain_state)
+            self.unregister(entry.job_id)
+            return
+
+        if entry.pay_by is not None and now > entry.pay_by + EXPIRY_GRACE_SECONDS:
+            logger.warning("Payment for job %s not received before payByTime", entry.job_id)
+            self.unregister(entry.job_id)
+            if entry.on_expired is not None:
+                self._dispatch(entry.on_expired(), entry.job_id)
+            return
+
+        entry.checks += 1
+        entry.next_check = now + self._next_interval(entry, now)
+
+    async def _run(self) -> None:
+        logger.info("Payment status poller started")
+        while self._pending:
+            try:
+                now = time.time()
+                due = sorted(
+                    (entry for entry in self._pending.values() if entry.next_check <= now),
+                    key=lambda entry: entry.next_check
+                )[:self.max_checks]
+                if due:
+                    logger.debug("Checking %s of %s pending payments", len(due), len(self._pending))
+                    await asyncio.gather(*(self._check(entry) for entry in due))
+            except Exception as e:
+                logger.error("Error in payment poller tick: %s", e)
+            await asyncio.sleep(self.tick_seconds)
+        logger.info("No pending payments, payment status poller stopped")
+
+    async def stop(self) -> None:
+        """Cancel the polling loop and any running callbacks"""
+        tasks = list(self._callback_tasks)
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "checks_total": self.checks_total,
+            "callbacks_running": len(self._callback_tasks)
+        }
+
+
+def create_payment_poller(
+    resolve: Callable[[str], Awaitable[Dict[str, Any]]],
+    on_state_change: Optional[Callable[[str, Dict[str, Any]], Awaitable[Any]]] = None
+) -> PaymentStatusPoller:
+    """Build a poller from PAYMENT_POLL_* settings"""
+    return PaymentStatusPoller(
+        resolve=resolve,
+        on_state_change=on_state_change,
+        tick_seconds=settings.payment_poll_tick_seconds,
+        min_interval=settings.payment_poll_min_interval,
+        max_interval=settings.payment_poll_max_interval,
+        max_checks=settings.payment_poll_max_checks,
+        concurrency=settings.payment_poll_concurrency
+    )
@@ -0,0 +1,115 @@
+"""
+Job Event Bus
+Notifies status listeners when a job document changes
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set
+
+from core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Job fields whose changes are published to listeners
+WATCHED_FIELDS = ("status", "payment_status", "stage")
+
+# Progress stages of a running job (stored in the job's "stage" field)
+STAGE_FETCHING = "fetching"    # Loading on-chain data
+STAGE_ANALYZING = "analyzing"  # LLM crew running
+STAGE_SCORING = "scoring"      # Deterministic scoring and report
+STAGE_REPORTING = "reporting"  # Formatting and submitting the result
+
+
+class JobEventBus:
+    """
+    Per-job pub/sub for status changes
+
+    MongoStore.update_job publishes every job update in-process. When the
+    deployment runs on a replica set, a change stream on the jobs
+    collection also delivers updates made by other processes (queue
+    workers, other API nodes); on a standalone MongoDB the bus stays
+    in-process only and listeners fall back to periodic re-reads.
+    Listeners may see the same update twice and should de-duplicate.
+    """
+
+    def __init__(self):
+        self._listeners: Dict[str, Set[asyncio.Queue]] = {}
+        self._watch_task: Optional[asyncio.Task] = None
+        self.change_stream_active = False
+
+    @contextmanager
+    def listen(self, job_id: str) -> Iterator[asyncio.Queue]:
+        """
+        Receive updates for a job while the context is open
+
+        Args:
+            job_id: Job identifier
+
+        Yields:
+            Queue of dicts holding the changed watched fields
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(job_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            listeners = self._listeners.get(job_id)
+            if listeners is not None:
+                listeners.discard(queue)
+                if not listeners:
+                    del self._listeners[job_id]
+
+    def publish(self, job_id: str, updates: Dict[str, Any]) -> None:
+        """Deliver the watched fields of a job update to its listeners"""
+        listeners = self._listeners.get(job_id)
+        if not listeners:
+            return
+        changed = {field: updates[field] for field in WATCHED_FIELDS if field in updates}
+        if not changed:
+            return
+        for queue in listeners:
+            queue.put_nowait(changed)
+
+    @property
+    def listener_count(self) -> int:
+        return sum(len(listeners) for listeners in self._listeners.values())
+
+    def start(self, collection) -> None:
+        """Start following the jobs collection's change stream"""
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(collection))
+
+    async def _watch(self, collection) -> None:
+        from pymongo.errors import PyMongoError
+
+        pipeline = [
+            {"$match": {"operationType": "update"}},
+            {"$project": {
+                "fullDocument.job_id": 1,
+                **{f"updateDescription.updatedFields.{field}": 1 for field in WATCHED_FIELDS}
+            }}
+        ]
+        try:
+            async with collection.watch(pipeline, full_document="updateLookup") as stream:
+                self.change_stream_active = True
+                logger.info("Following job updates via MongoDB change stream")
+                async for change in stream:
+                    job_id = (change.get("fullDocument") or {}).get("job_id")
+                    if job_id:
+                        self.publish(job_id, change["updateDescription"]["updatedFields"])
+        except asyncio.CancelledError:
+            raise
+        except PyMongoError as e:
+            logger.info("Change streams unavailable, using in-process job events only: %s", e)
+        finally:
+            self.change_stream_active = False
+
+    async def stop(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
+
+# Global job event bus instance
+job_events = JobEventBus()
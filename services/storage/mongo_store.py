@@ -3,12 +3,40 @@ MongoDB Storage Service
 Handles persistent job storage for RiskLens AI
 """
 import os
-from typing import Optional, Dict, Any
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 from motor.motor_asyncio import AsyncIOMotorClient
 from core.logging import get_logger
+from core.metrics import MONGO_OPERATION_SECONDS, instrument_methods
+from services.storage.job_events import job_events
 
 logger = get_logger(__name__)
 
+# Collection holding immutable transaction details (see services.blockchain.tx_cache)
+TRANSACTIONS_COLLECTION = "transactions"
+
+# Collection holding cached analysis reports (see services.storage.result_cache)
+ANALYSIS_RESULTS_COLLECTION = "analysis_results"
+
+# Collection holding per-address streaming statistics (see services.blockchain.wallet_sync)
+WALLET_SYNC_COLLECTION = "wallet_sync"
+
+# Collection holding shared rate limiter buckets (see services.blockchain.rate_limiter)
+RATE_LIMITS_COLLECTION = "rate_limits"
+
+# Job fields returned by /status
+JOB_STATUS_FIELDS = {
+    "_id": 0,
+    "status": 1,
+    "payment_status": 1,
+    "payment_state": 1,
+    "stage": 1,
+    "blockchain_identifier": 1,
+    "result": 1
+}
+
+@instrument_methods(MONGO_OPERATION_SECONDS)
 class MongoStore:
     """MongoDB-based job storage for distributed deployment"""
     
@@ -22,8 +50,8 @@ class MongoStore:
             # Always use the database name from env var or default
             # Don't extract from URL - create a new database if needed
             self.mongo_db = os.getenv("MONGO_DB", "risklens_ai")
-            logger.info(f"🔗 Using MONGO_URL for connection")
-            logger.info(f"📂 Will use/create database: {self.mongo_db}")
+            logger.info("🔗 Using MONGO_URL for connection")
+            logger.info("📂 Will use/create database: %s", self.mongo_db)
         else:
             # Priority 2: Build connection string from individual env vars (Kubernetes)
             mongo_host = os.getenv("MONGO_HOST") or os.getenv("MONGOHOST", "mongodb")
@@ -35,16 +63,19 @@ class MongoStore:
             # Build connection string
             if mongo_user and mongo_password:
                 self.mongo_uri = f"mongodb://{mongo_user}:{mongo_password}@{mongo_host}:{mongo_port}"
-                logger.info(f"🔗 Using MongoDB with authentication: {mongo_host}:{mongo_port}")
+                logger.info("🔗 Using MongoDB with authentication: %s:%s", mongo_host, mongo_port)
             else:
                 self.mongo_uri = f"mongodb://{mongo_host}:{mongo_port}"
-                logger.info(f"🔗 Using MongoDB without authentication: {mongo_host}:{mongo_port}")
+                logger.info("🔗 Using MongoDB without authentication: %s:%s", mongo_host, mongo_port)
             
             self.mongo_db = mongo_db
         
         self.client: Optional[AsyncIOMotorClient] = None
+        self.sync_client = None
         self.db = None
         self.jobs_collection = None
+        self.transactions_collection = None
+        self.analysis_results_collection = None
         
     async def connect(self):
         """Connect to MongoDB"""
@@ -58,6 +89,8 @@ class MongoStore:
             
             self.db = self.client[self.mongo_db]
             self.jobs_collection = self.db.jobs
+            self.transactions_collection = self.db[TRANSACTIONS_COLLECTION]
+            self.analysis_results_collection = self.db[ANALYSIS_RESULTS_COLLECTION]
             
             # Create indexes for better performance using IndexModel
             from pymongo import IndexModel, ASCENDING
@@ -65,7 +98,9 @@ class MongoStore:
             indexes = [
                 IndexModel([("job_id", ASCENDING)], unique=True, name="job_id_unique"),
                 IndexModel([("status", ASCENDING)], name="status_index"),
-                IndexModel([("blockchain_identifier", ASCENDING)], name="blockchain_id_index")
+                IndexModel([("blockchain_identifier", ASCENDING)], name="blockchain_id_index"),
+                IndexModel([("status", ASCENDING), ("queued_at", ASCENDING)], name="queue_index"),
+                IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)], name="lease_index")
             ]
             
             # Create indexes asynchronously
@@ -74,7 +109,21 @@ class MongoStore:
                 logger.info("✅ MongoDB indexes created successfully")
             except Exception as idx_error:
                 # Indexes might already exist, which is fine
-                logger.info(f"ℹ️  Index creation note: {str(idx_error)}")
+                logger.info("ℹ️  Index creation note: %s", idx_error)
+            
+            try:
+                await self.transactions_collection.create_indexes([
+                    IndexModel([("tx_hash", ASCENDING)], unique=True, name="tx_hash_unique")
+                ])
+                await self.db[WALLET_SYNC_COLLECTION].create_indexes([
+                    IndexModel([("key", ASCENDING)], unique=True, name="wallet_sync_key_unique")
+                ])
+                await self.analysis_results_collection.create_indexes([
+                    IndexModel([("key", ASCENDING)], unique=True, name="result_key_unique"),
+                    IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="result_ttl")
+                ])
+            except Exception as idx_error:
+                logger.info("ℹ️  Cache index creation note: %s", idx_error)
             
             # Mask password in URI for logging
             safe_uri = self.mongo_uri
@@ -87,11 +136,11 @@ class MongoStore:
                         user = auth_and_host[0].split(":")[0]
                         safe_uri = f"{parts[0]}://{user}:***@{auth_and_host[1]}"
             
-            logger.info(f"✅ Connected to MongoDB successfully")
-            logger.info(f"📂 Database: {self.mongo_db}")
-            logger.info(f"🔗 Connection: {safe_uri}")
+            logger.info("✅ Connected to MongoDB successfully")
+            logger.info("📂 Database: %s", self.mongo_db)
+            logger.info("🔗 Connection: %s", safe_uri)
         except Exception as e:
-            logger.error(f"❌ Failed to connect to MongoDB: {str(e)}")
+            logger.error("❌ Failed to connect to MongoDB: %s", e)
             raise
     
     async def disconnect(self):
@@ -99,6 +148,24 @@ class MongoStore:
         if self.client:
             self.client.close()
             logger.info("Disconnected from MongoDB")
+        if self.sync_client:
+            self.sync_client.close()
+            self.sync_client = None
+    
+    def get_sync_collection(self, name: str):
+        """
+        Get a synchronous pymongo collection
+        
+        Used by code that runs off the event loop (e.g. the blockchain
+        analyzer inside CrewAI tools), where motor cannot be awaited.
+        
+        Args:
+            name: Collection name
+        """
+        if self.sync_client is None:
+            from pymongo import MongoClient
+            self.sync_client = MongoClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
+        return self.sync_client[self.mongo_db][name]
     
     async def ping(self):
         """Ping MongoDB to check connection health"""
@@ -115,9 +182,9 @@ class MongoStore:
                 **job_data
             }
             await self.jobs_collection.insert_one(job_doc)
-            logger.info(f"Stored job {job_id} in MongoDB")
+            logger.info("Stored job %s in MongoDB", job_id)
         except Exception as e:
-            logger.error(f"Failed to store job {job_id}: {str(e)}")
+            logger.error("Failed to store job %s: %s", job_id, e)
             raise
     
     async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
@@ -131,7 +198,18 @@ class MongoStore:
                 return job_doc
             return None
         except Exception as e:
-            logger.error(f"Failed to retrieve job {job_id}: {str(e)}")
+            logger.error("Failed to retrieve job %s: %s", job_id, e)
+            return None
+    
+    async def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Read only the fields served by /status (single indexed lookup)"""
+        try:
+            return await self.jobs_collection.find_one(
+                {"job_id": job_id},
+                JOB_STATUS_FIELDS
+            )
+        except Exception as e:
+            logger.error("Failed to retrieve status for job %s: %s", job_id, e)
             return None
     
     async def update_job(self, job_id: str, updates: Dict[str, Any]):
@@ -142,34 +220,303 @@ class MongoStore:
                 {"$set": updates}
             )
             if result.modified_count > 0:
-                logger.info(f"Updated job {job_id} in MongoDB")
+                logger.info("Updated job %s in MongoDB", job_id)
+                job_events.publish(job_id, updates)
             else:
-                logger.warning(f"Job {job_id} not found for update")
+                logger.warning("Job %s not found for update", job_id)
         except Exception as e:
-            logger.error(f"Failed to update job {job_id}: {str(e)}")
+            logger.error("Failed to update job %s: %s", job_id, e)
             raise
     
     async def delete_job(self, job_id: str):
         """Delete job data from MongoDB"""
         try:
             await self.jobs_collection.delete_one({"job_id": job_id})
-            logger.info(f"Deleted job {job_id} from MongoDB")
+            logger.info("Deleted job %s from MongoDB", job_id)
         except Exception as e:
-            logger.error(f"Failed to delete job {job_id}: {str(e)}")
+            logger.error("Failed to delete job %s: %s", job_id, e)
     
-    async def get_all_jobs(self, status: Optional[str] = None) -> list:
-        """Get all jobs, optionally filtered by status"""
+    async def iter_jobs(
+        self,
+        status: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 100,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream jobs with a cursor, optionally filtered by status
+        
+        Args:
+            status: Only yield jobs with this status
+            projection: Fields to fetch (all fields when None)
+            batch_size: Documents fetched per round trip
+            filters: Additional query conditions
+        """
+        query = {"status": status} if status else {}
+        query.update(filters or {})
+        cursor = self.jobs_collection.find(query, projection).batch_size(batch_size)
         try:
-            query = {"status": status} if status else {}
-            cursor = self.jobs_collection.find(query)
-            jobs = await cursor.to_list(length=100)
-            # Remove MongoDB _id field
-            for job in jobs:
+            async for job in cursor:
                 job.pop('_id', None)
-            return jobs
+                yield job
+        finally:
+            await cursor.close()
+    
+    async def get_all_jobs(self, status: Optional[str] = None, limit: Optional[int] = None) -> list:
+        """Get all jobs (up to limit), optionally filtered by status"""
+        jobs = []
+        try:
+            async for job in self.iter_jobs(status):
+                jobs.append(job)
+                if limit is not None and len(jobs) >= limit:
+                    break
+        except Exception as e:
+            logger.error("Failed to retrieve jobs: %s", e)
+        return jobs
+    
+    async def get_cached_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get an unexpired cached analysis report"""
+        try:
+            doc = await self.analysis_results_collection.find_one(
+                {"key": key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+                {"_id": 0, "result": 1}
+            )
+            return doc["result"] if doc else None
+        except Exception as e:
+            logger.error("Failed to read cached result: %s", e)
+            return None
+    
+    async def set_cached_result(self, key: str, result: Dict[str, Any], ttl_seconds: int):
+        """Store an analysis report; MongoDB's TTL index removes it after expiry"""
+        try:
+            await self.analysis_results_collection.replace_one(
+                {"key": key},
+                {
+                    "key": key,
+                    "result": result,
+                    "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.error("Failed to store cached result: %s", e)
+    
+    async def transition_job(
+        self,
+        job_id: str,
+        from_status: str,
+        updates: Dict[str, Any],
+        worker_id: Optional[str] = None
+    ) -> bool:
+        """
+        Update a job only while it is still in from_status
+        
+        Used for state changes that must happen once, such as dispatching a
+        paid job: a repeated or late payment callback finds the job already
+        moved on and changes nothing.
+        
+        Args:
+            job_id: Job identifier
+            from_status: Status the job must still have
+            updates: Fields to set
+            worker_id: Also require the job to be leased by this worker, so
+                a worker that lost its lease cannot overwrite the new owner
+        
+        Returns:
+            True if this call made the transition
+        """
+        query = {"job_id": job_id, "status": from_status}
+        if worker_id is not None:
+            query["worker_id"] = worker_id
+        result = await self.jobs_collection.update_one(query, {"$set": updates})
+        if not result.matched_count:
+            return False
+        logger.info("Job %s moved from %s to %s", job_id, from_status, updates.get("status"))
+        job_events.publish(job_id, updates)
+        return True
+    
+    async def enqueue_job(self, job_id: str, payment_id: str) -> bool:
+        """
+        Mark a paid job as ready for a worker to claim
+        
+        Returns:
+            False if the job was no longer awaiting payment (already queued,
+            running or finished), in which case nothing was changed
+        """
+        return await self.transition_job(job_id, "awaiting_payment", {
+            "status": "queued",
+            "payment_status": "paid",
+            "payment_id": payment_id,
+            "queued_at": time.time(),
+            "attempts": 0,
+            "worker_id": None,
+            "lease_expires_at": None
+        })
+    
+    async def claim_monitoring(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """
+        Take over payment monitoring of a job awaiting payment
+        
+        Succeeds when the job has no monitoring owner, its owner's lease
+        expired, or it is already ours, so each payment is polled by one
+        API process.
+        
+        Returns:
+            True if this owner now monitors the job
+        """
+        now = time.time()
+        result = await self.jobs_collection.update_one(
+            {
+                "job_id": job_id,
+                "status": "awaiting_payment",
+                "$or": [
+                    {"monitor_owner": {"$in": [None, owner]}},
+                    {"monitor_lease_expires_at": {"$lt": now}}
+                ]
+            },
+            {"$set": {"monitor_owner": owner, "monitor_lease_expires_at": now + lease_seconds}}
+        )
+        return result.matched_count > 0
+    
+    async def renew_monitoring(self, owner: str, job_ids: List[str], lease_seconds: float) -> Set[str]:
+        """
+        Extend the monitoring leases of an owner's jobs
+        
+        Returns:
+            The given job IDs the owner still monitors (jobs that were paid,
+            expired or taken over by another process are left out)
+        """
+        query = {"job_id": {"$in": job_ids}, "monitor_owner": owner, "status": "awaiting_payment"}
+        await self.jobs_collection.update_many(
+            query,
+            {"$set": {"monitor_lease_expires_at": time.time() + lease_seconds}}
+        )
+        return {job["job_id"] async for job in self.jobs_collection.find(query, {"_id": 0, "job_id": 1})}
+    
+    async def release_monitoring(self, owner: str) -> None:
+        """Expire an owner's monitoring leases so other processes adopt its jobs right away"""
+        try:
+            await self.jobs_collection.update_many(
+                {"monitor_owner": owner, "status": "awaiting_payment"},
+                {"$set": {"monitor_lease_expires_at": 0}}
+            )
+        except Exception as e:
+            logger.error("Failed to release payment monitoring leases: %s", e)
+    
+    async def claim_job(self, worker_id: str, lease_seconds: int, max_attempts: int) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim the oldest queued job
+        
+        Jobs whose worker stopped heartbeating (expired lease) are
+        reclaimed as well, up to max_attempts.
+        
+        Args:
+            worker_id: Identifier of the claiming worker
+            lease_seconds: Lease duration; renewed by heartbeat_job
+            max_attempts: Maximum claims per job
+            
+        Returns:
+            The claimed job document, or None if nothing is claimable
+        """
+        from pymongo import ReturnDocument
+        
+        now = time.time()
+        try:
+            job_doc = await self.jobs_collection.find_one_and_update(
+                {
+                    "$or": [
+                        {"status": "queued"},
+                        {"status": "running", "lease_expires_at": {"$lt": now}}
+                    ],
+                    "attempts": {"$lt": max_attempts}
+                },
+                {
+                    "$set": {
+                        "status": "running",
+                        "worker_id": worker_id,
+                        "claimed_at": now,
+                        "lease_expires_at": now + lease_seconds
+                    },
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("queued_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+            if job_doc:
+                job_doc.pop('_id', None)
+                logger.info("Worker %s claimed job %s (attempt %s)", worker_id, job_doc['job_id'], job_doc['attempts'])
+            return job_doc
+        except Exception as e:
+            logger.error("Failed to claim job: %s", e)
+            return None
+    
+    async def heartbeat_job(self, job_id: str, worker_id: str, lease_seconds: int) -> bool:
+        """
+        Extend a claimed job's lease
+        
+        Returns:
+            False if the lease was lost to another worker (errors are
+            raised, since a failed write does not mean the lease is gone)
+        """
+        try:
+            result = await self.jobs_collection.update_one(
+                {"job_id": job_id, "worker_id": worker_id, "status": "running"},
+                {"$set": {"lease_expires_at": time.time() + lease_seconds}}
+            )
+            return result.matched_count > 0
+        except Exception as e:
+            logger.error("Failed to heartbeat job %s: %s", job_id, e)
+            raise
+    
+    async def holds_job(self, job_id: str, worker_id: str) -> bool:
+        """Whether a worker still holds the lease on a running job"""
+        job_doc = await self.jobs_collection.find_one(
+            {"job_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"_id": 1}
+        )
+        return job_doc is not None
+    
+    async def release_job(self, job_id: str, worker_id: str) -> None:
+        """
+        Expire a worker's lease on a job it stopped running
+        
+        The job is then reclaimed by the next claim_job, or failed by
+        fail_exhausted_jobs once it has used its attempts. Does nothing if
+        another worker holds the job or it has finished.
+        """
+        try:
+            await self.jobs_collection.update_one(
+                {"job_id": job_id, "worker_id": worker_id, "status": "running"},
+                {"$set": {"lease_expires_at": 0}}
+            )
+        except Exception as e:
+            logger.error("Failed to release job %s: %s", job_id, e)
+    
+    async def fail_exhausted_jobs(self, max_attempts: int) -> int:
+        """Fail jobs whose lease expired after their last allowed attempt"""
+        try:
+            result = await self.jobs_collection.update_many(
+                {
+                    "status": "running",
+                    "lease_expires_at": {"$lt": time.time()},
+                    "attempts": {"$gte": max_attempts}
+                },
+                {"$set": {"status": "failed", "error": f"Job abandoned after {max_attempts} attempts"}}
+            )
+            if result.modified_count:
+                logger.warning("Failed %s jobs that exhausted their attempts", result.modified_count)
+            return result.modified_count
+        except Exception as e:
+            logger.error("Failed to sweep exhausted jobs: %s", e)
+            return 0
+    
+    async def count_jobs(self, status: str) -> int:
+        """Count jobs with the given status"""
+        try:
+            return await self.jobs_collection.count_documents({"status": status})
         except Exception as e:
-            logger.error(f"Failed to retrieve jobs: {str(e)}")
-            return []
+            logger.error("Failed to count jobs: %s", e)
+            return 0
 
 # Global MongoDB store instance
 mongo_store = MongoStore()
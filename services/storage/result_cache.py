@@ -0,0 +1,171 @@
+"""
+Analysis Result Cache
+Serves recent wallet reports again while the wallet has no new transactions
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from core.config import settings
+from core.logging import get_logger
+from services.blockchain.analyzer import get_analyzer
+from services.blockchain.denylist import denylist
+from services.storage.mongo_store import mongo_store
+
+logger = get_logger(__name__)
+
+# Bump whenever analysis output changes so cached reports are not reused
+PIPELINE_VERSION = "3"
+
+
+class AnalysisResultCache:
+    """
+    Two-level cache of analysis reports
+
+    Reports are keyed by (wallet_address, network, newest tx_hash, pipeline
+    version, analysis settings, denylist), so any new transaction on the
+    wallet, a settings change or a denylist reload changes the key and
+    forces a fresh analysis. An in-process LRU sits in front of
+    the MongoDB analysis_results collection, and concurrent requests for
+    the same key share a single in-flight computation.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lru: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    @staticmethod
+    def make_key(wallet_address: str, network: str, latest_tx_hash: str, denylist_fingerprint: str = "") -> str:
+        analysis_settings = "|".join(str(value) for value in (
+            settings.analysis_mode,
+            settings.blockchain_max_transactions,
+            settings.wallet_sync_incremental,
+            settings.fast_path_low_max,
+            settings.fast_path_critical_min
+        ))
+        raw = "|".join((
+            wallet_address, network, latest_tx_hash, PIPELINE_VERSION, analysis_settings, denylist_fingerprint
+        ))
+        return hashlib.sha256(raw.encode()).hexdigest()
+    
+    async def key_for_wallet(self, wallet_address: str) -> Optional[str]:
+        """
+        Build the cache key for a wallet's current state
+        
+        Costs one Blockfrost request for the newest transaction hash.
+        
+        Returns:
+            Cache key, or None when caching is disabled or the wallet
+            state cannot be determined
+        """
+        if not self.enabled:
+            return None
+        network = os.getenv("NETWORK", "Preprod").lower()
+        latest_tx_hash = await asyncio.to_thread(get_analyzer(network).get_latest_tx_hash, wallet_address)
+        if latest_tx_hash is None:
+            return None
+        return self.make_key(wallet_address, network, latest_tx_hash, await asyncio.to_thread(denylist.fingerprint))
+
+    def _lru_get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at < time.time():
+            del self._lru[key]
+            return None
+        self._lru.move_to_end(key)
+        return result
+
+    def _lru_put(self, key: str, result: Dict[str, Any]) -> None:
+        self._lru[key] = (time.time() + self.ttl_seconds, result)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a report in the LRU, then MongoDB"""
+        result = self._lru_get(key)
+        if result is None:
+            result = await mongo_store.get_cached_result(key)
+            if result is not None:
+                self._lru_put(key, result)
+        return result
+
+    async def put(self, key: str, result: Dict[str, Any]) -> None:
+        self._lru_put(key, result)
+        await mongo_store.set_cached_result(key, result, self.ttl_seconds)
+
+    async def get_or_compute(
+        self,
+        key: Optional[str],
+        compute: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Return the cached report for key, computing it at most once
+
+        Args:
+            key: Cache key from make_key, or None to bypass the cache
+            compute: Coroutine factory producing the report
+        """
+        if not self.enabled or key is None:
+            return await compute()
+
+        cached = await self.get(key)
+        if cached is not None:
+            self.hits += 1
+            logger.info("Serving cached analysis report")
+            return cached
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.hits += 1
+            logger.info("Joining in-flight analysis for the same wallet")
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await compute()
+            await self.put(key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Avoid "exception never retrieved" warnings when nobody joined
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+            "lru_entries": len(self._lru),
+            "in_flight": len(self._in_flight)
+        }
+
+
+# Global result cache instance
+result_cache = AnalysisResultCache(
+    ttl_seconds=settings.result_cache_ttl_seconds,
+    max_entries=settings.result_cache_lru_size
+)
@@ -0,0 +1,136 @@
+"""
+Accounting Tests
+Endpoint parsing, per-wallet flows, asset ledgers and the per-transaction fetch
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from services.blockchain.accounting import AssetLedger, implied_fee, parse_endpoints, wallet_flow
+from services.blockchain.analyzer import BlockchainAnalyzer
+
+WALLET = "addr_test1wallet"
+OTHER = "addr_test1other"
+TOKEN = "a" * 56 + "746f6b656e"
+NFT = "b" * 56 + "6e6674"
+INT64_MAX = 2 ** 63 - 1
+
+
+def utxo(address, lovelace, **extra):
+    assets = extra.pop("assets", {})
+    amount = [{"unit": "lovelace", "quantity": str(lovelace)}]
+    amount += [{"unit": unit, "quantity": str(quantity)} for unit, quantity in assets.items()]
+    return {"address": address, "amount": amount, **extra}
+
+
+def test_parse_endpoints_aggregates_per_address():
+    entries = [
+        utxo(WALLET, 5_000_000, assets={TOKEN: 10}),
+        utxo(OTHER, 2_000_000),
+        utxo(WALLET, 3_000_000, assets={TOKEN: 5, NFT: 1}),
+        utxo(OTHER, 9_000_000, collateral=True),
+        utxo(OTHER, 1_000_000, reference=True)
+    ]
+
+    assert parse_endpoints(entries) == [
+        [WALLET, 8_000_000, [[TOKEN, 15], [NFT, 1]]],
+        [OTHER, 2_000_000, []]
+    ]
+
+
+def test_self_transfer_costs_only_the_fee():
+    inputs = parse_endpoints([utxo(WALLET, 10_000_000, assets={TOKEN: 7})])
+    outputs = parse_endpoints([utxo(WALLET, 4_000_000, assets={TOKEN: 7}), utxo(WALLET, 5_830_000)])
+    record = {"inputs": inputs, "outputs": outputs}
+
+    assert implied_fee(inputs, outputs) == 170_000
+    assert wallet_flow(record, WALLET) == (-170_000, [])
+    assert wallet_flow(record, OTHER) == (0, [])
+
+
+def test_multi_asset_flow_nets_out_change():
+    record = {
+        "inputs": [[WALLET, 10_000_000, [[TOKEN, 100], [NFT, 1]]], [OTHER, 3_000_000, []]],
+        "outputs": [
+            [OTHER, 4_000_000, [[TOKEN, 40], [NFT, 1]]],
+            [WALLET, 8_820_000, [[TOKEN, 60]]]
+        ]
+    }
+
+    assert wallet_flow(record, WALLET) == (-1_180_000, [[TOKEN, -40], [NFT, -1]])
+    assert wallet_flow(record, OTHER) == (1_000_000, [[TOKEN, 40], [NFT, 1]])
+
+
+def test_ledger_drops_zero_balances_and_ranks_by_size():
+    ledger = AssetLedger()
+    ledger.add([[TOKEN, 100], [NFT, 1]])
+    ledger.add([[NFT, -1], [TOKEN, -300]])
+
+    assert len(ledger) == 1
+    assert ledger.top(5) == [{"unit": TOKEN, "net": -200}]
+    assert AssetLedger.from_dict(ledger.to_dict()).to_dict() == {TOKEN: -200}
+
+
+def test_ledger_merge():
+    first, second = AssetLedger.from_dict({TOKEN: 5, NFT: 1}), AssetLedger.from_dict({TOKEN: -5})
+    first.merge(second)
+
+    assert first.to_dict() == {NFT: 1}
+
+
+def test_ledger_totals_saturate_near_int64_max():
+    ledger = AssetLedger()
+    ledger.add([[TOKEN, INT64_MAX - 1], [NFT, -(INT64_MAX - 1)]])
+    ledger.add([[TOKEN, 10], [NFT, -10]])
+
+    assert ledger.to_dict() == {TOKEN: INT64_MAX, NFT: -INT64_MAX}
+
+    # Large deltas that cancel out are still summed exactly
+    ledger.add([[TOKEN, -INT64_MAX], [TOKEN, 2 ** 40]])
+    assert ledger.to_dict() == {TOKEN: 2 ** 40, NFT: -INT64_MAX}
+    # Quantities beyond int64 are clamped on the way in
+    ledger.add([[NFT, -(2 ** 70)]])
+    assert ledger.to_dict()[NFT] == -INT64_MAX
+
+
+class FakeApi:
+    """Blockfrost stand-in counting the requests made per endpoint"""
+
+    def __init__(self, inputs, outputs, fees=0):
+        self.body = {"inputs": inputs, "outputs": outputs}
+        self.fees = fees
+        self.calls = []
+
+    def transaction_utxos(self, tx_hash):
+        self.calls.append("utxos")
+        return self.body
+
+    def transaction(self, tx_hash):
+        self.calls.append("transaction")
+        return SimpleNamespace(fees=str(self.fees), size=300)
+
+
+def fetch(api):
+    analyzer = BlockchainAnalyzer()
+    analyzer.api = api
+    return analyzer._fetch_transaction(SimpleNamespace(tx_hash="c" * 64, block_height=1, block_time=2))
+
+
+def test_fetch_derives_the_fee_from_one_request():
+    api = FakeApi([utxo(WALLET, 10_000_000)], [utxo(OTHER, 9_800_000)])
+
+    record = fetch(api)
+    assert api.calls == ["utxos"]
+    assert record["fees"] == 200_000
+    assert record["inputs"] == [[WALLET, 10_000_000, []]]
+
+
+@pytest.mark.parametrize("output", [
+    7_800_000,   # 2 ADA stake deposit paid on top of the fee
+    12_000_000   # rewards withdrawn: outputs exceed inputs
+])
+def test_fetch_asks_for_the_fee_when_it_cannot_be_implied(output):
+    api = FakeApi([utxo(WALLET, 10_000_000)], [utxo(WALLET, output)], fees=180_000)
+
+    assert fetch(api)["fees"] == 180_000
+    assert api.calls == ["utxos", "transaction"]
@@ -0,0 +1,190 @@
+"""
+Blockchain Analyzer Tests
+Concurrent detail fetching and paged history streaming against a fake Blockfrost API
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from blockfrost import ApiError
+
+from core.config import settings
+from services.blockchain.analyzer import BlockchainAnalyzer
+
+WALLET = "addr_test1wallet"
+OTHER = "addr_test1other"
+FEE = 170_000
+
+
+def lovelace(address, quantity):
+    return {"address": address, "amount": [{"unit": "lovelace", "quantity": str(quantity)}]}
+
+
+def api_error(status_code):
+    body = {"status_code": status_code, "error": "Error", "message": "m"}
+    return ApiError(SimpleNamespace(json=lambda: body))
+
+
+class FakeBlockfrost:
+    """Blockfrost stand-in with slow detail lookups that records their concurrency"""
+
+    def __init__(self, count, delay=0.01):
+        self.listing = [
+            SimpleNamespace(tx_hash=f"{index:064x}", block_height=5000 - index, block_time=1_700_000_000 - index)
+            for index in range(count)
+        ]
+        self.delay = delay
+        self.missing = set()
+        self.pages = []
+        self.fetched = []
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def address_transactions(self, address, from_block=None, count=100, page=1, order="desc"):
+        self.pages.append((page, from_block))
+        if not self.listing:
+            raise api_error(404)  # Blockfrost's answer for an address without history
+        listing = [tx for tx in self.listing if from_block is None or tx.block_height >= int(from_block)]
+        return listing[(page - 1) * count:page * count]
+
+    def transaction_utxos(self, tx_hash):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            # Later transactions answer sooner, so completion order differs from listing order
+            time.sleep(self.delay * (1 - int(tx_hash, 16) / (len(self.listing) or 1)))
+            if tx_hash in self.missing:
+                raise api_error(404)
+            with self._lock:
+                self.fetched.append(tx_hash)
+            return {"inputs": [lovelace(OTHER, 10_000_000 + FEE)], "outputs": [lovelace(WALLET, 10_000_000)]}
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class MemoryCache:
+    def __init__(self):
+        self.records = {}
+
+    def get_many(self, tx_hashes):
+        return {tx_hash: self.records[tx_hash] for tx_hash in tx_hashes if tx_hash in self.records}
+
+    def put_many(self, records):
+        self.records.update((record["tx_hash"], record) for record in records)
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(settings, "counterparty_graph", False)
+    monkeypatch.setattr(settings, "blockfrost_max_concurrency", 4)
+    return BlockchainAnalyzer(cache=MemoryCache())
+
+
+def hydrate(analyzer, api, max_workers=None):
+    analyzer.api = api
+    return analyzer._hydrate_transactions(api.listing, WALLET, max_workers)
+
+
+def test_details_are_fetched_concurrently_in_listing_order(analyzer):
+    api = FakeBlockfrost(20)
+
+    records = hydrate(analyzer, api)
+
+    assert [record["tx_hash"] for record in records] == [tx.tx_hash for tx in api.listing]
+    assert api.fetched != [tx.tx_hash for tx in api.listing]  # finished out of order
+    assert 1 < api.peak <= settings.blockfrost_max_concurrency
+    assert records[0]["fees"] == FEE
+    assert records[0]["net_lovelace"] == 10_000_000
+    assert records[0]["block_height"] == 5000
+
+
+def test_concurrency_ceiling(analyzer):
+    api = FakeBlockfrost(12)
+
+    hydrate(analyzer, api, max_workers=2)
+    assert api.peak <= 2
+
+    api = FakeBlockfrost(12)
+    analyzer.cache = MemoryCache()
+    hydrate(analyzer, api, max_workers=1)
+    assert api.peak == 1
+    assert api.fetched == [tx.tx_hash for tx in api.listing]  # serial
+
+
+def test_unknown_transactions_are_skipped(analyzer):
+    api = FakeBlockfrost(6)
+    api.missing = {api.listing[2].tx_hash}
+
+    records = hydrate(analyzer, api)
+    assert [record["tx_hash"] for record in records] == [
+        tx.tx_hash for index, tx in enumerate(api.listing) if index != 2
+    ]
+
+
+def test_other_errors_are_raised(analyzer):
+    api = FakeBlockfrost(6)
+
+    def failing(tx_hash):
+        raise api_error(500)
+
+    api.transaction_utxos = failing
+    with pytest.raises(ApiError):
+        hydrate(analyzer, api)
+
+
+def test_history_is_streamed_page_by_page(analyzer):
+    api = FakeBlockfrost(250, delay=0)
+    analyzer.api = api
+
+    stream = analyzer.iter_transactions(WALLET, chunk_size=100)
+    assert api.pages == []  # nothing is fetched until the stream is consumed
+    assert len(next(stream)) == 100
+    assert api.pages == [(1, None)]
+
+    sizes = [len(chunk) for chunk in stream]
+    assert sizes == [100, 50]
+    assert [page for page, _ in api.pages] == [1, 2, 3]
+
+
+def test_stream_limits(analyzer):
+    api = FakeBlockfrost(250, delay=0)
+    analyzer.api = api
+
+    chunks = list(analyzer.iter_transactions(WALLET, chunk_size=100, max_transactions=120))
+    assert [len(chunk) for chunk in chunks] == [100, 20]
+    assert len(api.pages) == 2
+    assert len(api.fetched) == 120
+
+    api.pages.clear()
+    since = api.listing[30].block_height
+    chunks = list(analyzer.iter_transactions(WALLET, since_block=since))
+    assert [tx["block_height"] for chunk in chunks for tx in chunk] == list(range(5000, since - 1, -1))
+    assert api.pages == [(1, str(since))]
+
+
+def test_address_without_history(analyzer):
+    analyzer.api = FakeBlockfrost(0)
+
+    assert list(analyzer.iter_transactions(WALLET)) == []
+    assert analyzer.analyze_transaction_patterns(analyzer.iter_transactions(WALLET))["total_transactions"] == 0
+
+
+def test_stream_without_blockfrost(analyzer):
+    analyzer.api = None
+
+    assert len(next(analyzer.iter_transactions(WALLET))) == 10  # mock data
+    with pytest.raises(RuntimeError):
+        next(analyzer.iter_transactions(WALLET, fallback_to_mock=False))
+
+
+def test_patterns_from_a_stream_match_a_list(analyzer):
+    analyzer.api = FakeBlockfrost(250, delay=0)
+    records = [tx for chunk in analyzer.iter_transactions(WALLET) for tx in chunk]
+
+    streamed = analyzer.analyze_transaction_patterns(analyzer.iter_transactions(WALLET, chunk_size=40))
+    assert streamed == analyzer.analyze_transaction_patterns(records)
+    assert streamed["total_transactions"] == 250
@@ -0,0 +1,62 @@
+"""
+Backpressure Tests
+/start_job rejection in inline and queue execution modes
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from api.routes import job_routes
+from core.config import settings
+
+
+class FakeStore:
+    def __init__(self, queued):
+        self.queued = queued
+        self.counted = []
+
+    async def count_jobs(self, status):
+        self.counted.append(status)
+        return self.queued
+
+
+class FakePool:
+    def __init__(self, saturated):
+        self.saturated = saturated
+
+    def is_saturated(self):
+        return self.saturated
+
+    def stats(self):
+        return {}
+
+
+def check(monkeypatch, mode, queued=0, saturated=False, limit=10):
+    store = FakeStore(queued)
+    monkeypatch.setattr(job_routes, "mongo_store", store)
+    monkeypatch.setattr(job_routes, "analysis_pool", FakePool(saturated))
+    monkeypatch.setattr(settings, "job_execution_mode", mode)
+    monkeypatch.setattr(settings, "job_max_queued", limit)
+    asyncio.run(job_routes.reject_if_saturated())
+    return store
+
+
+def test_inline_mode_follows_the_local_pool(monkeypatch):
+    assert check(monkeypatch, "inline", queued=1000).counted == []
+    with pytest.raises(HTTPException) as error:
+        check(monkeypatch, "inline", saturated=True)
+    assert error.value.status_code == 429
+
+
+def test_queue_mode_counts_queued_jobs(monkeypatch):
+    # The API process's own pool is idle in queue mode and is not consulted
+    assert check(monkeypatch, "queue", queued=9, saturated=True).counted == ["queued"]
+    with pytest.raises(HTTPException) as error:
+        check(monkeypatch, "queue", queued=10)
+    assert error.value.status_code == 429
+    assert error.value.headers["Retry-After"] == "30"
+
+
+def test_queue_limit_can_be_disabled(monkeypatch):
+    assert check(monkeypatch, "queue", queued=10_000, limit=0).counted == []
@@ -0,0 +1,117 @@
+"""
+Transaction Batch Tests
+Columnar batches, fee outlier fences and the vectorized summary against plain loops
+"""
+import random
+
+import numpy as np
+import pytest
+
+from core.config import settings
+from services.blockchain.analyzer import LARGE_TRANSACTION_LOVELACE, BlockchainAnalyzer
+from services.blockchain.batch import COLUMNS, TransactionBatch, fee_outlier_fences
+
+TOKEN = "a" * 56 + "746f6b656e"
+
+
+def transactions(count, seed=7):
+    rng = random.Random(seed)
+    records = []
+    for index in range(count):
+        net = rng.choice([1, -1]) * rng.randint(1_000_000, 200_000_000_000)
+        record = {
+            "tx_hash": f"{index:064x}",
+            "block_height": 9000 - index,
+            "block_time": 1_700_000_000 - index * 3600,
+            "fees": 2_500_000 if index % 50 == 7 else rng.randint(170_000, 190_000),
+            "output_amount": abs(net),
+            "net_lovelace": net,
+            "asset_deltas": [[TOKEN, 3]] if index % 4 == 0 else []
+        }
+        if index % 25 == 0:
+            record["flagged_counterparties"] = [[f"addr_test1bad{index}", "sanctions"]]
+        records.append(record)
+    return records
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(settings, "counterparty_graph", False)
+    return BlockchainAnalyzer()
+
+
+def test_from_records_keeps_each_column():
+    records = transactions(5)
+    batch = TransactionBatch.from_records(records)
+
+    assert len(batch) == 5
+    for name in COLUMNS:
+        column = getattr(batch, name)
+        assert column.dtype == np.int64
+        assert column.tolist() == [record[name] for record in records]
+    assert batch.assets.to_dict() == {TOKEN: 6}
+    assert batch.flagged == {"addr_test1bad0": "sanctions"}
+
+
+def test_missing_fields_read_as_zero():
+    batch = TransactionBatch.from_records([{"tx_hash": "mock", "block_time": 5, "fees": None}])
+
+    assert batch.fees.tolist() == [0]
+    assert batch.net_lovelace.tolist() == [0]
+
+
+def test_chunks_concatenate_to_the_same_batch():
+    records = transactions(100)
+    whole = TransactionBatch.from_records(records)
+    chunked = TransactionBatch.from_chunks(records[start:start + 30] for start in range(0, 100, 30))
+
+    for name in COLUMNS:
+        assert getattr(chunked, name).tolist() == getattr(whole, name).tolist()
+    assert chunked.assets.to_dict() == whole.assets.to_dict() == {TOKEN: 75}
+    assert chunked.flagged == whole.flagged
+    assert len(TransactionBatch.from_chunks(iter([[], []]))) == 0
+
+
+def test_fee_fences_use_the_interquartile_range():
+    assert fee_outlier_fences(100, 150, 200) == (-50, 350)
+
+
+def test_fee_fences_have_a_minimum_width():
+    # Identical fees would otherwise flag any deviation at all
+    low, high = fee_outlier_fences(170_000, 170_000, 170_000)
+    assert low == pytest.approx(170_000 - 1.5 * 17_000)
+    assert high == pytest.approx(170_000 + 1.5 * 17_000)
+
+
+def test_summary_matches_plain_loops(analyzer):
+    records = transactions(500)
+    summary = analyzer._summarize_batch(TransactionBatch.from_records(records))
+
+    fees = sorted(record["fees"] for record in records)
+    low, high = fee_outlier_fences(*np.percentile(fees, [25, 50, 75]))
+    assert summary["count"] == 500
+    assert summary["total_volume"] == sum(record["output_amount"] for record in records)
+    assert summary["total_fees"] == sum(fees)
+    assert summary["received_lovelace"] == sum(r["net_lovelace"] for r in records if r["net_lovelace"] > 0)
+    assert summary["sent_lovelace"] == -sum(r["net_lovelace"] for r in records if r["net_lovelace"] < 0)
+    assert summary["large_count"] == sum(r["output_amount"] > LARGE_TRANSACTION_LOVELACE for r in records)
+    assert summary["fee_outliers"] == sum(fee < low or fee > high for fee in fees)
+    assert summary["fee_outliers"] == 10
+    assert summary["flagged_counterparties"] == 20
+    assert summary["flagged_categories"] == ["sanctions"]
+    assert summary["oldest"] == min(r["block_time"] for r in records)
+    assert summary["newest"] == max(r["block_time"] for r in records)
+
+
+def test_uniform_fees_have_no_outliers(analyzer):
+    records = transactions(50)
+    for record in records:
+        record["fees"] = 170_000
+    records[0]["fees"] = 171_000
+
+    assert analyzer._summarize_batch(TransactionBatch.from_records(records))["fee_outliers"] == 0
+
+
+def test_empty_batch(analyzer):
+    assert analyzer._summarize_batch(TransactionBatch.empty()) == {"count": 0}
+    assert analyzer.analyze_transaction_patterns([])["total_transactions"] == 0
@@ -0,0 +1,165 @@
+"""
+Blockfrost Client Tests
+Retries, Retry-After backoff and request coalescing over httpx.MockTransport
+"""
+import asyncio
+
+import httpx
+import pytest
+from blockfrost import ApiError
+
+from core.config import settings
+from services.blockchain import client as client_module
+from services.blockchain.client import RETRY_MAX_SECONDS, BlockfrostHttp, _backoff
+
+URL = "https://blockfrost.test/api/v0/txs/abc"
+HEADERS = {"project_id": "preprodtest"}
+
+
+class FakeLimiter:
+    def __init__(self):
+        self.acquired = 0
+        self.throttles = 0
+
+    async def acquire(self):
+        self.acquired += 1
+        return 0.0
+
+    async def throttled(self):
+        self.throttles += 1
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    limiter = FakeLimiter()
+    monkeypatch.setattr(client_module, "blockfrost_limiter", limiter)
+    monkeypatch.setattr(client_module, "RETRY_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "blockfrost_max_retries", 3)
+    return limiter
+
+
+def make_http(handler):
+    http = BlockfrostHttp()
+    http._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    http._loop = asyncio.get_running_loop()
+    return http
+
+
+def responses(*statuses):
+    """Handler answering with the given statuses in turn, recording requests"""
+    requests = []
+
+    def handler(request):
+        status = statuses[min(len(requests), len(statuses) - 1)]
+        requests.append(request)
+        if isinstance(status, Exception):
+            raise status
+        return httpx.Response(status, json={"status_code": status, "error": "e", "message": "m"})
+
+    return handler, requests
+
+
+def test_backoff_honours_retry_after():
+    def response(value):
+        return httpx.Response(429, headers={"Retry-After": value})
+
+    assert 0 <= _backoff(0) <= 0.25
+    assert 0 <= _backoff(10) <= RETRY_MAX_SECONDS
+    assert _backoff(0, response("3")) >= 3
+    assert _backoff(0, response("600")) == RETRY_MAX_SECONDS
+    # HTTP-date values are not parsed; the jittered delay applies
+    assert _backoff(0, response("Wed, 21 Oct 2026 07:28:00 GMT")) <= 0.25
+
+
+def test_retries_throttling_and_server_errors(limiter):
+    handler, requests = responses(503, 429, 200)
+
+    async def run():
+        return await make_http(handler).get(URL, headers=HEADERS)
+
+    assert asyncio.run(run()) == b'{"status_code":200,"error":"e","message":"m"}'
+    assert len(requests) == 3
+    assert limiter.acquired == 3  # every attempt waits for the limiter
+    assert limiter.throttles == 1
+
+
+def test_retries_transport_errors(limiter):
+    handler, requests = responses(httpx.ConnectError("refused"), 200)
+
+    async def run():
+        return await make_http(handler).get(URL, headers=HEADERS)
+
+    asyncio.run(run())
+    assert len(requests) == 2
+
+
+def test_gives_up_after_max_retries(limiter):
+    handler, requests = responses(500)
+
+    async def run():
+        return await make_http(handler).get(URL, headers=HEADERS)
+
+    with pytest.raises(ApiError) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 500
+    assert len(requests) == settings.blockfrost_max_retries + 1
+
+
+def test_client_errors_are_not_retried(limiter):
+    handler, requests = responses(404)
+
+    async def run():
+        return await make_http(handler).get(URL, headers=HEADERS)
+
+    with pytest.raises(ApiError) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 404
+    assert len(requests) == 1
+
+
+def gated():
+    """Handler that holds every response until released"""
+    requests = []
+    release = asyncio.Event()
+
+    async def handler(request):
+        requests.append(request)
+        await release.wait()
+        return httpx.Response(200, content=request.url.query or b"body")
+
+    return handler, requests, release
+
+
+def test_identical_requests_are_coalesced(limiter):
+    async def run():
+        handler, requests, release = gated()
+        http = make_http(handler)
+        waiters = [asyncio.ensure_future(http.get(URL, {"page": 1}, HEADERS)) for _ in range(3)]
+        other = asyncio.ensure_future(http.get(URL, {"page": 2}, HEADERS))
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*waiters, other)
+        return results, len(requests), http._inflight
+
+    results, sent, inflight = asyncio.run(run())
+    assert results == [b"page=1"] * 3 + [b"page=2"]
+    assert sent == 2
+    assert inflight == {}
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_request(limiter):
+    async def run():
+        handler, requests, release = gated()
+        http = make_http(handler)
+        first = asyncio.ensure_future(http.get(URL, headers=HEADERS))
+        second = asyncio.ensure_future(http.get(URL, headers=HEADERS))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return first, await second, len(requests)
+
+    first, result, sent = asyncio.run(run())
+    assert first.cancelled()
+    assert result == b"body"
+    assert sent == 1
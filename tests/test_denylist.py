@@ -0,0 +1,116 @@
+"""
+Denylist Tests
+Compiled index lookups and counterparty checks during hydration
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import settings
+from services.blockchain import analyzer as analyzer_module
+from services.blockchain.analyzer import BlockchainAnalyzer
+from services.blockchain.batch import TransactionBatch
+from services.blockchain.denylist import Denylist
+
+WALLET = "addr_test1wallet"
+MIXER = "addr_test1mixer"
+SANCTIONED = "addr_test1sanctioned"
+CLEAN = "addr_test1clean"
+
+
+@pytest.fixture
+def make_denylist(tmp_path, monkeypatch):
+    """Build a Denylist over files written to tmp_path"""
+    monkeypatch.setattr(settings, "denylist_cache_dir", str(tmp_path / "cache"))
+    monkeypatch.setattr(settings, "denylist_reload_seconds", 3600)
+
+    def make(**files):
+        paths = []
+        for name, content in files.items():
+            path = tmp_path / name.replace("_dot_", ".")
+            path.write_text(content)
+            paths.append(str(path))
+        monkeypatch.setattr(settings, "denylist_paths", ",".join(paths))
+        return Denylist()
+
+    return make
+
+
+def test_hit_and_miss(make_denylist):
+    denylist = make_denylist(ofac_dot_csv=f"address,category\n{SANCTIONED},ofac\n{MIXER},mixer\n")
+
+    assert denylist.lookup(SANCTIONED) == "ofac"
+    assert denylist.lookup(MIXER) == "mixer"
+    assert denylist.lookup(CLEAN) is None
+    assert denylist.lookup_many([CLEAN, MIXER, WALLET]) == {MIXER: "mixer"}
+    assert denylist.fingerprint()
+
+
+def test_duplicates_keep_first_entry(make_denylist):
+    denylist = make_denylist(
+        a_dot_csv=f"{MIXER},mixer\n{MIXER},scam\n",
+        b_dot_jsonl=f'{{"address": "{MIXER}", "category": "ofac"}}\n{{"address": "{SANCTIONED}"}}\n'
+    )
+
+    assert denylist.lookup(MIXER) == "mixer"
+    assert denylist.lookup(SANCTIONED) == "b"  # no category: named after the file
+    assert denylist._current().count == 2
+
+
+def test_empty_file(make_denylist):
+    denylist = make_denylist(empty_dot_csv="")
+
+    assert denylist.lookup(MIXER) is None
+    assert denylist.lookup_many([MIXER, CLEAN]) == {}
+    assert denylist.fingerprint()
+
+
+def test_no_sources(make_denylist):
+    denylist = make_denylist()
+
+    assert denylist.lookup(MIXER) is None
+    assert denylist.fingerprint() == ""
+
+
+class FakeCache:
+    def __init__(self, records):
+        self.records = {record["tx_hash"]: record for record in records}
+
+    def get_many(self, tx_hashes):
+        return {tx_hash: self.records[tx_hash] for tx_hash in tx_hashes if tx_hash in self.records}
+
+    def put_many(self, records):
+        pass
+
+
+def test_hydrated_counterparties_are_checked(make_denylist, monkeypatch):
+    denylist = make_denylist(list_dot_csv=f"{MIXER},mixer\n{SANCTIONED},ofac\n{WALLET},ofac\n")
+    monkeypatch.setattr(analyzer_module, "denylist", denylist)
+    monkeypatch.setattr(settings, "counterparty_graph", False)
+
+    def record(tx_hash, inputs, outputs):
+        return {"tx_hash": tx_hash, "block_height": 1, "block_time": 1, "fees": 170_000,
+                "inputs": inputs, "outputs": outputs}
+
+    records = [
+        record("a" * 64, [[MIXER, 10_000_000, []]], [[WALLET, 9_800_000, []]]),
+        record("b" * 64, [[WALLET, 5_000_000, []]], [[CLEAN, 2_000_000, []], [WALLET, 2_800_000, []]]),
+        record("c" * 64, [[WALLET, 9_000_000, []]], [[SANCTIONED, 4_000_000, []], [MIXER, 4_800_000, []]])
+    ]
+    analyzer = BlockchainAnalyzer(cache=FakeCache(records))
+    views = analyzer._hydrate_transactions(
+        [SimpleNamespace(tx_hash=record["tx_hash"]) for record in records], WALLET
+    )
+
+    # The wallet's own listing is reported separately, never as a counterparty
+    assert views[0]["flagged_counterparties"] == [[MIXER, "mixer"]]
+    assert "flagged_counterparties" not in views[1]
+    assert views[2]["flagged_counterparties"] == [[MIXER, "mixer"], [SANCTIONED, "ofac"]]
+
+    summary = analyzer._summarize_batch(TransactionBatch.from_records(views))
+    assert summary["flagged_counterparties"] == 2
+    assert summary["flagged_categories"] == ["mixer", "ofac"]
+
+    analysis = analyzer._build_analysis(summary)
+    assert "counterparty_exposure" in [indicator["type"] for indicator in analysis["risk_indicators"]]
+    assert analyzer.calculate_risk_scores([summary])[0] == analyzer.calculate_risk_score(analysis)
@@ -0,0 +1,55 @@
+"""
+Fast Path Tests
+Deterministic report wording per risk category
+"""
+import pytest
+
+from core.fast_path import build_deterministic_report, risk_category
+
+
+def blockchain_data(score, indicators=0):
+    return {
+        "risk_score": score,
+        "data_source": "blockfrost",
+        "analysis": {
+            "total_transactions": 12,
+            "total_volume": 5_000_000,
+            "risk_indicators": [
+                {"type": "large_transactions", "severity": "medium", "description": f"Indicator {index}"}
+                for index in range(indicators)
+            ]
+        }
+    }
+
+
+@pytest.mark.parametrize("score, category", [(0, "Low"), (20, "Low"), (21, "Medium"), (50, "Medium"),
+                                             (51, "High"), (75, "High"), (76, "Critical"), (100, "Critical")])
+def test_risk_category_bands(score, category):
+    assert risk_category(score) == category
+
+
+def test_low_risk_is_compliant():
+    report = build_deterministic_report("addr_test1wallet", blockchain_data(10))
+
+    assert report["compliance_status"] == "Compliant"
+    assert report["suspicious_activities"] == []
+    assert "Continue standard monitoring" in report["recommendations"]
+
+
+def test_medium_risk_requires_review_without_holding_funds():
+    report = build_deterministic_report("addr_test1wallet", blockchain_data(35, indicators=1))
+
+    assert report["compliance_status"] == "Requires Review"
+    assert "Perform enhanced due diligence on the wallet owner" in report["recommendations"]
+    assert not any("hold funds" in item or "suspicious activity report" in item for item in report["recommendations"])
+    assert len(report["suspicious_activities"]) == 1
+
+
+@pytest.mark.parametrize("score", [60, 90])
+def test_high_and_critical_risk_hold_funds_and_report(score):
+    report = build_deterministic_report("addr_test1wallet", blockchain_data(score, indicators=3))
+
+    assert report["compliance_status"] == "Non-Compliant"
+    assert report["recommendations"][0] == "Block or hold funds pending manual compliance review"
+    assert any("suspicious activity report" in item for item in report["recommendations"])
+    assert "held pending manual compliance review" in report["executive_summary"]
@@ -0,0 +1,120 @@
+"""
+Counterparty Graph Tests
+Hop distances and taint on small hand-built graphs
+"""
+import numpy as np
+import pytest
+
+from services.blockchain.graph import CounterpartyGraph, CounterpartyGraphStore, transaction_flows
+
+
+def chain(num_nodes=4):
+    """0 - 1 - 2 - 3 with equal flows"""
+    src = np.arange(num_nodes - 1, dtype=np.int32)
+    return CounterpartyGraph.from_edges(src, src + 1, np.full(num_nodes - 1, 100.0), num_nodes)
+
+
+def test_hop_distances_on_a_chain():
+    graph = chain()
+    seeds = np.array([3])
+
+    assert graph.hop_distances(seeds, 3).tolist() == [3, 2, 1, 0]
+    assert graph.hop_distances(seeds, 1).tolist() == [-1, -1, 1, 0]
+
+
+def test_taint_decays_per_hop():
+    taint = chain().propagate(np.array([3]), 2, 0.5)
+
+    # Node 2 splits its flow between 1 and the seed: 0.5 * (0.5 * 1);
+    # node 1 only hears of the seed on the second hop: 0.5 * (0.5 * 0.25)
+    assert taint.tolist() == pytest.approx([0.0, 0.0625, 0.25, 1.0])
+
+
+def test_taint_is_weighted_by_flow():
+    # Node 0 sends 90% of its value to 1 and 10% to the flagged node 2
+    graph = CounterpartyGraph.from_edges(
+        np.array([0, 0], dtype=np.int32), np.array([1, 2], dtype=np.int32), np.array([90.0, 10.0]), 3
+    )
+    taint = graph.propagate(np.array([2]), 1, 0.5)
+
+    assert taint[0] == pytest.approx(0.05)
+    assert taint[1] == 0.0
+
+
+def test_repeated_pairs_are_merged():
+    graph = CounterpartyGraph.from_edges(
+        np.array([0, 1], dtype=np.int32), np.array([1, 0], dtype=np.int32), np.array([3.0, 2.0]), 2
+    )
+
+    neighbors, weights = graph.neighbors(0)
+    assert neighbors.tolist() == [1]
+    assert weights.tolist() == [1.0]
+
+
+def test_change_outputs_are_not_flows():
+    flows = transaction_flows([["a", 60], ["b", 40]], [["c", 50], ["a", 48]])
+
+    assert flows == [("a", "c", pytest.approx(30.0)), ("b", "c", pytest.approx(20.0))]
+
+
+def transfer(tx_hash, sender, receiver):
+    return {"tx_hash": tx_hash * 64, "inputs": [[sender, 1_000_000]], "outputs": [[receiver, 1_000_000]]}
+
+
+@pytest.fixture
+def store():
+    """a -> b -> c -> d, with d flagged"""
+    store = CounterpartyGraphStore()
+    assert store.ingest([transfer("1", "a", "b"), transfer("2", "b", "c"), transfer("3", "c", "d")]) == 3
+    store.flag(["d"])
+    return store
+
+
+def test_exposure_hops(store):
+    assert store.exposure("c", max_hops=3)["exposure_hops"] == 1
+    assert store.exposure("b", max_hops=3)["exposure_hops"] == 2
+    assert store.exposure("a", max_hops=3)["exposure_hops"] == 3
+    assert store.exposure("a", max_hops=2)["exposure_hops"] == 0
+
+
+def test_exposure_taint_falls_with_distance(store):
+    taints = [store.exposure(address, max_hops=3, damping=0.5)["taint"] for address in ("c", "b", "a")]
+
+    assert taints[0] > taints[1] > taints[2] > 0
+    assert store.exposure("c", max_hops=3)["flagged_counterparties"] == 1
+    assert store.exposure("c", max_hops=3)["flagged_categories"] == ["flagged"]
+
+
+def test_exposure_of_unknown_and_flagged_wallets(store):
+    assert store.exposure("nobody") == {
+        "counterparties": 0,
+        "flagged_counterparties": 0,
+        "flagged_categories": [],
+        "exposure_hops": 0,
+        "taint": 0.0
+    }
+    # A flagged wallet's neighbours are not "near" a flagged address through it
+    assert store.exposure("d", max_hops=3)["exposure_hops"] == 0
+
+
+def test_ingest_skips_known_transactions(store):
+    assert store.ingest([transfer("1", "a", "b"), {"tx_hash": "4" * 64}]) == 0
+    assert store.num_edges == 3
+
+
+def test_saves_from_several_processes_are_merged(tmp_path):
+    path = str(tmp_path / "graph.npz")
+    first, second = CounterpartyGraphStore(), CounterpartyGraphStore()
+    first.ingest([transfer("1", "a", "b"), transfer("3", "c", "d")])
+    first.flag(["d"])
+    second.ingest([transfer("2", "b", "c"), transfer("3", "c", "d")])
+
+    first.save(path)
+    second.save(path)
+
+    merged = CounterpartyGraphStore()
+    assert merged.load(path)
+    assert merged.num_edges == 3  # the shared transaction is stored once
+    assert merged.is_flagged("d")
+    assert merged.exposure("a", max_hops=3)["exposure_hops"] == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["graph.npz", "graph.npz.lock"]
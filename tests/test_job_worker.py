@@ -0,0 +1,239 @@
+"""
+Job Queue Tests
+Leases, reclaiming and lost-lease handling against an in-memory MongoDB
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from core import job_worker, jobs
+from core.job_worker import JobWorker
+from services.storage import mongo_store as mongo_store_module
+from services.storage.mongo_store import MongoStore
+
+LEASE = 30
+MAX_ATTEMPTS = 2
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(mongo_store_module, "time", SimpleNamespace(time=clock))
+    return clock
+
+
+@pytest.fixture
+def store(clock, monkeypatch):
+    store = MongoStore()
+    store.jobs_collection = mongomock_motor.AsyncMongoMockClient()["risklens_ai"]["jobs"]
+    for module in (job_worker, jobs):
+        monkeypatch.setattr(module, "mongo_store", store)
+    return store
+
+
+def queue(store, *job_ids):
+    async def insert():
+        for index, job_id in enumerate(job_ids):
+            await store.set_job(job_id, {"status": "awaiting_payment", "payment_id": f"pay-{job_id}"})
+            await store.enqueue_job(job_id, f"pay-{job_id}")
+            await store.jobs_collection.update_one({"job_id": job_id}, {"$set": {"queued_at": index}})
+    asyncio.run(insert())
+
+
+def status(store, job_id):
+    return asyncio.run(store.get_job(job_id))
+
+
+def test_claim_takes_the_oldest_queued_job(store, clock):
+    queue(store, "first", "second")
+
+    job = asyncio.run(store.claim_job("w1", LEASE, MAX_ATTEMPTS))
+    assert job["job_id"] == "first"
+    assert job["status"] == "running"
+    assert job["attempts"] == 1
+    assert job["lease_expires_at"] == clock.now + LEASE
+
+    assert asyncio.run(store.claim_job("w2", LEASE, MAX_ATTEMPTS))["job_id"] == "second"
+    assert asyncio.run(store.claim_job("w3", LEASE, MAX_ATTEMPTS)) is None
+
+
+def test_expired_lease_is_reclaimed(store, clock):
+    queue(store, "job")
+    asyncio.run(store.claim_job("w1", LEASE, MAX_ATTEMPTS))
+
+    clock.now += LEASE - 1
+    assert asyncio.run(store.claim_job("w2", LEASE, MAX_ATTEMPTS)) is None
+
+    clock.now += 2
+    job = asyncio.run(store.claim_job("w2", LEASE, MAX_ATTEMPTS))
+    assert job["worker_id"] == "w2"
+    assert job["attempts"] == 2
+
+
+def test_heartbeat_extends_only_the_holders_lease(store, clock):
+    queue(store, "job")
+    asyncio.run(store.claim_job("w1", LEASE, MAX_ATTEMPTS))
+
+    clock.now += LEASE - 1
+    assert asyncio.run(store.heartbeat_job("job", "w1", LEASE))
+    clock.now += LEASE - 1
+    assert asyncio.run(store.claim_job("w2", LEASE, MAX_ATTEMPTS)) is None
+
+    clock.now += 2
+    asyncio.run(store.claim_job("w2", LEASE, MAX_ATTEMPTS))
+    assert not asyncio.run(store.heartbeat_job("job", "w1", LEASE))
+    assert asyncio.run(store.holds_job("job", "w2"))
+    assert not asyncio.run(store.holds_job("job", "w1"))
+
+
+def test_exhausted_jobs_are_failed(store, clock):
+    queue(store, "job")
+    for worker_id in ("w1", "w2"):
+        asyncio.run(store.claim_job(worker_id, LEASE, MAX_ATTEMPTS))
+        clock.now += LEASE + 1
+
+    assert asyncio.run(store.claim_job("w3", LEASE, MAX_ATTEMPTS)) is None
+    assert asyncio.run(store.fail_exhausted_jobs(MAX_ATTEMPTS)) == 1
+    assert status(store, "job")["status"] == "failed"
+    assert asyncio.run(store.fail_exhausted_jobs(MAX_ATTEMPTS)) == 0
+
+
+def test_stale_worker_cannot_finish_a_reclaimed_job(store, clock):
+    queue(store, "job")
+    asyncio.run(store.claim_job("w1", LEASE, MAX_ATTEMPTS))
+    clock.now += LEASE + 1
+    asyncio.run(store.claim_job("w2", LEASE, MAX_ATTEMPTS))
+
+    assert not asyncio.run(store.transition_job("job", "running", {"status": "completed"}, worker_id="w1"))
+    asyncio.run(store.release_job("job", "w1"))
+    assert status(store, "job")["lease_expires_at"] == clock.now + LEASE
+
+    assert asyncio.run(store.transition_job("job", "running", {"status": "completed"}, worker_id="w2"))
+
+
+def test_released_job_is_claimable_at_once(store):
+    queue(store, "job")
+    asyncio.run(store.claim_job("w1", LEASE, MAX_ATTEMPTS))
+
+    asyncio.run(store.release_job("job", "w1"))
+    assert asyncio.run(store.claim_job("w2", LEASE, MAX_ATTEMPTS))["worker_id"] == "w2"
+
+
+class FakePayments:
+    def __init__(self):
+        self.completed = []
+
+    def has_payment_instance(self, job_id):
+        return True
+
+    async def complete_payment(self, job_id, payment_id, result):
+        self.completed.append(job_id)
+        return {"status": "success", "data": {"resultHash": "hash"}}
+
+    def stop_monitoring(self, job_id):
+        pass
+
+
+@pytest.fixture
+def payments(monkeypatch):
+    payments = FakePayments()
+    monkeypatch.setattr(jobs, "payment_service", payments)
+    monkeypatch.setattr(jobs, "format_result_for_display", str)
+    return payments
+
+
+def test_result_is_not_submitted_after_the_lease_was_lost(store, clock, payments, monkeypatch):
+    queue(store, "job")
+    job = asyncio.run(store.claim_job("w1", LEASE, MAX_ATTEMPTS))
+
+    async def analysis(input_data, progress):
+        # The lease expires and another worker claims the job mid-analysis
+        clock.now += LEASE + 1
+        await store.claim_job("w2", LEASE, MAX_ATTEMPTS)
+        return {"risk_score": 10}
+
+    monkeypatch.setattr(jobs, "execute_crew_task", analysis)
+    job["input_data"] = {"wallet_address": "addr_test1wallet"}
+    asyncio.run(jobs.process_job("job", job["payment_id"], job, worker_id="w1"))
+
+    assert payments.completed == []
+    assert status(store, "job")["status"] == "running"
+    assert status(store, "job")["worker_id"] == "w2"
+
+
+def test_lease_holder_completes_the_job(store, payments, monkeypatch):
+    queue(store, "job")
+    job = asyncio.run(store.claim_job("w1", LEASE, MAX_ATTEMPTS))
+
+    async def analysis(input_data, progress):
+        return {"risk_score": 10}
+
+    monkeypatch.setattr(jobs, "execute_crew_task", analysis)
+    job["input_data"] = {"wallet_address": "addr_test1wallet"}
+    asyncio.run(jobs.process_job("job", job["payment_id"], job, worker_id="w1"))
+
+    assert payments.completed == ["job"]
+    assert status(store, "job")["status"] == "completed"
+
+
+def test_lost_lease_stops_the_analysis_thread(store, clock, monkeypatch):
+    queue(store, "job")
+    job = asyncio.run(store.claim_job("w1", LEASE, MAX_ATTEMPTS))
+    started, stopped = threading.Event(), threading.Event()
+
+    async def process(job_id, payment_id, job, worker_id, cancel):
+        def analysis():
+            started.set()
+            assert cancel.wait(5)
+            stopped.set()
+        await asyncio.to_thread(analysis)
+        raise AssertionError("the task should have been cancelled")
+
+    async def run():
+        worker = JobWorker(worker_id="w1", lease_seconds=3)
+        monkeypatch.setattr(job_worker, "process_job", process)
+        task = asyncio.create_task(worker._run_job(job))
+        await asyncio.to_thread(started.wait, 5)
+        # Another worker takes over; the next heartbeat notices
+        await store.jobs_collection.update_one({"job_id": "job"}, {"$set": {"worker_id": "w2"}})
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(run())
+    assert stopped.wait(5)
+    assert status(store, "job")["worker_id"] == "w2"
+
+
+def test_cancelled_job_stops_at_the_next_stage(store, payments, monkeypatch):
+    queue(store, "job")
+    job = asyncio.run(store.claim_job("w1", LEASE, MAX_ATTEMPTS))
+    cancel = threading.Event()
+    stages = []
+
+    def analysis_thread(progress):
+        progress("fetching")
+        cancel.set()
+        progress("analyzing")
+        stages.append("crew")
+
+    async def analysis(input_data, progress):
+        return await asyncio.to_thread(analysis_thread, progress)
+
+    monkeypatch.setattr(jobs, "execute_crew_task", analysis)
+    job["input_data"] = {"wallet_address": "addr_test1wallet"}
+    asyncio.run(jobs.process_job("job", job["payment_id"], job, worker_id="w1", cancel=cancel))
+
+    assert stages == []
+    assert payments.completed == []
+    assert status(store, "job")["status"] == "failed"
@@ -0,0 +1,365 @@
+"""
+Payment Poller Tests
+Check scheduling against payByTime, expiry, and resumed monitoring across restarts and processes
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import settings
+from services.payment import masumi_service as masumi_service_module
+from services.payment import poller as poller_module
+from services.payment.poller import EXPIRY_GRACE_SECONDS, PaymentStatusPoller, PendingPayment
+from services.storage import mongo_store as mongo_store_module
+from services.storage.mongo_store import MongoStore
+
+NOW = 1_000_000.0
+MIN_INTERVAL = 10
+MAX_INTERVAL = 300
+
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMasumi:
+    """Payment service stand-in answering with a settable on-chain state per payment"""
+
+    def __init__(self):
+        self.states = {}
+        self.requests = []
+
+    async def resolve(self, blockchain_identifier):
+        self.requests.append(blockchain_identifier)
+        state = self.states.get(blockchain_identifier)
+        next_action = "WaitingForExternalAction" if state is None else "None"
+        return {"data": {"onChainState": state, "NextAction": {"requestedAction": next_action}}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(poller_module, "time", SimpleNamespace(time=clock))
+    return clock
+
+
+@pytest.fixture
+def masumi():
+    return FakeMasumi()
+
+
+def make_poller(masumi, on_state_change=None):
+    return PaymentStatusPoller(
+        resolve=masumi.resolve,
+        tick_seconds=3600,
+        min_interval=MIN_INTERVAL,
+        max_interval=MAX_INTERVAL,
+        max_checks=10,
+        concurrency=2,
+        on_state_change=on_state_change
+    )
+
+
+def track(poller, job_id, pay_by=None, callback=None, on_expired=None):
+    """Add a payment without starting the polling loop, so tests drive the checks"""
+    entry = PendingPayment(job_id, f"bid-{job_id}", callback, on_expired, pay_by, next_check=poller_module.time.time())
+    poller._pending[job_id] = entry
+    return entry
+
+
+async def check(poller, entry):
+    await poller._check(entry)
+    await asyncio.gather(*poller._callback_tasks)
+
+
+def test_parse_pay_by_time():
+    assert poller_module.parse_pay_by_time("2026-10-18T12:00:00.000Z") == 1792324800
+    assert poller_module.parse_pay_by_time(1792324800000) == 1792324800
+    assert poller_module.parse_pay_by_time("1792324800000") == 1792324800
+    assert poller_module.parse_pay_by_time(None) is None
+    assert poller_module.parse_pay_by_time("tomorrow") is None
+
+
+def test_interval_backs_off_up_to_the_maximum(clock, masumi):
+    poller = make_poller(masumi)
+    entry = track(poller, "job")
+
+    intervals = []
+    for _ in range(12):
+        asyncio.run(check(poller, entry))
+        intervals.append(entry.next_check - clock.now)
+        clock.now = entry.next_check
+
+    # The first check was registered MIN_INTERVAL out; each miss stretches the next
+    assert intervals[:3] == [MIN_INTERVAL * 1.5, MIN_INTERVAL * 1.5 ** 2, MIN_INTERVAL * 1.5 ** 3]
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == MAX_INTERVAL
+
+
+def test_backoff_never_sleeps_past_pay_by_time(clock, masumi):
+    poller = make_poller(masumi)
+    entry = track(poller, "job", pay_by=NOW + 1000)
+    entry.checks = 20  # backed off to MAX_INTERVAL
+
+    checked_at = []
+    while clock.now <= entry.pay_by:
+        asyncio.run(check(poller, entry))
+        checked_at.append(clock.now)
+        clock.now = entry.next_check
+
+    # The interval shrinks towards the deadline, but not below MIN_INTERVAL
+    assert checked_at[:3] == [NOW, NOW + MAX_INTERVAL, NOW + 2 * MAX_INTERVAL]
+    assert entry.pay_by - MIN_INTERVAL < checked_at[-1] <= entry.pay_by
+    assert all(later - earlier >= MIN_INTERVAL for earlier, later in zip(checked_at, checked_at[1:]))
+    # After the deadline the grace period is still covered
+    assert entry.next_check - clock.now <= EXPIRY_GRACE_SECONDS
+
+
+def test_payment_expires_after_the_grace_period(clock, masumi):
+    poller = make_poller(masumi)
+    expired = []
+
+    async def on_expired():
+        expired.append(clock.now)
+
+    entry = track(poller, "job", pay_by=NOW, on_expired=on_expired)
+
+    clock.now = NOW + EXPIRY_GRACE_SECONDS - 1
+    asyncio.run(check(poller, entry))
+    assert poller.is_registered("job")
+    assert expired == []
+
+    clock.now = NOW + EXPIRY_GRACE_SECONDS + 1
+    asyncio.run(check(poller, entry))
+    assert not poller.is_registered("job")
+    assert expired == [clock.now]
+
+
+def test_funds_locked_in_the_grace_period_still_count(clock, masumi):
+    poller = make_poller(masumi)
+    paid, expired = [], []
+
+    async def callback(payment):
+        paid.append(payment["onChainState"])
+
+    async def on_expired():
+        expired.append(True)
+
+    entry = track(poller, "job", pay_by=NOW, callback=callback, on_expired=on_expired)
+    masumi.states["bid-job"] = "FundsLocked"
+
+    clock.now = NOW + EXPIRY_GRACE_SECONDS - 1
+    asyncio.run(check(poller, entry))
+    assert paid == ["FundsLocked"]
+    assert expired == []
+    assert not poller.is_registered("job")
+
+
+def test_state_changes_are_reported_once(clock, masumi):
+    changes = []
+
+    async def on_state_change(job_id, payment):
+        changes.append((job_id, payment["onChainState"]))
+
+    poller = make_poller(masumi, on_state_change)
+    entry = track(poller, "job")
+
+    asyncio.run(check(poller, entry))
+    asyncio.run(check(poller, entry))
+    masumi.states["bid-job"] = "ResultSubmitted"
+    asyncio.run(check(poller, entry))
+
+    assert changes == [("job", None), ("job", "ResultSubmitted")]
+    assert not poller.is_registered("job")  # settled
+
+
+def test_ticks_check_due_payments_oldest_first(clock, masumi):
+    poller = make_poller(masumi)
+    poller.max_checks = 2
+    for index, job_id in enumerate(("c", "a", "b", "later")):
+        track(poller, job_id).next_check = NOW - 10 + index * (100 if job_id == "later" else 1)
+
+    async def run():
+        poller._task = asyncio.create_task(poller._run())
+        await asyncio.sleep(0.01)
+        await poller.stop()
+
+    asyncio.run(run())
+    assert masumi.requests == ["bid-c", "bid-a"]
+
+
+LEASE = 0.03  # seconds; renewals run every third of it
+
+
+@pytest.fixture
+def store(clock, monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    store = MongoStore()
+    store.jobs_collection = mongomock_motor.AsyncMongoMockClient()["risklens_ai"]["jobs"]
+    monkeypatch.setattr(masumi_service_module, "mongo_store", store)
+    for module in (masumi_service_module, mongo_store_module):
+        monkeypatch.setattr(module, "time", SimpleNamespace(time=clock))
+    monkeypatch.setattr(settings, "payment_monitor_lease_seconds", LEASE)
+    monkeypatch.setattr(settings, "payment_service_url", "http://masumi.test/api/v1")
+    monkeypatch.setattr(settings, "payment_api_key", "test-key")
+    return store
+
+
+def awaiting_payment(store, *job_ids):
+    async def insert():
+        for job_id in job_ids:
+            await store.set_job(job_id, {
+                "status": "awaiting_payment",
+                "blockchain_identifier": f"bid-{job_id}",
+                "identifier_from_purchaser": "purchaser",
+                "input_data": {"wallet_address": "addr_test1wallet"},
+                "pay_by_time": None
+            })
+    asyncio.run(insert())
+
+
+def make_service(masumi, name):
+    service = masumi_service_module.MasumiPaymentService()
+    service.owner_id = name
+    service.poller.resolve = masumi.resolve
+    service.poller.tick_seconds = 3600
+
+    async def noop(*args):
+        pass
+
+    service._make_callbacks = lambda job_id: (noop, noop)
+    return service
+
+
+def owners(store):
+    async def read():
+        return {job["job_id"]: job.get("monitor_owner") async for job in store.iter_jobs()}
+    return asyncio.run(read())
+
+
+async def shutdown(*services):
+    for service in services:
+        await service.poller.stop()
+
+
+def test_adopted_jobs_are_claimed_by_one_process(store, clock, masumi):
+    awaiting_payment(store, "j1", "j2", "j3")
+    first, second = make_service(masumi, "first"), make_service(masumi, "second")
+    first.poller.max_checks = 2
+
+    async def run():
+        adopted = await first._adopt_jobs(), await second._adopt_jobs()
+        delays = {job_id: entry.next_check - NOW for job_id, entry in first.poller._pending.items()}
+        await shutdown(first, second)
+        return adopted, delays
+
+    adopted, delays = asyncio.run(run())
+    assert adopted == (3, 0)
+    assert owners(store) == {"j1": "first", "j2": "first", "j3": "first"}
+    # The first check of each batch of max_checks is pushed back one tick
+    assert sorted(delays.values()) == [MIN_INTERVAL] * 2 + [MIN_INTERVAL + 3600]
+
+
+def test_expired_leases_move_to_another_process(store, clock, masumi):
+    awaiting_payment(store, "j1", "j2")
+    first, second = make_service(masumi, "first"), make_service(masumi, "second")
+
+    async def run():
+        await first._adopt_jobs()
+        # "first" stops renewing; once its leases lapse "second" adopts the jobs
+        clock.now += LEASE + 1
+        taken = await second._adopt_jobs()
+
+        # Both run a lease cycle: "second" renews, "first" drops what it lost
+        tasks = [asyncio.create_task(service._maintain_leases()) for service in (first, second)]
+        await asyncio.sleep(LEASE)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        state = first.poller.job_ids(), sorted(second.poller.job_ids()), dict(first.payment_instances)
+        await shutdown(first, second)
+        return taken, state
+
+    taken, (first_jobs, second_jobs, first_instances) = asyncio.run(run())
+    assert taken == 2
+    assert first_jobs == [] and first_instances == {}
+    assert second_jobs == ["j1", "j2"]
+    assert owners(store) == {"j1": "second", "j2": "second"}
+    job = asyncio.run(store.get_job("j1"))
+    assert job["monitor_lease_expires_at"] == clock.now + LEASE
+
+
+def test_released_leases_are_adopted_immediately(store, clock, masumi):
+    awaiting_payment(store, "j1")
+    first, second = make_service(masumi, "first"), make_service(masumi, "second")
+
+    async def run():
+        await first._adopt_jobs()
+        first._lease_task = asyncio.create_task(asyncio.sleep(3600))
+        await first.close()
+        taken = await second._adopt_jobs()
+        await shutdown(second)
+        return taken
+
+    assert asyncio.run(run()) == 1
+    assert owners(store) == {"j1": "second"}
+
+
+def test_rehydrate_resumes_the_whole_backlog_in_batches(store, clock, masumi):
+    job_ids = [f"job{index:03d}" for index in range(250)]
+    awaiting_payment(store, *job_ids)
+    asyncio.run(store.set_job("paid", {"status": "queued", "blockchain_identifier": "bid-paid"}))
+    service = make_service(masumi, "first")
+    service.poller.max_checks = 100
+    made = []
+
+    async def noop(*args):
+        pass
+
+    def make_callbacks(job_id):
+        made.append(job_id)
+        return noop, noop
+
+    async def run():
+        restored = await service.rehydrate_monitoring(make_callbacks)
+        leasing = service._lease_task is not None and not service._lease_task.done()
+        delays = [entry.next_check - NOW for entry in service.poller._pending.values()]
+        await service.close()
+        return restored, leasing, delays
+
+    restored, leasing, delays = asyncio.run(run())
+    assert restored == 250
+    assert sorted(made) == job_ids
+    assert leasing
+    assert [delays.count(MIN_INTERVAL + batch * 3600) for batch in range(3)] == [100, 100, 50]
+
+    # Shutdown hands the payments to the other replicas right away
+    leases = asyncio.run(store.jobs_collection.distinct("monitor_lease_expires_at", {"status": "awaiting_payment"}))
+    assert leases == [0]
+
+
+def test_rehydrated_payment_triggers_its_callback(store, clock, masumi):
+    awaiting_payment(store, "j1")
+    service = make_service(masumi, "first")
+    paid = []
+
+    async def callback(payment):
+        paid.append(payment["onChainState"])
+
+    async def noop():
+        pass
+
+    async def run():
+        await service.rehydrate_monitoring(lambda job_id: (callback, noop))
+        masumi.states["bid-j1"] = "FundsLocked"
+        await check(service.poller, service.poller._pending["j1"])
+        await service.close()
+
+    asyncio.run(run())
+    assert paid == ["FundsLocked"]
+    assert service.has_payment_instance("j1")
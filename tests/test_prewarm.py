@@ -0,0 +1,66 @@
+"""
+Pre-warm Tests
+Steps run in order, failures are contained and a stop request ends the thread early
+"""
+import threading
+
+import pytest
+
+from core import prewarm as prewarm_module
+from core.config import settings
+from core.crew_pool import CrewPool
+from core.prewarm import prewarm
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    """Replace every step with one recording its name"""
+    ran = []
+    for name, function in (("analyzer", "_warm_analyzer"), ("denylist", "_warm_denylist"),
+                           ("masumi", "_warm_masumi"), ("crewai", "_import_crewai")):
+        monkeypatch.setattr(prewarm_module, function, lambda name=name: ran.append(name))
+    monkeypatch.setattr(prewarm_module, "_warm_crews", lambda stop: ran.append("crews"))
+    monkeypatch.setattr(settings, "prewarm_crews", 2)
+    return ran
+
+
+def test_runs_every_step(steps):
+    prewarm()
+    assert steps == ["analyzer", "denylist", "masumi", "crews"]
+
+    steps.clear()
+    prewarm(build_crews=False)
+    assert steps == ["analyzer", "denylist", "masumi", "crewai"]
+
+
+def test_a_failed_step_does_not_stop_the_rest(steps, monkeypatch):
+    def fail():
+        raise ConnectionError("MongoDB unreachable")
+
+    monkeypatch.setattr(prewarm_module, "_warm_denylist", fail)
+    prewarm()
+    assert steps == ["analyzer", "masumi", "crews"]
+
+
+def test_stop_skips_the_remaining_steps(steps, monkeypatch):
+    stop = threading.Event()
+    monkeypatch.setattr(prewarm_module, "_warm_denylist", lambda: (steps.append("denylist"), stop.set()))
+
+    prewarm(stop=stop)
+    assert steps == ["analyzer", "denylist"]
+
+
+def test_stop_ends_crew_warming_between_crews(monkeypatch):
+    stop = threading.Event()
+    pool = CrewPool(max_size=3)
+    built = []
+
+    def checkout():
+        built.append(object())
+        stop.set()
+        return built[-1]
+
+    monkeypatch.setattr(pool, "_checkout", checkout)
+    pool.warm(3, stop)
+    assert len(built) == 1
+    assert pool._idle == built
@@ -0,0 +1,135 @@
+"""
+Rate Limiter Tests
+Token bucket refill, 429 throttling and cooldown on the in-memory backend
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.blockchain import rate_limiter
+from services.blockchain.rate_limiter import (
+    AdaptiveRateLimiter,
+    FileLimiterBackend,
+    MemoryLimiterBackend,
+    RECOVERY_PER_SECOND,
+    THROTTLE_COOLDOWN_SECONDS,
+    refill
+)
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(time=clock, monotonic=time.monotonic, sleep=time.sleep))
+    return clock
+
+
+def make_limiter(rate=10.0, capacity=5, backend=None):
+    return AdaptiveRateLimiter(rate, capacity, backend=backend or MemoryLimiterBackend(), key="test")
+
+
+def test_refill_starts_full_and_caps_at_capacity():
+    state = refill(None, 100.0, ceiling=10.0, capacity=5)
+    assert state == {"tokens": 5.0, "rate": 10.0, "updated": 100.0, "throttled": 0.0}
+
+    state["tokens"] = 0.0
+    assert refill(state, 100.2, 10.0, 5)["tokens"] == pytest.approx(2.0)
+    assert refill(state, 110.0, 10.0, 5)["tokens"] == 5.0
+
+
+def test_refill_recovers_rate_towards_ceiling():
+    state = {"tokens": 0.0, "rate": 5.0, "updated": 100.0, "throttled": 0.0}
+
+    assert refill(state, 110.0, 10.0, 5)["rate"] == pytest.approx(5.0 + 10.0 * RECOVERY_PER_SECOND * 10)
+    assert refill(state, 1000.0, 10.0, 5)["rate"] == 10.0
+    # Time going backwards (clock skew between hosts) never removes tokens
+    assert refill(state, 90.0, 10.0, 5)["tokens"] == 0.0
+
+
+def test_acquire_serves_a_lease_locally(clock):
+    backend = MemoryLimiterBackend()
+    limiter = make_limiter(backend=backend)
+
+    waits = [asyncio.run(limiter.acquire()) for _ in range(5)]
+    assert waits == [0.0] * 5
+    # One lease of rate * LEASE_SECONDS tokens drained the shared bucket
+    assert backend._states["test"]["tokens"] == 0.0
+    assert limiter._lease() == pytest.approx(0.1)
+
+    clock.now += 0.3
+    assert limiter._lease() == 0.0
+    assert limiter._leased == 3
+
+
+def test_throttle_halves_rate_and_empties_bucket(clock):
+    backend = MemoryLimiterBackend()
+    limiter = make_limiter(backend=backend)
+    asyncio.run(limiter.acquire())
+
+    asyncio.run(limiter.throttled())
+    assert limiter.rate == 5.0
+    assert limiter._leased == 0
+    assert backend._states["test"]["tokens"] == 0.0
+
+
+def test_throttle_cooldown(clock):
+    limiter = make_limiter()
+
+    asyncio.run(limiter.throttled())
+    clock.now += THROTTLE_COOLDOWN_SECONDS / 2
+    asyncio.run(limiter.throttled())
+    # The second 429 is part of the same burst: only recovery applies
+    assert limiter.rate == pytest.approx(5.0 + 10.0 * RECOVERY_PER_SECOND * THROTTLE_COOLDOWN_SECONDS / 2)
+
+    clock.now += THROTTLE_COOLDOWN_SECONDS
+    asyncio.run(limiter.throttled())
+    assert limiter.rate == pytest.approx((5.0 + 10.0 * RECOVERY_PER_SECOND * THROTTLE_COOLDOWN_SECONDS * 1.5) / 2)
+
+
+def test_throttle_never_goes_below_floor(clock):
+    limiter = make_limiter()
+    for _ in range(20):
+        asyncio.run(limiter.throttled())
+        clock.now += THROTTLE_COOLDOWN_SECONDS
+
+    assert limiter.rate >= 10.0 * rate_limiter.MIN_RATE_RATIO
+
+
+def test_disabled_limiter_never_waits():
+    limiter = make_limiter(rate=0)
+
+    assert asyncio.run(limiter.acquire()) == 0.0
+    asyncio.run(limiter.throttled())
+    assert limiter.rate == 0
+
+
+def test_failing_backend_falls_back_to_local_bucket(clock):
+    class Broken:
+        name = "broken"
+
+        def transact(self, key, transition):
+            raise ConnectionError("store down")
+
+    limiter = make_limiter(backend=Broken())
+
+    assert asyncio.run(limiter.acquire()) == 0.0
+    assert limiter._fallback._states["test"]["tokens"] == 0.0
+
+
+def test_file_backend_shares_one_bucket(clock, tmp_path):
+    path = str(tmp_path / "limits.json")
+    first = make_limiter(backend=FileLimiterBackend(path))
+    second = make_limiter(backend=FileLimiterBackend(path))
+
+    asyncio.run(first.acquire())
+    assert second._lease() == pytest.approx(0.1)
@@ -0,0 +1,144 @@
+"""
+Result Cache Tests
+Keys, LRU eviction, TTL expiry and single-flight computation
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import settings
+from services.storage import result_cache as result_cache_module
+from services.storage.result_cache import AnalysisResultCache
+
+WALLET = "addr_test1wallet"
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeStore:
+    """analysis_results collection stand-in"""
+
+    def __init__(self):
+        self.results = {}
+
+    async def get_cached_result(self, key):
+        return self.results.get(key)
+
+    async def set_cached_result(self, key, result, ttl_seconds):
+        self.results[key] = result
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = FakeStore()
+    monkeypatch.setattr(result_cache_module, "mongo_store", store)
+    return store
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache_module, "time", SimpleNamespace(time=clock))
+    return clock
+
+
+def test_key_follows_the_analysis_settings(monkeypatch):
+    key = AnalysisResultCache.make_key(WALLET, "preprod", "tx1", "deny1")
+
+    assert AnalysisResultCache.make_key(WALLET, "preprod", "tx1", "deny1") == key
+    assert AnalysisResultCache.make_key(WALLET, "preprod", "tx2", "deny1") != key
+    assert AnalysisResultCache.make_key(WALLET, "preprod", "tx1", "deny2") != key
+    for name, value in (("blockchain_max_transactions", 0), ("analysis_mode", "crew"),
+                        ("fast_path_low_max", 10), ("fast_path_critical_min", 90),
+                        ("wallet_sync_incremental", not settings.wallet_sync_incremental)):
+        with monkeypatch.context() as patch:
+            patch.setattr(settings, name, value)
+            assert AnalysisResultCache.make_key(WALLET, "preprod", "tx1", "deny1") != key, name
+
+
+def test_lru_evicts_the_least_recently_used(store, clock):
+    cache = AnalysisResultCache(ttl_seconds=60, max_entries=2)
+    cache._lru_put("a", {"n": 1})
+    cache._lru_put("b", {"n": 2})
+    assert cache._lru_get("a") == {"n": 1}  # "b" is now the oldest
+
+    cache._lru_put("c", {"n": 3})
+    assert list(cache._lru) == ["a", "c"]
+    assert cache._lru_get("b") is None
+
+
+def test_entries_expire_after_the_ttl(store, clock):
+    cache = AnalysisResultCache(ttl_seconds=60, max_entries=2)
+    cache._lru_put("a", {"n": 1})
+
+    clock.now += 59
+    assert cache._lru_get("a") == {"n": 1}
+    clock.now += 2
+    assert cache._lru_get("a") is None
+    assert "a" not in cache._lru
+
+
+def test_mongo_results_refill_the_lru(store, clock):
+    cache = AnalysisResultCache(ttl_seconds=60, max_entries=2)
+    store.results["a"] = {"n": 1}
+
+    assert asyncio.run(cache.get("a")) == {"n": 1}
+    assert cache._lru_get("a") == {"n": 1}
+
+
+def test_concurrent_requests_share_one_computation(store, clock):
+    cache = AnalysisResultCache(ttl_seconds=60, max_entries=2)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"risk_score": 42}
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_compute("key", compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"risk_score": 42}] * 5
+    assert len(calls) == 1
+    assert store.results["key"] == {"risk_score": 42}
+    assert cache.stats()["misses"] == 1 and cache.stats()["in_flight"] == 0
+
+    # Later requests are served from the cache
+    assert asyncio.run(cache.get_or_compute("key", compute)) == {"risk_score": 42}
+    assert len(calls) == 1
+
+
+def test_failed_computation_is_shared_and_not_cached(store, clock):
+    cache = AnalysisResultCache(ttl_seconds=60, max_entries=2)
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("Blockfrost unreachable")
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_compute("key", compute) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    assert all(isinstance(result, ConnectionError) for result in asyncio.run(run()))
+    assert store.results == {}
+    assert cache._in_flight == {}
+
+
+def test_disabled_cache_always_computes(store):
+    cache = AnalysisResultCache(ttl_seconds=0, max_entries=2)
+
+    async def compute():
+        return {"risk_score": 1}
+
+    assert asyncio.run(cache.get_or_compute("key", compute)) == {"risk_score": 1}
+    assert asyncio.run(cache.get_or_compute(None, compute)) == {"risk_score": 1}
+    assert store.results == {}
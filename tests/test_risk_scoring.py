@@ -0,0 +1,88 @@
+"""
+Risk Scoring Tests
+Batch scoring against per-wallet analyses over a spread of summaries
+"""
+import itertools
+
+import pytest
+
+from services.blockchain.analyzer import (
+    BASE_RISK_SCORE,
+    DENYLISTED_RISK_SCORE,
+    HIGH_FREQUENCY_COUNT,
+    SEVERITY_POINTS,
+    BlockchainAnalyzer
+)
+
+
+def summary(count=10, large_count=0, fee_outliers=0, flagged=0, denylisted=False):
+    data = {
+        "count": count,
+        "total_volume": 50_000_000 * count,
+        "total_fees": 170_000 * count,
+        "received_lovelace": 30_000_000 * count,
+        "sent_lovelace": 20_000_000 * count,
+        "large_count": large_count,
+        "fee_outliers": fee_outliers,
+        "fee_percentiles": {"p50": 170_000.0},
+        "oldest": 1_700_000_000,
+        "newest": 1_700_000_000 + 86400 * count,
+        "flagged_counterparties": flagged,
+        "flagged_categories": ["mixer"] if flagged else []
+    }
+    if denylisted:
+        data.update(denylisted=True, denylist_category="ofac")
+    return data
+
+
+SUMMARIES = [
+    summary(count=count, large_count=large, fee_outliers=outliers, flagged=flagged, denylisted=listed)
+    for count, large, outliers, flagged, listed in itertools.product(
+        (0, 1, HIGH_FREQUENCY_COUNT, HIGH_FREQUENCY_COUNT + 1),
+        (0, 2),
+        (0, 1),
+        (0, 3),
+        (False, True)
+    )
+    if count or not (large or outliers or flagged)
+]
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return BlockchainAnalyzer()
+
+
+def test_batch_scores_match_per_wallet_scores(analyzer):
+    expected = [analyzer.calculate_risk_score(analyzer._build_analysis(item)) for item in SUMMARIES]
+
+    assert analyzer.calculate_risk_scores(SUMMARIES).tolist() == expected
+
+    analyses, scores = analyzer.build_analyses(SUMMARIES)
+    assert scores.tolist() == expected
+    assert analyses == [analyzer._build_analysis(item) for item in SUMMARIES]
+
+
+def test_rule_weights(analyzer):
+    def score(**fields):
+        return int(analyzer.calculate_risk_scores([summary(**fields)])[0])
+
+    assert score() == BASE_RISK_SCORE
+    assert score(count=HIGH_FREQUENCY_COUNT + 1) == BASE_RISK_SCORE + SEVERITY_POINTS["medium"]
+    # One outlier in ten transactions is under the unusual fee ratio; three is over
+    assert score(fee_outliers=1) == BASE_RISK_SCORE
+    assert score(fee_outliers=3) == BASE_RISK_SCORE + SEVERITY_POINTS["medium"]
+    assert score(large_count=1, flagged=1) == BASE_RISK_SCORE + 2 * SEVERITY_POINTS["high"]
+    assert score(count=HIGH_FREQUENCY_COUNT + 1, large_count=1, flagged=1, fee_outliers=40) == 100
+    assert score(count=0, denylisted=True) == DENYLISTED_RISK_SCORE
+
+
+def test_indicators_are_described(analyzer):
+    analysis = analyzer._build_analysis(summary(large_count=2, flagged=3, denylisted=True))
+
+    assert [indicator["type"] for indicator in analysis["risk_indicators"]] == [
+        "denylisted_address", "large_transactions", "counterparty_exposure"
+    ]
+    assert analysis["risk_indicators"][0]["description"] == "Wallet is on the ofac denylist"
+    assert analysis["risk_indicators"][2]["severity"] == "high"
+    assert analysis["risk_indicators"][2]["description"] == "Transacted directly with 3 denylisted addresses (mixer)"
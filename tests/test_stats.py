@@ -0,0 +1,86 @@
+"""
+Streaming Statistics Tests
+TransactionStats against the columnar batch summary
+"""
+import random
+
+import numpy as np
+import pytest
+
+from services.blockchain.analyzer import LARGE_TRANSACTION_LOVELACE, BlockchainAnalyzer
+from services.blockchain.batch import TransactionBatch
+from services.blockchain.stats import EXACT_SAMPLES, P2Quantile, TransactionStats
+
+
+def make_transactions(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "tx_hash": f"{i:064x}",
+            "block_height": 1000 + i // 3,
+            "block_time": 1_700_000_000 + i * 600,
+            "output_amount": rng.randint(1_000_000, 200_000_000_000),
+            "net_lovelace": rng.randint(-50_000_000, 50_000_000),
+            "fees": rng.randint(160_000, 400_000) if i % 17 else rng.randint(1_000_000, 3_000_000)
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return BlockchainAnalyzer()
+
+
+@pytest.mark.parametrize("count", [1, 2, 4, 5, 6, 20, 100, EXACT_SAMPLES])
+def test_streaming_matches_batch_for_small_histories(analyzer, count):
+    transactions = make_transactions(count)
+    stats = TransactionStats(LARGE_TRANSACTION_LOVELACE)
+    stats.add_many(transactions)
+
+    streamed = stats.summary()
+    batch = analyzer._summarize_batch(TransactionBatch.from_records(transactions))
+
+    for field in ("count", "total_volume", "total_fees", "received_lovelace", "sent_lovelace",
+                  "large_count", "oldest", "newest"):
+        assert streamed[field] == batch[field], field
+    assert streamed["fee_percentiles"] == pytest.approx(batch["fee_percentiles"])
+
+
+def test_large_histories_stay_close_to_batch(analyzer):
+    transactions = make_transactions(20 * EXACT_SAMPLES)
+    stats = TransactionStats(LARGE_TRANSACTION_LOVELACE)
+    stats.add_many(transactions)
+
+    streamed = stats.summary()["fee_percentiles"]
+    batch = analyzer._summarize_batch(TransactionBatch.from_records(transactions))["fee_percentiles"]
+    assert streamed["p50"] == pytest.approx(batch["p50"], rel=0.05)
+    assert streamed["p95"] == pytest.approx(batch["p95"], rel=0.25)
+
+
+def test_round_trip_continues_where_it_left_off():
+    transactions = make_transactions(3 * EXACT_SAMPLES)
+    for split in (3, EXACT_SAMPLES, 2 * EXACT_SAMPLES):
+        whole = TransactionStats(LARGE_TRANSACTION_LOVELACE)
+        whole.add_many(transactions)
+
+        resumed = TransactionStats(LARGE_TRANSACTION_LOVELACE)
+        resumed.add_many(transactions[:split])
+        resumed = TransactionStats.from_dict(resumed.to_dict())
+        resumed.add_many(transactions[split:])
+
+        assert resumed.summary() == whole.summary()
+
+
+@pytest.mark.parametrize("p", [0.01, 0.25, 0.5, 0.99])
+def test_quantile_switches_to_markers_without_jumping(p):
+    values = [float(value) for value in np.random.default_rng(3).lognormal(12, 0.5, EXACT_SAMPLES + 1)]
+    estimator = P2Quantile(p)
+    for value in values[:-1]:
+        estimator.add(value)
+    assert estimator.value == pytest.approx(float(np.percentile(values[:-1], p * 100)))
+
+    estimator.add(values[-1])
+    assert estimator.heights and not estimator.samples
+    assert estimator.positions == sorted(set(estimator.positions))
+    assert estimator.value == pytest.approx(float(np.percentile(values, p * 100)), rel=0.02)
@@ -0,0 +1,225 @@
+"""
+Job Status Tests
+/status served from the stored payment-state snapshot, long-polling and Server-Sent Events
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from api.routes import job_routes
+from services.payment import masumi_service as masumi_service_module
+from services.payment.masumi_service import MasumiPaymentService
+from services.storage.job_events import JobEventBus, job_events
+from services.storage.mongo_store import MongoStore
+
+
+class FakePaymentService:
+    """Payment service stand-in recording forced status checks"""
+
+    def __init__(self, store, state="FundsLocked", error=None):
+        self.store = store
+        self.state = state
+        self.error = error
+        self.checked = []
+
+    async def check_payment_status(self, job_id, blockchain_identifier):
+        self.checked.append((job_id, blockchain_identifier))
+        if self.error:
+            raise self.error
+        snapshot = {"on_chain_state": self.state, "next_action": None, "checked_at": 0}
+        await self.store.update_job(job_id, {"payment_state": snapshot})
+        return snapshot
+
+
+@pytest.fixture
+def store(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    store = MongoStore()
+    store.jobs_collection = mongomock_motor.AsyncMongoMockClient()["risklens_ai"]["jobs"]
+    monkeypatch.setattr(job_routes, "mongo_store", store)
+    monkeypatch.setattr(masumi_service_module, "mongo_store", store)
+    asyncio.run(store.set_job("job", {
+        "status": "awaiting_payment",
+        "payment_status": "pending",
+        "blockchain_identifier": "bid-job",
+        "identifier_from_purchaser": "purchaser",
+        "input_data": {"wallet_address": "addr_test1wallet"},
+        "payment_state": {"on_chain_state": None, "next_action": "WaitingForExternalAction", "checked_at": 0}
+    }))
+    return store
+
+
+@pytest.fixture
+def payments(store, monkeypatch):
+    payments = FakePaymentService(store)
+    monkeypatch.setattr(job_routes, "payment_service", payments)
+    return payments
+
+
+def status(job_id="job", **params):
+    return asyncio.run(job_routes.get_status(job_id, **params))
+
+
+def test_status_is_read_from_the_stored_snapshot(store, payments):
+    assert status() == {
+        "job_id": "job",
+        "status": "awaiting_payment",
+        "payment_status": "pending",
+        "payment_state": None,
+        "stage": None,
+        "result": None
+    }
+    assert payments.checked == []
+
+
+def test_status_reads_only_the_served_fields(store):
+    job = asyncio.run(store.get_job_status("job"))
+
+    assert "input_data" not in job and "identifier_from_purchaser" not in job
+    assert job["blockchain_identifier"] == "bid-job"
+
+
+def test_poller_snapshots_are_served(store, payments):
+    service = MasumiPaymentService()
+    asyncio.run(service.save_payment_state("job", {
+        "onChainState": "FundsLocked",
+        "NextAction": {"requestedAction": "None"}
+    }))
+
+    assert status()["payment_state"] == "FundsLocked"
+    assert payments.checked == []
+
+
+def test_refresh_checks_the_payment_service(store, payments):
+    assert status(refresh=True)["payment_state"] == "FundsLocked"
+    assert payments.checked == [("job", "bid-job")]
+
+    # The refreshed snapshot is stored for later plain reads
+    assert status()["payment_state"] == "FundsLocked"
+    assert len(payments.checked) == 1
+
+
+def test_failed_refresh_serves_the_stored_snapshot(store, payments):
+    payments.error = ConnectionError("payment service unreachable")
+
+    assert status(refresh=True)["payment_state"] is None
+
+
+def test_refresh_only_applies_while_awaiting_payment(store, payments):
+    asyncio.run(store.update_job("job", {"status": "completed", "payment_status": "paid"}))
+
+    assert status(refresh=True)["status"] == "completed"
+    assert payments.checked == []
+
+
+def test_unknown_job(store, payments):
+    with pytest.raises(HTTPException) as error:
+        status("missing")
+    assert error.value.status_code == 404
+
+
+def test_event_bus_delivers_watched_fields_to_the_jobs_listeners():
+    bus = JobEventBus()
+
+    async def run():
+        with bus.listen("job") as updates, bus.listen("other") as other:
+            assert bus.listener_count == 2
+            bus.publish("job", {"stage": "fetching", "result": "ignored"})
+            bus.publish("job", {"result": "only unwatched fields"})
+            return updates.get_nowait(), updates.empty(), other.empty()
+
+    assert asyncio.run(run()) == ({"stage": "fetching"}, True, True)
+    assert bus.listener_count == 0
+    bus.publish("job", {"status": "running"})  # no listeners left
+
+
+async def later(delay, coro):
+    await asyncio.sleep(delay)
+    await coro
+
+
+def test_long_poll_returns_when_the_status_changes(store, payments):
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        update = asyncio.ensure_future(later(0.05, store.update_job("job", {"status": "running"})))
+        response = await job_routes.get_status("job", wait=30)
+        await update
+        return response, loop.time() - start
+
+    response, elapsed = asyncio.run(run())
+    assert response["status"] == "running"
+    assert elapsed < 1
+
+
+def test_long_poll_ignores_stage_changes_and_times_out(store, payments):
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        update = asyncio.ensure_future(later(0.01, store.update_job("job", {"stage": "fetching"})))
+        response = await job_routes.get_status("job", wait=0.2)
+        await update
+        return response, loop.time() - start
+
+    response, elapsed = asyncio.run(run())
+    assert response["status"] == "awaiting_payment"
+    assert elapsed >= 0.2
+
+
+def test_long_poll_sees_changes_from_other_processes(store, payments, monkeypatch):
+    # Without a change stream, writes by other processes publish nothing here
+    monkeypatch.setattr(job_routes, "STATUS_RECHECK_SECONDS", 0.05)
+
+    async def run():
+        write = store.jobs_collection.update_one({"job_id": "job"}, {"$set": {"status": "queued"}})
+        update = asyncio.ensure_future(later(0.01, write))
+        response = await job_routes.get_status("job", wait=5)
+        await update
+        return response
+
+    assert asyncio.run(run())["status"] == "queued"
+
+
+def test_finished_jobs_are_not_held(store, payments):
+    asyncio.run(store.update_job("job", {"status": "completed", "payment_status": "paid"}))
+
+    async def run():
+        return await asyncio.wait_for(job_routes.get_status("job", wait=30), timeout=1)
+
+    assert asyncio.run(run())["status"] == "completed"
+
+
+def test_stream_sends_each_change_until_the_job_finishes(store, payments):
+    async def progress():
+        for updates in ({"status": "running", "payment_status": "paid"}, {"stage": "fetching"},
+                        {"stage": "analyzing"}, {"status": "completed", "stage": None, "result": "done"}):
+            await asyncio.sleep(0.02)
+            await store.update_job("job", updates)
+
+    async def run():
+        response = await job_routes.stream_status("job")
+        writer = asyncio.ensure_future(progress())
+        events = [event async for event in response.body_iterator]
+        await writer
+        return response, events
+
+    response, events = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert response.media_type == "text/event-stream"
+    payloads = [json.loads(event.split("data: ", 1)[1]) for event in events if event.startswith("event: status")]
+    assert [(payload["status"], payload["stage"]) for payload in payloads] == [
+        ("awaiting_payment", None),
+        ("running", None),
+        ("running", "fetching"),
+        ("running", "analyzing"),
+        ("completed", None)
+    ]
+    assert payloads[-1]["result"] == "done"
+    assert job_events.listener_count == 0
+
+
+def test_stream_of_an_unknown_job(store, payments):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(job_routes.stream_status("missing"))
+    assert error.value.status_code == 404
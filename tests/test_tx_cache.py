@@ -0,0 +1,156 @@
+"""
+Transaction Cache Tests
+Backends, hit/miss counters and repeat analyses served without Blockfrost
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import settings
+from services.blockchain import tx_cache as tx_cache_module
+from services.blockchain.analyzer import BlockchainAnalyzer
+from services.blockchain.tx_cache import MongoTransactionBackend, SQLiteTransactionBackend, TransactionCache
+
+WALLET = "addr_test1wallet"
+OTHER = "addr_test1other"
+
+
+def record(index, block_height=1000):
+    return {
+        "tx_hash": f"{index:064x}",
+        "block_height": block_height,
+        "block_time": 1_700_000_000 + index,
+        "fees": 170_000,
+        "inputs": [[OTHER, 10_170_000, {}]],
+        "outputs": [[WALLET, 10_000_000, {"policy.asset": 5}]]
+    }
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    return SQLiteTransactionBackend(str(tmp_path / "cache" / "transactions.sqlite"))
+
+
+@pytest.fixture
+def mongo_backend():
+    mongomock = pytest.importorskip("mongomock")
+    return MongoTransactionBackend(mongomock.MongoClient()["risklens_ai"]["transactions"])
+
+
+@pytest.mark.parametrize("backend_name", ["sqlite_backend", "mongo_backend"])
+def test_backends_round_trip_records(backend_name, request):
+    backend = request.getfixturevalue(backend_name)
+    records = [record(index) for index in range(3)]
+    backend.put_many(records)
+    backend.put_many(records[:1])  # rewriting a transaction is harmless
+
+    found = backend.get_many([tx["tx_hash"] for tx in records] + ["f" * 64])
+    assert found == {tx["tx_hash"]: tx for tx in records}
+
+
+def test_sqlite_lookups_beyond_the_parameter_limit(sqlite_backend):
+    records = [record(index) for index in range(tx_cache_module._SQLITE_CHUNK * 2 + 10)]
+    sqlite_backend.put_many(records)
+
+    assert len(sqlite_backend.get_many([tx["tx_hash"] for tx in records])) == len(records)
+
+
+def test_records_of_an_older_version_are_ignored(sqlite_backend, monkeypatch):
+    monkeypatch.setattr(tx_cache_module, "CACHE_VERSION", tx_cache_module.CACHE_VERSION - 1)
+    sqlite_backend.put_many([record(1)])
+    monkeypatch.undo()
+
+    assert sqlite_backend.get_many([record(1)["tx_hash"]]) == {}
+
+
+def test_counts_hits_and_misses(sqlite_backend):
+    cache = TransactionCache(backend=sqlite_backend, mode="sqlite")
+    cache.put_many([record(1), record(2)])
+
+    assert set(cache.get_many([record(1)["tx_hash"], record(3)["tx_hash"]])) == {record(1)["tx_hash"]}
+    assert cache.get_many([]) == {}
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_unconfirmed_transactions_are_not_cached(sqlite_backend):
+    cache = TransactionCache(backend=sqlite_backend, mode="sqlite")
+    cache.put_many([record(1, block_height=None)])
+
+    assert cache.get_many([record(1)["tx_hash"]]) == {}
+
+
+def test_disabled_cache_stores_nothing(sqlite_backend):
+    cache = TransactionCache(backend=sqlite_backend, mode="off")
+    cache.put_many([record(1)])
+
+    assert cache.get_many([record(1)["tx_hash"]]) == {}
+    assert sqlite_backend.get_many([record(1)["tx_hash"]]) == {}
+    assert cache.stats()["misses"] == 0
+
+
+def test_backend_failures_count_as_misses():
+    class Broken:
+        name = "broken"
+
+        def get_many(self, tx_hashes):
+            raise ConnectionError("MongoDB unreachable")
+
+        def put_many(self, records):
+            raise ConnectionError("MongoDB unreachable")
+
+    cache = TransactionCache(backend=Broken(), mode="mongo")
+    cache.put_many([record(1)])
+
+    assert cache.get_many([record(1)["tx_hash"]]) == {}
+    assert cache.stats()["misses"] == 1
+
+
+def test_auto_falls_back_to_sqlite_without_mongo(tmp_path, monkeypatch):
+    def unavailable(name):
+        raise ConnectionError("MongoDB unreachable")
+
+    monkeypatch.setattr(tx_cache_module.mongo_store, "get_sync_collection", unavailable)
+    monkeypatch.setattr(settings, "tx_cache_path", str(tmp_path / "transactions.sqlite"))
+
+    assert TransactionCache(mode="auto")._get_backend().name == "sqlite"
+    with pytest.raises(ConnectionError):
+        TransactionCache(mode="mongo")._get_backend()
+
+
+class CountingBlockfrost:
+    """Blockfrost stand-in counting detail requests"""
+
+    def __init__(self, count):
+        self.listing = [
+            SimpleNamespace(tx_hash=f"{index:064x}", block_height=2000 - index, block_time=1_700_000_000 - index)
+            for index in range(count)
+        ]
+        self.detail_requests = 0
+
+    def address_transactions(self, address, from_block=None, count=100, page=1, order="desc"):
+        return self.listing[(page - 1) * count:page * count]
+
+    def transaction_utxos(self, tx_hash):
+        self.detail_requests += 1
+        return {
+            "inputs": [{"address": OTHER, "amount": [{"unit": "lovelace", "quantity": "10170000"}]}],
+            "outputs": [{"address": WALLET, "amount": [{"unit": "lovelace", "quantity": "10000000"}]}]
+        }
+
+
+def test_repeat_analyses_skip_blockfrost(sqlite_backend, monkeypatch):
+    monkeypatch.setattr(settings, "counterparty_graph", False)
+    monkeypatch.setattr(settings, "wallet_sync_incremental", False)
+    cache = TransactionCache(backend=sqlite_backend, mode="sqlite")
+    analyzer = BlockchainAnalyzer(cache=cache)
+    analyzer.api = CountingBlockfrost(30)
+
+    first = analyzer.summarize_wallet(WALLET)
+    assert analyzer.api.detail_requests == 30
+
+    # Another analyzer (another job or process) sharing the cache
+    again = BlockchainAnalyzer(cache=TransactionCache(backend=sqlite_backend, mode="sqlite"))
+    again.api = analyzer.api
+    assert again.summarize_wallet(WALLET) == first
+    assert analyzer.api.detail_requests == 30
+    assert again.cache.stats()["hits"] == 30
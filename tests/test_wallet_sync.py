@@ -0,0 +1,147 @@
+"""
+Wallet Sync Tests
+Incremental statistics refreshes against a full recompute of the history
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import settings
+from services.blockchain.analyzer import BlockchainAnalyzer
+from services.blockchain.wallet_sync import WalletSyncStore
+
+WALLET = "addr_test1wallet"
+OTHER = "addr_test1other"
+FIRST_BLOCK = 1000
+
+
+class FakeChain:
+    """Blockfrost stand-in over an editable list of (block, index, tx_hash) entries"""
+
+    def __init__(self):
+        self.entries = []
+        self.bodies = {}
+        self.from_blocks = []
+
+    def add(self, block, tx_hash, received, fee=170_000 + 1000):
+        index = sum(1 for entry in self.entries if entry[0] == block)
+        self.entries.append((block, index, tx_hash))
+        if received:
+            inputs = [[OTHER, received + fee]]
+            outputs = [[WALLET, received]]
+        else:
+            inputs = [[WALLET, 50_000_000]]
+            outputs = [[OTHER, 20_000_000], [WALLET, 30_000_000 - fee]]
+        self.bodies[tx_hash] = {
+            side: [{"address": address, "amount": [{"unit": "lovelace", "quantity": str(value)}]}
+                   for address, value in endpoints]
+            for side, endpoints in (("inputs", inputs), ("outputs", outputs))
+        }
+
+    def address_transactions(self, address, from_block=None, count=100, page=1, order="desc"):
+        self.from_blocks.append(from_block)
+        entries = sorted(
+            (entry for entry in self.entries if from_block is None or entry[0] >= int(from_block)),
+            reverse=True
+        )[(page - 1) * count:page * count]
+        return [
+            SimpleNamespace(tx_hash=tx_hash, block_height=block, block_time=1_700_000_000 + block * 20)
+            for block, _, tx_hash in entries
+        ]
+
+    def transaction_utxos(self, tx_hash):
+        return self.bodies[tx_hash]
+
+
+class MemoryCache:
+    def __init__(self):
+        self.records = {}
+
+    def get_many(self, tx_hashes):
+        return {tx_hash: self.records[tx_hash] for tx_hash in tx_hashes if tx_hash in self.records}
+
+    def put_many(self, records):
+        self.records.update((record["tx_hash"], record) for record in records)
+
+
+class MemorySyncBackend:
+    name = "memory"
+
+    def __init__(self):
+        self.states = {}
+
+    def get(self, key):
+        return self.states.get(key)
+
+    def put(self, key, state):
+        self.states[key] = state
+
+
+@pytest.fixture
+def chain():
+    chain = FakeChain()
+    for block in range(FIRST_BLOCK, FIRST_BLOCK + 30):
+        chain.add(block, f"{block:060x}aaaa", received=(block % 3 + 1) * 7_000_000)
+        chain.add(block, f"{block:060x}bbbb", received=0, fee=170_000 + block)
+    return chain
+
+
+@pytest.fixture
+def analyzer(chain, monkeypatch):
+    monkeypatch.setattr(settings, "counterparty_graph", False)
+    analyzer = BlockchainAnalyzer(
+        cache=MemoryCache(),
+        sync_store=WalletSyncStore(backend=MemorySyncBackend(), mode="memory")
+    )
+    analyzer.api = chain
+    return analyzer
+
+
+def full_recompute(analyzer, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(settings, "wallet_sync_incremental", False)
+        return analyzer.summarize_wallet(WALLET)
+
+
+def assert_same(incremental, full):
+    (summary, recent), (expected, expected_recent) = incremental, full
+    for field in ("count", "total_volume", "total_fees", "received_lovelace", "sent_lovelace",
+                  "large_count", "native_assets", "flagged_counterparties", "oldest", "newest"):
+        assert summary[field] == expected[field], field
+    assert summary["fee_percentiles"] == pytest.approx(expected["fee_percentiles"])
+    assert [tx["tx_hash"] for tx in recent] == [tx["tx_hash"] for tx in expected_recent]
+
+
+def test_refresh_after_new_blocks_matches_a_full_recompute(analyzer, chain, monkeypatch):
+    analyzer.summarize_wallet(WALLET)
+    for block in range(FIRST_BLOCK + 30, FIRST_BLOCK + 33):
+        chain.add(block, f"{block:060x}cccc", received=12_000_000)
+
+    assert_same(analyzer.summarize_wallet(WALLET), full_recompute(analyzer, monkeypatch))
+    assert analyzer.summarize_wallet(WALLET)[0]["count"] == 63
+
+
+def test_refresh_without_new_blocks_counts_nothing_twice(analyzer, monkeypatch):
+    first = analyzer.summarize_wallet(WALLET)
+
+    assert analyzer.summarize_wallet(WALLET)[0]["count"] == first[0]["count"] == 60
+    assert_same(analyzer.summarize_wallet(WALLET), full_recompute(analyzer, monkeypatch))
+
+
+def test_reorg_of_the_boundary_block(analyzer, chain, monkeypatch):
+    analyzer.summarize_wallet(WALLET)
+    last = FIRST_BLOCK + 29
+    stats = analyzer.sync_store.get_stats(analyzer.network, WALLET)["stats"]
+    assert stats["last_block_height"] == last
+    assert len(stats["boundary_hashes"]) == 2
+
+    # The last block is replaced by one holding the same two transactions
+    # plus a third; the chain then grows by another block
+    chain.add(last, f"{last:060x}dddd", received=3_000_000)
+    chain.add(last + 1, f"{last + 1:060x}eeee", received=0)
+
+    chain.from_blocks.clear()
+    refreshed = analyzer.summarize_wallet(WALLET)
+    assert chain.from_blocks == [str(last)]  # only the boundary block onwards
+    assert refreshed[0]["count"] == 62
+    assert_same(refreshed, full_recompute(analyzer, monkeypatch))